@@ -1,20 +1,39 @@
+import functools
 import numpy as np
 
 from Calculations.ConstantParameters import *
 
-def calculateHumidity(fRefHumidity: float, fHeightChange: float):
-    return min(1.0,max(0.0, fRefHumidity+0.05*fHeightChange/1000.0))
+def calculateHumidity(fRefHumidity: np.ndarray | float, fHeightChange: np.ndarray | float):
+    """
+    Calculate relative humidity at given altitude (clipped to <0, 1>)
+    """
+    return np.clip(fRefHumidity+0.05*np.asarray(fHeightChange)/1000.0, 0.0, 1.0)
+
 
+@functools.lru_cache(maxsize=32)
+def _getPressureExponent(fGAcceleration: float):
+    return fGAcceleration*MOLAR_MASS_AIR/(UNIVERSAL_GAS_CONSTANT*LAPSE_RATE)
+
+def getPressureExponent(dcParameters: dict = INPUT_PARAMETERS):
+    """
+    Barometric formula exponent g*M/(R*L) [-] (precomputed in CParameterSet, cached for scalar gravity)
+    """
+    fPressureExponent = getattr(dcParameters, 'fPressureExponent', None)
+    if fPressureExponent is not None: return fPressureExponent
+    _GAcceleration = dcParameters['G_ACCELERATION']
+    if np.ndim(_GAcceleration) == 0: return _getPressureExponent(float(_GAcceleration))
+    return np.asarray(_GAcceleration)*MOLAR_MASS_AIR/(UNIVERSAL_GAS_CONSTANT*LAPSE_RATE)
 
-def calculatePressure(fRefPressure: float, fRefTemp: float, fHeightChange: float, dcParameters: dict = INPUT_PARAMETERS):
+def calculatePressure(fRefPressure: np.ndarray | float, fRefTemp: np.ndarray | float, fHeightChange: np.ndarray | float, dcParameters: dict = INPUT_PARAMETERS):
     """
     Calculate atmospheric pressure at given altitude
     """
-    return fRefPressure * ((fRefTemp + fHeightChange*LAPSE_RATE) / fRefTemp)**(dcParameters['G_ACCELERATION']*MOLAR_MASS_AIR/(UNIVERSAL_GAS_CONSTANT*LAPSE_RATE))
+    return fRefPressure * ((fRefTemp + np.asarray(fHeightChange)*LAPSE_RATE) / fRefTemp)**getPressureExponent(dcParameters)
 
-def getAirDensity(fRefPressure: float, fRefTemp: float, fHeightChange: float, fHumidity: float = 0.0, dcParameters: dict = INPUT_PARAMETERS):
+def getAirDensity(fRefPressure: np.ndarray | float, fRefTemp: np.ndarray | float, fHeightChange: np.ndarray | float, fHumidity: np.ndarray | float = 0.0, dcParameters: dict = INPUT_PARAMETERS):
     """
-    Calculate air density at given altitude
+    Calculate air density at given altitude.
+    All inputs may be given as NumPy arrays - they are broadcast against each other.
     """
     fHumidity = calculateHumidity(fHumidity, fHeightChange)
     fPressure = calculatePressure(fRefPressure, fRefTemp, fHeightChange, dcParameters)
@@ -23,8 +42,14 @@ def getAirDensity(fRefPressure: float, fRefTemp: float, fHeightChange: float, fH
     fPartialPressure = fPressure-fVapourPressure
     return (MOLAR_MASS_VAPOUR*fVapourPressure + MOLAR_MASS_AIR*fPartialPressure) / (UNIVERSAL_GAS_CONSTANT*fTemperature)
 
-def getTemperature(fRefTemp: float, fHeightChange: float):
-    return  fRefTemp+fHeightChange*LAPSE_RATE
+def getTemperature(fRefTemp: np.ndarray | float, fHeightChange: np.ndarray | float):
+    """
+    Calculate air temperature at given altitude
+    """
+    return fRefTemp+np.asarray(fHeightChange)*LAPSE_RATE
 
-def getVapourPressure(fHumidity: float, fTemperature: float):
-    return fHumidity * 6.1078**(7.5*fTemperature/(fTemperature+237.3))
\ No newline at end of file
+def getVapourPressure(fHumidity: np.ndarray | float, fTemperature: np.ndarray | float):
+    """
+    Calculate water vapour pressure for given relative humidity and temperature
+    """
+    return fHumidity * 6.1078**(7.5*np.asarray(fTemperature)/(fTemperature+237.3))
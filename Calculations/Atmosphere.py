@@ -0,0 +1,166 @@
+"""
+Layered atmosphere - ISA 1976 standard layers and measured soundings
+"""
+
+import functools
+import numpy as np
+import pandas as pd
+
+from Calculations.ConstantParameters import *
+from Calculations.Air import getVapourPressure
+
+# ISA 1976 - base geopotential altitude [m], base temperature [K], lapse rate dT/dh [K/m] up to 84852 m
+ISA_LAYERS = (
+    (0.0, 288.15, -6.5e-3),
+    (11000.0, 216.65, 0.0),
+    (20000.0, 216.65, 1.0e-3),
+    (32000.0, 228.65, 2.8e-3),
+    (47000.0, 270.65, 0.0),
+    (51000.0, 270.65, -2.8e-3),
+    (71000.0, 214.65, -2.0e-3),
+    (84852.0, 186.946, 0.0),
+)
+ISA_SEA_LEVEL_PRESSURE = 101325.0 # [Pa]
+ISA_G_ACCELERATION = 9.80665 # [m/s**2]
+ISA_GAS_CONSTANT = 8.31432 # [J/(mol·K)] - value used by the standard
+EARTH_RADIUS = 6356766.0 # [m] - geopotential altitude H = r*z/(r+z)
+SOUNDING_COLUMNS = ("altitude", "temperature", "pressure", "humidity")
+
+class CLayeredAtmosphere():
+    """
+    Atmosphere given by profile nodes - altitude [m], temperature [K], pressure [Pa], relative humidity [-].
+    Between the nodes temperature and humidity vary linearly, pressure follows the hydrostatic form of the
+    segment (p = p_i*(T/T_i)**n for a lapse, p = p_i*exp(-k*(h-h_i)) for an isothermal segment)
+    with n, k fitted to the node pressures - exact for ISA layers, temperature inversions are allowed.
+    Outside the profile the first/last segment is extended.
+    Segments are precompiled into arrays - queries are vectorized binary searches (O(log n)).
+    Altitude of the queries is measured upwards from the reference point, fBaseAltitude [m] above the
+    profile zero (e.g. launch site elevation for a profile given above sea level).
+    getDensity has the CAtmosphereTable interface - usable as the cAtmosphere of the simulations.
+    """
+
+    def __init__(
+            self,
+            aAltitude: np.ndarray | list,
+            aTemperature: np.ndarray | list,
+            aPressure: np.ndarray | list,
+            aHumidity: np.ndarray | list | float = 0.0,
+            fBaseAltitude: float = 0.0
+        ):
+        aAltitude, aTemperature, aPressure = (np.asarray(_Value, dtype=float).ravel() for _Value in (aAltitude, aTemperature, aPressure))
+        aHumidity = np.broadcast_to(np.asarray(aHumidity, dtype=float), aAltitude.shape)
+        if aAltitude.size < 2 or not aAltitude.size == aTemperature.size == aPressure.size:
+            raise ValueError("Atmosphere profile needs at least 2 nodes with altitude, temperature and pressure")
+        aOrder = np.argsort(aAltitude, kind='stable')
+        aAltitude, aTemperature, aPressure, aHumidity = aAltitude[aOrder], aTemperature[aOrder], aPressure[aOrder], aHumidity[aOrder]
+        if np.any(np.diff(aAltitude) <= 0.0): raise ValueError("Atmosphere profile altitudes have to be unique")
+        if np.any(aTemperature <= 0.0) or np.any(aPressure <= 0.0): raise ValueError("Atmosphere profile temperatures [K] and pressures [Pa] have to be positive")
+        self.fBaseAltitude = fBaseAltitude
+        self.aNodeAltitude = aAltitude
+        self.aNodeTemperature = aTemperature
+        self.aNodePressure = aPressure
+        self.aNodeHumidity = aHumidity
+
+        # Segment i spans nodes i, i+1
+        aHeight = np.diff(aAltitude)
+        aTemperatureRatio = aTemperature[1:]/aTemperature[:-1]
+        aLogPressureRatio = np.log(aPressure[1:]/aPressure[:-1])
+        self._aBase = aAltitude[:-1]
+        self._aTemperature = aTemperature[:-1]
+        self._aLapseRate = np.diff(aTemperature)/aHeight
+        self._aLogPressure = np.log(aPressure[:-1])
+        self._bIsothermal = np.abs(aTemperatureRatio-1.0) < 1e-9
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # ln(p/p_i) = n*ln(T/T_i) or -k*(h-h_i)
+            self._aExponent = np.where(self._bIsothermal, aLogPressureRatio/aHeight, aLogPressureRatio/np.log(aTemperatureRatio))
+        self._aHumidity = aHumidity[:-1]
+        self._aHumiditySlope = np.diff(aHumidity)/aHeight
+
+    def _getSegment(self, aAltitude: np.ndarray | float):
+        """
+        Segment index and height above the segment base for the query altitudes
+        """
+        aAltitude = np.asarray(aAltitude, dtype=float)+self.fBaseAltitude
+        aIndex = np.clip(np.searchsorted(self._aBase, aAltitude, side='right')-1, 0, self._aBase.size-1)
+        return aIndex, aAltitude-self._aBase.take(aIndex)
+
+    def getTemperature(self, aAltitude: np.ndarray | float):
+        """
+        Air temperature [K] at given altitude(s) [m]
+        """
+        aIndex, aHeight = self._getSegment(aAltitude)
+        return self._aTemperature.take(aIndex)+self._aLapseRate.take(aIndex)*aHeight
+
+    def getPressure(self, aAltitude: np.ndarray | float):
+        """
+        Atmospheric pressure [Pa] at given altitude(s) [m]
+        """
+        aIndex, aHeight = self._getSegment(aAltitude)
+        return self._getPressure(aIndex, aHeight)
+
+    def _getPressure(self, aIndex: np.ndarray, aHeight: np.ndarray):
+        aExponent = self._aExponent.take(aIndex)
+        aRatio = self._aLapseRate.take(aIndex)*aHeight/self._aTemperature.take(aIndex)
+        with np.errstate(invalid='ignore'):
+            aLog = np.where(self._bIsothermal.take(aIndex), aExponent*aHeight, aExponent*np.log1p(aRatio))
+        return np.exp(self._aLogPressure.take(aIndex)+aLog)
+
+    def getHumidity(self, aAltitude: np.ndarray | float):
+        """
+        Relative humidity [-] at given altitude(s) [m] (clipped to <0, 1>)
+        """
+        aIndex, aHeight = self._getSegment(aAltitude)
+        return np.clip(self._aHumidity.take(aIndex)+self._aHumiditySlope.take(aIndex)*aHeight, 0.0, 1.0)
+
+    def getDensity(self, aAltitude: np.ndarray | float):
+        """
+        Air density [kg/m3] at given altitude(s) [m] - one segment lookup for all state variables
+        """
+        aIndex, aHeight = self._getSegment(aAltitude)
+        aTemperature = self._aTemperature.take(aIndex)+self._aLapseRate.take(aIndex)*aHeight
+        aPressure = self._getPressure(aIndex, aHeight)
+        aHumidity = np.clip(self._aHumidity.take(aIndex)+self._aHumiditySlope.take(aIndex)*aHeight, 0.0, 1.0)
+        # Same moist air model as getAirDensity
+        aVapourPressure = getVapourPressure(aHumidity, aTemperature)
+        return (MOLAR_MASS_VAPOUR*aVapourPressure + MOLAR_MASS_AIR*(aPressure-aVapourPressure)) / (UNIVERSAL_GAS_CONSTANT*aTemperature)
+
+def getGeometricAltitude(aGeopotentialAltitude: np.ndarray | float):
+    """
+    Geometric altitude [m] for given geopotential altitude [m]: z = r*H/(r-H)
+    """
+    return EARTH_RADIUS*np.asarray(aGeopotentialAltitude)/(EARTH_RADIUS-np.asarray(aGeopotentialAltitude))
+
+@functools.lru_cache(maxsize=16)
+def getISAAtmosphere(fBaseAltitude: float = 0.0):
+    """
+    ISA 1976 standard atmosphere (dry) up to 86 km; fBaseAltitude [m] - elevation of the reference point
+    above sea level. Layer boundaries are placed at their geometric altitudes, temperature is linear in
+    the geometric altitude within a layer (below 0.1 K from the standard).
+    """
+    lPressure = [ISA_SEA_LEVEL_PRESSURE]
+    for (fBase, fTemperature, fLapseRate), (fTop, _, _) in zip(ISA_LAYERS[:-1], ISA_LAYERS[1:]):
+        # Hydrostatic equilibrium: p = p_b*(T/T_b)**(-g*M/(R*L)) or p_b*exp(-g*M*(H-H_b)/(R*T_b))
+        fConst = ISA_G_ACCELERATION*MOLAR_MASS_AIR/ISA_GAS_CONSTANT
+        if fLapseRate == 0.0:
+            lPressure.append(lPressure[-1]*np.exp(-fConst*(fTop-fBase)/fTemperature))
+        else:
+            lPressure.append(lPressure[-1]*((fTemperature+fLapseRate*(fTop-fBase))/fTemperature)**(-fConst/fLapseRate))
+    aAltitude = getGeometricAltitude([fBase for fBase, _, _ in ISA_LAYERS])
+    return CLayeredAtmosphere(aAltitude, [fTemperature for _, fTemperature, _ in ISA_LAYERS], lPressure, 0.0, float(fBaseAltitude))
+
+def loadSounding(sPath: str, fBaseAltitude: float = 0.0, sSeparator: str = ';'):
+    """
+    Read a sounding from a CSV (sSeparator) or Parquet file with the 'altitude' [m], 'temperature' [C],
+    'pressure' [hPa] and optional 'humidity' [%] columns (same units as the UI)
+    """
+    dfSounding = pd.read_parquet(sPath) if sPath.lower().endswith((".parquet", ".pq")) else pd.read_csv(sPath, sep=sSeparator)
+    lMissing = [sColumn for sColumn in SOUNDING_COLUMNS[:3] if sColumn not in dfSounding.columns]
+    if lMissing: raise KeyError(f"Missing sounding columns: {lMissing}")
+    dfSounding = dfSounding.dropna(subset=list(SOUNDING_COLUMNS[:3]))
+    return CLayeredAtmosphere(
+        dfSounding["altitude"].to_numpy(dtype=float),
+        dfSounding["temperature"].to_numpy(dtype=float)+KELVIN_OFFSET,
+        dfSounding["pressure"].to_numpy(dtype=float)*100.0,
+        dfSounding["humidity"].fillna(0.0).to_numpy(dtype=float)/100.0 if "humidity" in dfSounding else 0.0,
+        fBaseAltitude
+    )
@@ -0,0 +1,98 @@
+"""
+Precomputed, interpolated air density tables
+"""
+
+import functools
+import numpy as np
+
+from Calculations.ConstantParameters import *
+from Calculations.Air import getAirDensity
+
+ATMOSPHERE_TABLE_CACHE_SIZE = 16
+
+class CAtmosphereTable():
+    """
+    Air density [kg/m3] tabulated on a uniform altitude grid for one reference state
+    (pressure [Pa], temperature [K], humidity [-] at altitude 0) and queried by vectorized
+    linear interpolation. Altitude is measured upwards from the reference point [m].
+    fErrorEstimate is the estimated maximum interpolation error inside the table [kg/m3] - midpoint
+    errors plus a curvature margin, not a guaranteed bound (the clipped humidity has kinks);
+    if fTargetError is given, the grid is refined until the estimate is below it.
+    Queries outside the table are evaluated with the exact model.
+    """
+
+    def __init__(
+            self,
+            fRefPressure: float,
+            fRefTemp: float,
+            fRefHumidity: float = 0.0,
+            fMinAltitude: float = 0.0,
+            fMaxAltitude: float = 10000.0,
+            fResolution: float = 10.0,
+            fTargetError: float | None = None,
+            dcParameters: dict = INPUT_PARAMETERS
+        ):
+        self.fRefPressure = fRefPressure
+        self.fRefTemp = fRefTemp
+        self.fRefHumidity = fRefHumidity
+        self.dcParameters = dcParameters
+        self.fMinAltitude = fMinAltitude
+        self.fMaxAltitude = fMaxAltitude
+
+        while True:
+            self._buildTable(fResolution)
+            if fTargetError is None or self.fErrorEstimate <= fTargetError or fResolution < 1e-3: break
+            # Linear interpolation error scales with the square of the grid step
+            fResolution *= max(0.1, min(0.5, 0.9*np.sqrt(fTargetError/self.fErrorEstimate)))
+
+    def _buildTable(self, fResolution: float):
+        iCells = max(1, int(np.ceil((self.fMaxAltitude-self.fMinAltitude)/fResolution)))
+        self.fResolution = (self.fMaxAltitude-self.fMinAltitude)/iCells
+        self.aAltitude = self.fMinAltitude + np.arange(iCells+1)*self.fResolution
+        self.aDensity = self._getExactDensity(self.aAltitude)
+        # Error estimate: interpolation error at cell midpoints (exact evaluation) plus the
+        # curvature term h**2/8*max|rho''| from second differences (heuristic margin for off-midpoint maxima)
+        aMidpoints = self.aAltitude[:-1]+0.5*self.fResolution
+        fMidpointError = np.max(np.abs(0.5*(self.aDensity[:-1]+self.aDensity[1:]) - self._getExactDensity(aMidpoints)))
+        fCurvature = np.max(np.abs(np.diff(self.aDensity, 2)))/self.fResolution**2 if iCells > 1 else 0.0
+        self.fErrorEstimate = fMidpointError + self.fResolution**2/8.0*fCurvature
+        self._fInvResolution = 1.0/self.fResolution
+        self._aSlope = np.diff(self.aDensity)
+
+    def _getExactDensity(self, aAltitude: np.ndarray):
+        return getAirDensity(self.fRefPressure, self.fRefTemp, -aAltitude, self.fRefHumidity, self.dcParameters)
+
+    def getDensity(self, aAltitude: np.ndarray | float):
+        """
+        Air density [kg/m3] at given altitude(s) [m]
+        """
+        aAltitude = np.asarray(aAltitude, dtype=float)
+        aPosition = (aAltitude-self.fMinAltitude)*self._fInvResolution
+        aIndex = np.clip(aPosition.astype(np.intp), 0, self._aSlope.size-1)
+        aDensity = self.aDensity.take(aIndex) + self._aSlope.take(aIndex)*(aPosition-aIndex)
+        if aAltitude.size and (aAltitude.min() < self.fMinAltitude or aAltitude.max() > self.fMaxAltitude):
+            bOutside = (aAltitude < self.fMinAltitude) | (aAltitude > self.fMaxAltitude)
+            aDensity = np.where(bOutside, self._getExactDensity(np.where(bOutside, aAltitude, self.fMinAltitude)), aDensity)
+        return aDensity
+
+@functools.lru_cache(maxsize=ATMOSPHERE_TABLE_CACHE_SIZE)
+def _getAtmosphereTable(fRefPressure: float, fRefTemp: float, fRefHumidity: float, fMinAltitude: float, fMaxAltitude: float, fResolution: float, fTargetError: float | None, fGAcceleration: float):
+    return CAtmosphereTable(fRefPressure, fRefTemp, fRefHumidity, fMinAltitude, fMaxAltitude, fResolution, fTargetError, {'G_ACCELERATION': fGAcceleration})
+
+def getAtmosphereTable(
+        fRefPressure: float,
+        fRefTemp: float,
+        fRefHumidity: float = 0.0,
+        fMinAltitude: float = 0.0,
+        fMaxAltitude: float = 10000.0,
+        fResolution: float = 10.0,
+        fTargetError: float | None = None,
+        dcParameters: dict = INPUT_PARAMETERS
+    ):
+    """
+    Cached CAtmosphereTable for given reference state (LRU, ATMOSPHERE_TABLE_CACHE_SIZE entries)
+    """
+    return _getAtmosphereTable(
+        float(fRefPressure), float(fRefTemp), float(fRefHumidity), float(fMinAltitude), float(fMaxAltitude),
+        float(fResolution), None if fTargetError is None else float(fTargetError), float(dcParameters['G_ACCELERATION'])
+    )
@@ -3,6 +3,10 @@ Parachute class definition
 """
 
 from Calculations.ConstantParameters import *
+import warnings
+from collections.abc import Mapping
+from Calculations.Parameters import CParameterSet, DEFAULT_PARAMETERS, getParameterSet
+from Calculations.Inflation import integrateInflation, INFLATION_STEPS, INFLATION_DURATION
 import numpy as np
 
 def getDiamaterFromVelocity(_TargetVelocity: np.ndarray | float, fMass: float, dcParameters: dict = INPUT_PARAMETERS):
@@ -28,18 +32,63 @@ def calculateDiameterVelocityRelationship(
     aDiameters = getDiamaterFromVelocity(aTargetVelocity, fMass, dcParameters)
     return aTargetVelocity, aDiameters
 
+# Fixed record schema of an evaluated design (CParachute.toRecord, CParachuteBatch.toRecords)
+PARACHUTE_RECORD_FIELDS = (
+    "mass", "diameter", "open_velocity", "canopy_area", "drag_area", "inflation_time",
+    "ballistic_parameter", "mass_ratio", "gnf", "opening_impulse", "oscalc", "pflanz", "simplified"
+)
+PARACHUTE_RECORD_DTYPE = np.dtype([(sField, np.float64) for sField in PARACHUTE_RECORD_FIELDS])
+PEAK_LOAD_METHODS = ("oscalc", "pflanz", "simplified")
+
+class CInflationTimeWarning(UserWarning):
+    """
+    Generalized non-dimensional inflation time below 4 - outside the validity range of OSCALC
+    """
+
+class CPeakOpeningLoad(Mapping):
+    """
+    Peak opening loads [N] - fixed schema with the dict interface of the method names
+    (cLoads['pflanz'], 'oscalc' in cLoads, dict(cLoads), json.dumps(dict(cLoads))), values also as attributes
+    """
+
+    __slots__ = PEAK_LOAD_METHODS
+
+    def __init__(self, oscalc: float | np.ndarray, pflanz: float | np.ndarray, simplified: float | np.ndarray):
+        self.oscalc = oscalc
+        self.pflanz = pflanz
+        self.simplified = simplified
+
+    def __getitem__(self, sKey: str):
+        if sKey not in PEAK_LOAD_METHODS: raise KeyError(sKey)
+        return getattr(self, sKey)
+
+    def __iter__(self):
+        return iter(PEAK_LOAD_METHODS)
+
+    def __len__(self):
+        return len(PEAK_LOAD_METHODS)
+
+    def __repr__(self):
+        return f"CPeakOpeningLoad({', '.join(f'{sKey}={getattr(self, sKey)!r}' for sKey in PEAK_LOAD_METHODS)})"
+
 class CParachute():
 
+    __slots__ = (
+        "dcParameters", "fMass", "fCanopyDiameter", "fCanopyArea", "fOpenInitVelocity", "fVehicleDragArea", "fInflationTime",
+        "fBallisticParameter", "fGNFInf", "fMassRatio", "fOpeningImpulse", "fPeakOpeningLoadOSCALC", "fPeakOpeningLoadPflanz", "fPeakOpeningLoadSimplified"
+    )
+
     def __init__(
             self,
             fMass: float,
             fCanopyDiameter: float,
             fOpenInitVelocity: float,
-            dcParameters: dict = INPUT_PARAMETERS    
+            dcParameters: CParameterSet | dict = DEFAULT_PARAMETERS
         ):
       
-        # Constant parameters
-        self.dcParameters = dcParameters
+        # Constant parameters (immutable parameter set - values read as attributes)
+        self.dcParameters = getParameterSet(dcParameters)
+        cParameters = self.dcParameters
         # Mass
         self.fMass = fMass
         # Canopy parameters
@@ -48,29 +97,26 @@ class CParachute():
         # Velocity
         self.fOpenInitVelocity = fOpenInitVelocity
         # Drag
-        self.fVehicleDragArea = self.dcParameters["DRAG_COEFF"]*self.fCanopyArea
+        self.fVehicleDragArea = cParameters.fDragCoeff*self.fCanopyArea
         # Get inflation time
         # t_inf = n*D_0/(V_1**k)
-        self.fInflationTime = self.dcParameters["INFLATION_CANOPY_FILL_CONST"]*self.fCanopyDiameter/(self.fOpenInitVelocity**self.dcParameters["DECCELERATION_EXPONENT"])
+        self.fInflationTime = cParameters.fFillConst*self.fCanopyDiameter/(self.fOpenInitVelocity**cParameters.fDeccelerationExponent)
         
     def getBallisticParameter(self):
         """
         Ballistic parameter [-] - Pflanz method
         """ 
-        # A = 2*m/(C_d*S_o*ro*V_1*t_inf)
-        self.fBallisticParameter = 2.0*self.fMass/(self.fVehicleDragArea*self.dcParameters["AIR_DENSITY"]*self.fOpenInitVelocity*self.fInflationTime)
+        # A = 2*m/(C_d*S_o*ro*V_1*t_inf) = m/(0.5*ro*C_d*S_o*V_1*t_inf)
+        self.fBallisticParameter = self.fMass/(self.dcParameters.fHalfDensityDrag*self.fCanopyArea*self.fOpenInitVelocity*self.fInflationTime)
         return self.fBallisticParameter
     
     def getPeakOpeningLoadPflanz(self):
         """
         Peak opening load [N] - Pflanz method
         """
-        # Dynamic pressure at the start of inflation
-        # q_1 = (ro*V_1**2)/2        
-        fPressure = self.dcParameters["AIR_DENSITY"]*self.fOpenInitVelocity**2/2
-        # Peak opening load
-        # F_max = q_1*C_d*S_o*C_x*X_1
-        self.fPeakOpeningLoadPflanz = fPressure*self.dcParameters["OPENING_LOAD_SHOCK_FACTOR"]*self.fVehicleDragArea*self.dcParameters["OPENING_FORCE_REDUCTION_FACTOR"]
+        # Peak opening load - dynamic pressure at the start of inflation q_1 = (ro*V_1**2)/2
+        # F_max = q_1*C_d*S_o*C_x*X_1 = (0.5*ro*C_d)*V_1**2*S_o*(C_x*X_1)
+        self.fPeakOpeningLoadPflanz = self.dcParameters.fHalfDensityDrag*self.fOpenInitVelocity**2*self.fCanopyArea*self.dcParameters.fLoadFactor
         return self.fPeakOpeningLoadPflanz
     
     def getPeakOpeningLoadOSCALC(self):
@@ -81,20 +127,33 @@ class CParachute():
         # n_inf = t_inf*V_0/S_o
         fSNFInf = self.fInflationTime * self.fOpenInitVelocity / self.fCanopyArea
         # Generalized non-dimensional inflation time
-        fGNFInf = fSNFInf * self.fCanopyArea * self.dcParameters["DRAG_INTEGRAL"] / np.sqrt(self.fVehicleDragArea)
-        if fGNFInf < 4.0: print(f"Generalized non-dimensional inflation time is too low ({fGNFInf})!")
+        self.fGNFInf = fSNFInf * self.fCanopyArea * self.dcParameters.fDragIntegral / np.sqrt(self.fVehicleDragArea)
+        if self.fGNFInf < 4.0: warnings.warn(f"Generalized non-dimensional inflation time is too low ({self.fGNFInf})!", CInflationTimeWarning, stacklevel=2)
         # Mass ratio
         # R_m = ro*(C_d*S_o)**(3/2)/m
-        self.fMassRatio = self.dcParameters["AIR_DENSITY"] * self.fVehicleDragArea**(3/2) / self.fMass 
-        # Peak opening load
-        self.fPeakOpeningLoadOSCALC = self.dcParameters["AIR_DENSITY"]/2.0*self.fOpenInitVelocity**2*self.fVehicleDragArea*1.25
+        self.fMassRatio = self.dcParameters.fAirDensity * self.fVehicleDragArea**(3/2) / self.fMass 
+        # Peak opening load and impulse - inflation coupled with the deceleration
+        dcInflation = self.getOpeningForceHistory(bHistory=False)
+        self.fOpeningImpulse = dcInflation["impulse"]
+        self.fPeakOpeningLoadOSCALC = dcInflation["peak_load"]
         return self.fPeakOpeningLoadOSCALC
+
+    def getOpeningForceHistory(self, iSteps: int = INFLATION_STEPS, fDuration: float = INFLATION_DURATION, bHistory: bool = True):
+        """
+        Opening force history F(t) during inflation, peak load and impulse (see integrateInflation)
+        """
+        cParameters = self.dcParameters
+        return integrateInflation(
+            self.fMass, self.fVehicleDragArea, self.fInflationTime, self.fOpenInitVelocity,
+            cParameters.fAirDensity, cParameters.fGAcceleration, cParameters.fDragIntegral, iSteps, fDuration, bHistory
+        )
     
     def getPeakOpeningLoadSimplified(self):
         """
         Peak opening load [N] - Simplified method
         """
-        self.fPeakOpeningLoadSimplified = self.dcParameters["AIR_DENSITY"]*self.fOpenInitVelocity**2*self.fVehicleDragArea*self.dcParameters["OPENING_LOAD_SHOCK_FACTOR"]*self.dcParameters["OPENING_FORCE_REDUCTION_FACTOR"]/2
+        # F_max = ro*V_1**2*C_d*S_o*C_x*X_1/2
+        self.fPeakOpeningLoadSimplified = self.dcParameters.fHalfDensityDrag*self.fOpenInitVelocity**2*self.fCanopyArea*self.dcParameters.fLoadFactor
         return self.fPeakOpeningLoadSimplified
     
     def getPeakOpeningLoad(self):
@@ -104,8 +163,135 @@ class CParachute():
         * OSCALC method ('oscalc')
         * Pflanz method ('pflanz')
         """
-        dcDataOut = {}
-        dcDataOut['oscalc'] = self.getPeakOpeningLoadOSCALC()
-        dcDataOut['pflanz'] = self.getPeakOpeningLoadPflanz()
-        dcDataOut['simplified'] = self.getPeakOpeningLoadSimplified()
-        return dcDataOut
+        return CPeakOpeningLoad(self.getPeakOpeningLoadOSCALC(), self.getPeakOpeningLoadPflanz(), self.getPeakOpeningLoadSimplified())
+
+    def toRecord(self, aRecord: np.ndarray | None = None):
+        """
+        Inputs and all outputs as a PARACHUTE_RECORD_DTYPE record - written into aRecord
+        (e.g. a row view of a shared structured array) or a new 0-d record
+        """
+        if aRecord is None: aRecord = np.empty((), dtype=PARACHUTE_RECORD_DTYPE)
+        cLoads = self.getPeakOpeningLoad()
+        for sField, fValue in zip(PARACHUTE_RECORD_FIELDS, (
+                self.fMass, self.fCanopyDiameter, self.fOpenInitVelocity, self.fCanopyArea, self.fVehicleDragArea, self.fInflationTime,
+                self.getBallisticParameter(), self.fMassRatio, self.fGNFInf, self.fOpeningImpulse, cLoads.oscalc, cLoads.pflanz, cLoads.simplified
+            )):
+            aRecord[sField] = fValue
+        return aRecord
+
+
+class CParachuteBatch():
+    """
+    Struct-of-arrays counterpart of CParachute - evaluates many canopies at once.
+    Mass, diameter and opening velocity are arrays (broadcast against each other),
+    values in dcParameters may be scalars or per-row arrays.
+    Every quantity uses the same expressions as CParachute, so results agree
+    with the scalar class up to the last-bit rounding of the vectorized power.
+    """
+
+    def __init__(
+            self,
+            aMass: np.ndarray | float,
+            aCanopyDiameter: np.ndarray | float,
+            aOpenInitVelocity: np.ndarray | float,
+            dcParameters: dict = INPUT_PARAMETERS
+        ):
+
+        # Constant parameters (scalars or per-row arrays)
+        self.dcParameters = {sKey: np.asarray(_Value, dtype=np.result_type(_Value, float)) for sKey, _Value in dcParameters.items()}
+        # Broadcast inputs to a common shape
+        self.fMass, self.fCanopyDiameter, self.fOpenInitVelocity = np.broadcast_arrays(
+            np.asarray(aMass, dtype=np.result_type(aMass, float)),
+            np.asarray(aCanopyDiameter, dtype=np.result_type(aCanopyDiameter, float)),
+            np.asarray(aOpenInitVelocity, dtype=np.result_type(aOpenInitVelocity, float))
+        )
+        # Canopy parameters
+        self.fCanopyArea = (self.fCanopyDiameter/2.0)**2*np.pi
+        # Drag
+        self.fVehicleDragArea = self.dcParameters["DRAG_COEFF"]*self.fCanopyArea
+        # Derived constants of CParameterSet - 0.5*ro*C_d [kg/m3], C_x*X_1 [-]
+        self.fHalfDensityDrag = 0.5*self.dcParameters["AIR_DENSITY"]*self.dcParameters["DRAG_COEFF"]
+        self.fLoadFactor = self.dcParameters["OPENING_LOAD_SHOCK_FACTOR"]*self.dcParameters["OPENING_FORCE_REDUCTION_FACTOR"]
+        # Get inflation time
+        # t_inf = n*D_0/(V_1**k)
+        self.fInflationTime = self.dcParameters["INFLATION_CANOPY_FILL_CONST"]*self.fCanopyDiameter/(self.fOpenInitVelocity**self.dcParameters["DECCELERATION_EXPONENT"])
+
+    def __len__(self):
+        return self.fMass.size
+
+    def getBallisticParameter(self):
+        """
+        Ballistic parameter [-] - Pflanz method
+        """
+        # A = 2*m/(C_d*S_o*ro*V_1*t_inf) = m/(0.5*ro*C_d*S_o*V_1*t_inf)
+        self.fBallisticParameter = self.fMass/(self.fHalfDensityDrag*self.fCanopyArea*self.fOpenInitVelocity*self.fInflationTime)
+        return self.fBallisticParameter
+
+    def getPeakOpeningLoadPflanz(self):
+        """
+        Peak opening load [N] - Pflanz method
+        """
+        # F_max = q_1*C_d*S_o*C_x*X_1 = (0.5*ro*C_d)*V_1**2*S_o*(C_x*X_1)
+        self.fPeakOpeningLoadPflanz = self.fHalfDensityDrag*self.fOpenInitVelocity**2*self.fCanopyArea*self.fLoadFactor
+        return self.fPeakOpeningLoadPflanz
+
+    def getPeakOpeningLoadOSCALC(self, bWarn: bool = True):
+        """
+        Peak opening load [N] - OSCALC method
+        """
+        # n_inf = t_inf*V_0/S_o
+        fSNFInf = self.fInflationTime * self.fOpenInitVelocity / self.fCanopyArea
+        # Generalized non-dimensional inflation time
+        self.fGNFInf = fSNFInf * self.fCanopyArea * self.dcParameters["DRAG_INTEGRAL"] / np.sqrt(self.fVehicleDragArea)
+        iTooLow = np.count_nonzero(np.real(self.fGNFInf) < 4.0)
+        if iTooLow and bWarn: warnings.warn(f"Generalized non-dimensional inflation time is too low for {iTooLow} of {self.fGNFInf.size} cases!", CInflationTimeWarning, stacklevel=2)
+        # R_m = ro*(C_d*S_o)**(3/2)/m
+        self.fMassRatio = self.dcParameters["AIR_DENSITY"] * self.fVehicleDragArea**(3/2) / self.fMass
+        # Peak opening load and impulse - inflation coupled with the deceleration
+        dcInflation = self.getOpeningForceHistory(bHistory=False)
+        self.fOpeningImpulse = dcInflation["impulse"]
+        self.fPeakOpeningLoadOSCALC = dcInflation["peak_load"]
+        return self.fPeakOpeningLoadOSCALC
+
+    def getOpeningForceHistory(self, iSteps: int = INFLATION_STEPS, fDuration: float = INFLATION_DURATION, bHistory: bool = True):
+        """
+        Opening force histories F(t) during inflation, peak loads and impulses (see integrateInflation),
+        histories have the step axis last
+        """
+        return integrateInflation(
+            self.fMass, self.fVehicleDragArea, self.fInflationTime, self.fOpenInitVelocity,
+            self.dcParameters["AIR_DENSITY"], self.dcParameters["G_ACCELERATION"], self.dcParameters["DRAG_INTEGRAL"], iSteps, fDuration, bHistory
+        )
+
+    def getPeakOpeningLoadSimplified(self):
+        """
+        Peak opening load [N] - Simplified method
+        """
+        # F_max = ro*V_1**2*C_d*S_o*C_x*X_1/2
+        self.fPeakOpeningLoadSimplified = self.fHalfDensityDrag*self.fOpenInitVelocity**2*self.fCanopyArea*self.fLoadFactor
+        return self.fPeakOpeningLoadSimplified
+
+    def getPeakOpeningLoad(self):
+        """
+        Peak opening load [N] arrays:
+        * Simplified method ('simplified')
+        * OSCALC method ('oscalc')
+        * Pflanz method ('pflanz')
+        """
+        return CPeakOpeningLoad(self.getPeakOpeningLoadOSCALC(), self.getPeakOpeningLoadPflanz(), self.getPeakOpeningLoadSimplified())
+
+    def toRecords(self, aOut: np.ndarray | None = None, bWarn: bool = True):
+        """
+        Inputs and all outputs as a flat PARACHUTE_RECORD_DTYPE structured array -
+        written into aOut (e.g. a slice of a shared or memory-mapped array) or a new array
+        """
+        if aOut is None: aOut = np.empty(len(self), dtype=PARACHUTE_RECORD_DTYPE)
+        aOut["oscalc"] = np.ravel(self.getPeakOpeningLoadOSCALC(bWarn=bWarn))
+        for sField, _Value in (
+                ("mass", self.fMass), ("diameter", self.fCanopyDiameter), ("open_velocity", self.fOpenInitVelocity),
+                ("canopy_area", self.fCanopyArea), ("drag_area", self.fVehicleDragArea), ("inflation_time", self.fInflationTime),
+                ("ballistic_parameter", self.getBallisticParameter()), ("mass_ratio", self.fMassRatio), ("gnf", self.fGNFInf), ("opening_impulse", self.fOpeningImpulse),
+                ("pflanz", self.getPeakOpeningLoadPflanz()), ("simplified", self.getPeakOpeningLoadSimplified())
+            ):
+            aOut[sField] = np.ravel(np.broadcast_to(_Value, self.fMass.shape))
+        return aOut
@@ -0,0 +1,426 @@
+"""
+Time-domain descent simulation
+"""
+
+from Calculations.ConstantParameters import *
+from Calculations.CParachute import CParachute, CParachuteBatch
+from Calculations.Air import getAirDensity
+from Calculations.AtmosphereTable import CAtmosphereTable
+from Calculations.Atmosphere import CLayeredAtmosphere
+import numpy as np
+import warnings
+
+class CDescentConvergenceWarning(UserWarning):
+    """
+    Batch descents still integrated after iMaxIterations - their statistics are left as NaN
+    """
+
+# Kaps-Rentrop 4(3) Rosenbrock coefficients (Shampine parameter set)
+_GAM = 1/2
+_A21, _A31, _A32 = 2.0, 48/25, 6/25
+_C21, _C31, _C32 = -8.0, 372/25, 12/5
+_C41, _C42, _C43 = -112/125, -54/125, -2/5
+_B1, _B2, _B3, _B4 = 19/9, 1/2, 25/108, 125/108
+_E1, _E2, _E4 = 17/54, 7/36, 125/108
+_C1X, _C2X, _C3X, _C4X = 1/2, -3/2, 121/50, 29/250
+_A2X, _A3X = 1.0, 3/5
+
+def getDensityPolynomial(
+        fMaxAltitude: float,
+        fRefPressure: float,
+        fRefTemp: float,
+        fRefHumidity: float = 0.0,
+        iDegree: int = 6,
+        dcParameters: dict = INPUT_PARAMETERS,
+        cAtmosphere: CAtmosphereTable | CLayeredAtmosphere | None = None
+    ):
+    """
+    Fit air density [kg/m3] between ground and fMaxAltitude [m] (altitude measured upwards
+    from the reference point) with a polynomial in x = 2*h/fMaxAltitude-1.
+    Density is sampled at Chebyshev nodes with a single vectorized getAirDensity call
+    (or cAtmosphere.getDensity - the reference state is ignored then).
+    Returns (power series coefficients from the highest order, max abs. residual at the nodes [kg/m3]).
+    """
+    fSpan = max(float(fMaxAltitude), 1.0)
+    aNodes = np.cos(np.pi*(np.arange(2*iDegree+1)+0.5)/(2*iDegree+1))
+    aAltitude = (aNodes+1.0)*fSpan/2.0
+    aDensity = cAtmosphere.getDensity(aAltitude) if cAtmosphere is not None else getAirDensity(fRefPressure, fRefTemp, -aAltitude, fRefHumidity, dcParameters)
+    aVandermonde = np.vander(aNodes, iDegree+1)
+    aCoefficients = np.linalg.lstsq(aVandermonde, aDensity, rcond=None)[0]
+    fError = np.max(np.abs(aVandermonde@aCoefficients - aDensity))
+    return aCoefficients, fError
+
+def simulateDescent(
+        cParachute: CParachute,
+        fDeploymentAltitude: float,
+        fRefPressure: float = 101325.0,
+        fRefTemp: float = 288.15,
+        fRefHumidity: float = 0.0,
+        fRelTol: float = 1e-5,
+        fAbsTol: float = 1e-4,
+        fMaxStep: float = 10.0,
+        fMaxTime: float = 3600.0,
+        bStoreHistory: bool = True,
+        cAtmosphere: CAtmosphereTable | CLayeredAtmosphere | None = None
+    ):
+    """
+    Integrate vertical descent from deployment altitude [m] to the ground.
+    The reference atmosphere (pressure [Pa], temperature [K], humidity [-]) is given at ground level,
+    or the density is taken from cAtmosphere (e.g. CLayeredAtmosphere).
+    Drag area grows linearly from zero to its full value over the inflation time of the canopy.
+    Velocity relaxation towards terminal velocity is stiff for explicit schemes, so the equations are
+    integrated with an adaptive Kaps-Rentrop (Rosenbrock 4(3)) method and an analytic Jacobian.
+    Returns dict with:
+    * time history ('time', 'altitude', 'velocity', 'drag_force') - only if bStoreHistory
+    * 'landing_time' [s], 'impact_velocity' [m/s], 'max_drag_force' [N], 'steps' [-]
+    """
+    dcParameters = cParachute.dcParameters
+    fMass = cParachute.fMass
+    fG = dcParameters["G_ACCELERATION"]
+    fDragArea = cParachute.fVehicleDragArea
+    fInflationTime = cParachute.fInflationTime
+
+    # Density lookup - smooth 6th order polynomial fit of the atmosphere model (no kinks for the step control)
+    aCoefficients, _ = getDensityPolynomial(fDeploymentAltitude, fRefPressure, fRefTemp, fRefHumidity, iDegree=6, dcParameters=dcParameters, cAtmosphere=cAtmosphere)
+    fC0, fC1, fC2, fC3, fC4, fC5, fC6 = aCoefficients.tolist()
+    fScale = 2.0/max(float(fDeploymentAltitude), 1.0)
+    fInvInflationTime = 1.0/fInflationTime if fInflationTime > 0.0 else 0.0
+    # Drag constant: C_d*S/(2*m)
+    fDragConst = 0.5*fDragArea/fMass
+
+    # State: altitude [m] (upwards), velocity [m/s] (positive downwards)
+    # dh/dt = -V, dV/dt = g - rho*C_d*S*V**2/(2*m)
+    def getAcceleration(fT, fH, fV):
+        fX = fH*fScale-1.0
+        fRho = (((((fC0*fX+fC1)*fX+fC2)*fX+fC3)*fX+fC4)*fX+fC5)*fX+fC6
+        fRamp = 1.0 if fT >= fInflationTime else fT*fInvInflationTime
+        return fG - fRho*fRamp*fDragConst*fV*fV
+
+    fT, fH, fV = 0.0, float(fDeploymentAltitude), float(cParachute.fOpenInitVelocity)
+    fF0 = getAcceleration(fT, fH, fV)
+    fMaxDrag = 0.0
+    # Last two drag samples - used to refine the peak with a parabola through three points
+    fTPrev, fDragPrev, fTLast, fDragLast = 0.0, 0.0, 0.0, 0.0
+    lTime, lAltitude, lVelocity, lDrag = [fT], [fH], [fV], [0.0]
+    fStep = min(fMaxStep, 0.01*fInflationTime if fInflationTime > 0.0 else 0.01)
+    iSteps = 0
+
+    while fT < fMaxTime:
+        # Do not step over the end of inflation (kink in the drag area)
+        fDt = fStep
+        if fT < fInflationTime < fT+fDt: fDt = fInflationTime-fT
+
+        # Jacobian and explicit time derivative at the start of the step
+        fX = fH*fScale-1.0
+        fRho = (((((fC0*fX+fC1)*fX+fC2)*fX+fC3)*fX+fC4)*fX+fC5)*fX+fC6
+        fDRho = ((((6*fC0*fX+5*fC1)*fX+4*fC2)*fX+3*fC3)*fX+2*fC4)*fX+fC5
+        bInflating = fT < fInflationTime
+        fRamp = fT*fInvInflationTime if bInflating else 1.0
+        fJVH = -fDRho*fScale*fRamp*fDragConst*fV*fV
+        fJVV = -2.0*fRho*fRamp*fDragConst*fV
+        fTV = -fRho*fInvInflationTime*fDragConst*fV*fV if bInflating else 0.0
+
+        # M = I/(gamma*dt) - J, J = [[0, -1], [fJVH, fJVV]]
+        fA = 1.0/(_GAM*fDt)
+        fInvDet = 1.0/(fA*(fA-fJVV)+fJVH)
+        fM22 = fA-fJVV
+
+        # g1 = M^-1 (F0 + dt*c1*T)
+        fRH, fRV = -fV, fF0+fDt*_C1X*fTV
+        fG1H, fG1V = (fM22*fRH-fRV)*fInvDet, (fJVH*fRH+fA*fRV)*fInvDet
+        # g2 = M^-1 (F(y + a21*g1) + dt*c2*T + c21*g1/dt)
+        fHS, fVS = fH+_A21*fG1H, fV+_A21*fG1V
+        fFS = getAcceleration(fT+_A2X*fDt, fHS, fVS)
+        fRH, fRV = -fVS+_C21*fG1H/fDt, fFS+fDt*_C2X*fTV+_C21*fG1V/fDt
+        fG2H, fG2V = (fM22*fRH-fRV)*fInvDet, (fJVH*fRH+fA*fRV)*fInvDet
+        # g3 = M^-1 (F(y + a31*g1 + a32*g2) + dt*c3*T + (c31*g1 + c32*g2)/dt)
+        fHS, fVS = fH+_A31*fG1H+_A32*fG2H, fV+_A31*fG1V+_A32*fG2V
+        fFS = getAcceleration(fT+_A3X*fDt, fHS, fVS)
+        fRH, fRV = -fVS+(_C31*fG1H+_C32*fG2H)/fDt, fFS+fDt*_C3X*fTV+(_C31*fG1V+_C32*fG2V)/fDt
+        fG3H, fG3V = (fM22*fRH-fRV)*fInvDet, (fJVH*fRH+fA*fRV)*fInvDet
+        # g4 = M^-1 (F(y + a31*g1 + a32*g2) + dt*c4*T + (c41*g1 + c42*g2 + c43*g3)/dt)
+        fRH, fRV = -fVS+(_C41*fG1H+_C42*fG2H+_C43*fG3H)/fDt, fFS+fDt*_C4X*fTV+(_C41*fG1V+_C42*fG2V+_C43*fG3V)/fDt
+        fG4H, fG4V = (fM22*fRH-fRV)*fInvDet, (fJVH*fRH+fA*fRV)*fInvDet
+        fHNew = fH+_B1*fG1H+_B2*fG2H+_B3*fG3H+_B4*fG4H
+        fVNew = fV+_B1*fG1V+_B2*fG2V+_B3*fG3V+_B4*fG4V
+
+        # Error estimate (scaled max norm)
+        fErrH = (_E1*fG1H+_E2*fG2H+_E4*fG4H)/(fAbsTol+fRelTol*max(abs(fH), abs(fHNew)))
+        fErrV = (_E1*fG1V+_E2*fG2V+_E4*fG4V)/(fAbsTol+fRelTol*max(abs(fV), abs(fVNew)))
+        fErr = max(abs(fErrH), abs(fErrV))
+        fFactor = 4.0 if fErr == 0.0 else min(4.0, max(0.2, 0.9*fErr**(-0.25 if fErr <= 1.0 else -1/3)))
+
+        if fErr > 1.0:
+            fStep = fDt*fFactor
+            continue
+
+        iSteps += 1
+        if fHNew <= 0.0:
+            # Ground impact - locate the event on the cubic Hermite interpolant of the step
+            fF1 = getAcceleration(fT+fDt, fHNew, fVNew)
+            fTau = _findHermiteRoot(fH, fHNew, -fDt*fV, -fDt*fVNew)
+            fV = _evaluateHermite(fV, fVNew, fDt*fF0, fDt*fF1, fTau)
+            fT = fT+fTau*fDt
+            fH = 0.0
+        else:
+            fT, fH, fV = fT+fDt, fHNew, fVNew
+            fF0 = getAcceleration(fT, fH, fV)
+
+        fX = fH*fScale-1.0
+        fRho = (((((fC0*fX+fC1)*fX+fC2)*fX+fC3)*fX+fC4)*fX+fC5)*fX+fC6
+        fDrag = fRho*fDragConst*fMass*(1.0 if fT >= fInflationTime else fT*fInvInflationTime)*fV*fV
+        if fDrag > fMaxDrag: fMaxDrag = fDrag
+        elif fDragPrev < fDragLast > fDrag and fTLast != fInflationTime:
+            fMaxDrag = max(fMaxDrag, _getParabolaPeak(fTPrev, fDragPrev, fTLast, fDragLast, fT, fDrag))
+        fTPrev, fDragPrev, fTLast, fDragLast = fTLast, fDragLast, fT, fDrag
+        if bStoreHistory:
+            lTime.append(fT)
+            lAltitude.append(fH)
+            lVelocity.append(fV)
+            lDrag.append(fDrag)
+        if fH <= 0.0: break
+        fStep = min(fMaxStep, fDt*fFactor) if fDt == fStep else min(fMaxStep, fStep)
+
+    dcDataOut = {
+        'landing_time': fT,
+        'impact_velocity': fV,
+        'max_drag_force': fMaxDrag,
+        'steps': iSteps,
+    }
+    if bStoreHistory:
+        dcDataOut['time'] = np.array(lTime)
+        dcDataOut['altitude'] = np.array(lAltitude)
+        dcDataOut['velocity'] = np.array(lVelocity)
+        dcDataOut['drag_force'] = np.array(lDrag)
+    return dcDataOut
+
+def _getParabolaPeak(fX0: float, fY0: float, fX1: float, fY1: float, fX2: float, fY2: float):
+    """
+    Maximum of the parabola through three points (fY1 is the largest sample)
+    """
+    fD01, fD12 = (fY1-fY0)/(fX1-fX0), (fY2-fY1)/(fX2-fX1)
+    fCurvature = (fD12-fD01)/(fX2-fX0)
+    if fCurvature >= 0.0: return fY1
+    fXPeak = 0.5*(fX0+fX1) - fD01/(2.0*fCurvature)
+    return fY1 + fD01*(fXPeak-fX1) + fCurvature*(fXPeak-fX0)*(fXPeak-fX1)
+
+def _evaluateHermite(fY0: float, fY1: float, fD0: float, fD1: float, fTau: float):
+    """
+    Cubic Hermite interpolant on the unit interval (derivatives scaled by the step)
+    """
+    fTau2 = fTau*fTau
+    fTau3 = fTau2*fTau
+    return (2*fTau3-3*fTau2+1)*fY0 + (fTau3-2*fTau2+fTau)*fD0 + (-2*fTau3+3*fTau2)*fY1 + (fTau3-fTau2)*fD1
+
+def _findHermiteRoot(fY0: float, fY1: float, fD0: float, fD1: float, iIterations: int = 50, fTol: float = 1e-12):
+    """
+    Root of the cubic Hermite interpolant in <0, 1> (fY0 > 0 >= fY1) - bisection-safeguarded Newton
+    """
+    fLo, fHi = 0.0, 1.0
+    fTau = fY0/(fY0-fY1)
+    for _ in range(iIterations):
+        fY = _evaluateHermite(fY0, fY1, fD0, fD1, fTau)
+        if abs(fY) < fTol: break
+        if fY > 0.0: fLo = fTau
+        else: fHi = fTau
+        fTau2 = fTau*fTau
+        fDY = (6*fTau2-6*fTau)*fY0 + (3*fTau2-4*fTau+1)*fD0 + (-6*fTau2+6*fTau)*fY1 + (3*fTau2-2*fTau)*fD1
+        fTauNew = fTau-fY/fDY if fDY != 0.0 else 0.5*(fLo+fHi)
+        fTau = fTauNew if fLo < fTauNew < fHi else 0.5*(fLo+fHi)
+    return fTau
+
+def simulateDescentBatch(
+        cParachutes: CParachuteBatch,
+        aDeploymentAltitude: np.ndarray | float,
+        aRefPressure: np.ndarray | float = 101325.0,
+        aRefTemp: np.ndarray | float = 288.15,
+        aRefHumidity: np.ndarray | float = 0.0,
+        lStatistics: list | tuple = ('landing_time', 'max_drag_force', 'impact_velocity'),
+        fRelTol: float = 1e-5,
+        fAbsTol: float = 1e-4,
+        fMaxStep: float = 10.0,
+        fMaxTime: float = 3600.0,
+        iMaxIterations: int = 100000,
+        cAtmosphere: CAtmosphereTable | CLayeredAtmosphere | None = None
+    ):
+    """
+    Integrate N vertical descents at once - batch counterpart of simulateDescent.
+    All trajectories are advanced in lock-step (one adaptive Rosenbrock step per row and iteration)
+    on NumPy state arrays. Air density of all active trajectories is evaluated with one
+    getAirDensity call per stage and landed trajectories are dropped from the working set.
+    If cAtmosphere is given (see getAtmosphereTable, CLayeredAtmosphere), density is taken from it and the
+    per-row reference atmosphere arguments are ignored.
+    Only the requested summary statistics are kept (memory O(N)):
+    * 'landing_time' [s], 'impact_velocity' [m/s], 'max_drag_force' [N], 'steps' [-]
+    and always 'converged' - rows finished (landed or reached fMaxTime) within iMaxIterations;
+    the others keep NaN statistics and a CDescentConvergenceWarning is issued.
+    """
+    iCount = len(cParachutes)
+    tShape = cParachutes.fMass.shape
+    def toRow(_Value):
+        return np.broadcast_to(np.asarray(_Value, dtype=float), tShape).ravel().copy()
+
+    # Per-row constants of the working set
+    dcWork = {
+        'index': np.arange(iCount),
+        'g': toRow(cParachutes.dcParameters["G_ACCELERATION"]),
+        'drag_const': toRow(0.5*cParachutes.fVehicleDragArea/cParachutes.fMass),
+        'mass': toRow(cParachutes.fMass),
+        'inflation_time': toRow(cParachutes.fInflationTime),
+        'ref_pressure': toRow(aRefPressure),
+        'ref_temp': toRow(aRefTemp),
+        'ref_humidity': toRow(aRefHumidity),
+        # State
+        't': np.zeros(iCount),
+        'h': toRow(aDeploymentAltitude),
+        'v': toRow(cParachutes.fOpenInitVelocity),
+        'steps': np.zeros(iCount, dtype=np.int64),
+        'max_drag': np.zeros(iCount),
+        't_prev': np.zeros(iCount), 'drag_prev': np.zeros(iCount),
+        't_last': np.zeros(iCount), 'drag_last': np.zeros(iCount),
+    }
+    dcWork['inv_inflation_time'] = np.divide(1.0, dcWork['inflation_time'], out=np.zeros(iCount), where=dcWork['inflation_time'] > 0.0)
+    dcWork['step'] = np.minimum(fMaxStep, np.where(dcWork['inflation_time'] > 0.0, 0.01*dcWork['inflation_time'], 0.01))
+
+    def getDensity(aH):
+        if cAtmosphere is not None: return cAtmosphere.getDensity(aH)
+        return getAirDensity(dcWork['ref_pressure'], dcWork['ref_temp'], -aH, dcWork['ref_humidity'], {'G_ACCELERATION': dcWork['g']})
+
+    def getRamp(aT):
+        return np.where(aT >= dcWork['inflation_time'], 1.0, aT*dcWork['inv_inflation_time'])
+
+    dcWork['rho'] = getDensity(dcWork['h'])
+    dcWork['f0'] = dcWork['g'] - dcWork['rho']*getRamp(dcWork['t'])*dcWork['drag_const']*dcWork['v']**2
+
+    dcResults = {
+        'landing_time': np.full(iCount, np.nan),
+        'impact_velocity': np.full(iCount, np.nan),
+        'max_drag_force': np.full(iCount, np.nan),
+        'steps': np.zeros(iCount, dtype=np.int64),
+        'converged': np.zeros(iCount, dtype=bool),
+    }
+
+    for _ in range(iMaxIterations):
+        if dcWork['index'].size == 0: break
+        aT, aH, aV, aF0, aRho = dcWork['t'], dcWork['h'], dcWork['v'], dcWork['f0'], dcWork['rho']
+        aTInf, aInvTInf, aK = dcWork['inflation_time'], dcWork['inv_inflation_time'], dcWork['drag_const']
+
+        # Do not step over the end of inflation (kink in the drag area)
+        bClipped = (aT < aTInf) & (aTInf < aT+dcWork['step'])
+        aDt = np.where(bClipped, aTInf-aT, dcWork['step'])
+
+        # Jacobian (density gradient by forward difference) and explicit time derivative
+        fDelta = 1e-3
+        aDRho = (getDensity(aH+fDelta)-aRho)/fDelta
+        bInflating = aT < aTInf
+        aRamp = np.where(bInflating, aT*aInvTInf, 1.0)
+        aJVH = -aDRho*aRamp*aK*aV*aV
+        aJVV = -2.0*aRho*aRamp*aK*aV
+        aTV = np.where(bInflating, -aRho*aInvTInf*aK*aV*aV, 0.0)
+
+        # M = I/(gamma*dt) - J
+        aA = 1.0/(_GAM*aDt)
+        aM22 = aA-aJVV
+        aInvDet = 1.0/(aA*aM22+aJVH)
+
+        def solve(aRH, aRV):
+            return (aM22*aRH-aRV)*aInvDet, (aJVH*aRH+aA*aRV)*aInvDet
+
+        aG1H, aG1V = solve(-aV, aF0+aDt*_C1X*aTV)
+        aHS, aVS = aH+_A21*aG1H, aV+_A21*aG1V
+        aFS = dcWork['g'] - getDensity(aHS)*getRamp(aT+_A2X*aDt)*aK*aVS*aVS
+        aG2H, aG2V = solve(-aVS+_C21*aG1H/aDt, aFS+aDt*_C2X*aTV+_C21*aG1V/aDt)
+        aHS, aVS = aH+_A31*aG1H+_A32*aG2H, aV+_A31*aG1V+_A32*aG2V
+        aFS = dcWork['g'] - getDensity(aHS)*getRamp(aT+_A3X*aDt)*aK*aVS*aVS
+        aG3H, aG3V = solve(-aVS+(_C31*aG1H+_C32*aG2H)/aDt, aFS+aDt*_C3X*aTV+(_C31*aG1V+_C32*aG2V)/aDt)
+        aG4H, aG4V = solve(-aVS+(_C41*aG1H+_C42*aG2H+_C43*aG3H)/aDt, aFS+aDt*_C4X*aTV+(_C41*aG1V+_C42*aG2V+_C43*aG3V)/aDt)
+        aHNew = aH+_B1*aG1H+_B2*aG2H+_B3*aG3H+_B4*aG4H
+        aVNew = aV+_B1*aG1V+_B2*aG2V+_B3*aG3V+_B4*aG4V
+
+        # Error estimate (scaled max norm)
+        aErr = np.maximum(
+            np.abs(_E1*aG1H+_E2*aG2H+_E4*aG4H)/(fAbsTol+fRelTol*np.maximum(np.abs(aH), np.abs(aHNew))),
+            np.abs(_E1*aG1V+_E2*aG2V+_E4*aG4V)/(fAbsTol+fRelTol*np.maximum(np.abs(aV), np.abs(aVNew)))
+        )
+        with np.errstate(divide='ignore'):
+            aFactor = np.where(aErr == 0.0, 4.0, np.clip(0.9*aErr**np.where(aErr <= 1.0, -0.25, -1/3), 0.2, 4.0))
+        bAccepted = aErr <= 1.0
+        dcWork['step'] = np.where(bAccepted & bClipped, np.minimum(fMaxStep, dcWork['step']), np.minimum(fMaxStep, aDt*aFactor))
+
+        # New state of accepted rows (rejected rows keep the old state)
+        aTNew = aT+aDt
+        aRhoNew = getDensity(aHNew)
+        aFNew = dcWork['g'] - aRhoNew*getRamp(aTNew)*aK*aVNew*aVNew
+        bLanded = bAccepted & (aHNew <= 0.0)
+        if np.any(bLanded):
+            # Ground impact - locate the event on the cubic Hermite interpolant of the step
+            aTau = _findHermiteRootBatch(aH[bLanded], aHNew[bLanded], -aDt[bLanded]*aV[bLanded], -aDt[bLanded]*aVNew[bLanded])
+            aVNew[bLanded] = _evaluateHermite(aV[bLanded], aVNew[bLanded], aDt[bLanded]*aF0[bLanded], aDt[bLanded]*aFNew[bLanded], aTau)
+            aTNew[bLanded] = aT[bLanded]+aTau*aDt[bLanded]
+            aHNew[bLanded] = 0.0
+            aRhoNew = getDensity(aHNew)
+        dcWork['t'] = np.where(bAccepted, aTNew, aT)
+        dcWork['h'] = np.where(bAccepted, aHNew, aH)
+        dcWork['v'] = np.where(bAccepted, aVNew, aV)
+        dcWork['rho'] = np.where(bAccepted, aRhoNew, aRho)
+        dcWork['f0'] = np.where(bAccepted, aFNew, aF0)
+        dcWork['steps'] += bAccepted
+
+        # Peak drag force - step end samples refined with a parabola through three points
+        aDrag = dcWork['rho']*getRamp(dcWork['t'])*aK*dcWork['mass']*dcWork['v']**2
+        bPeak = bAccepted & (dcWork['drag_prev'] < dcWork['drag_last']) & (dcWork['drag_last'] > aDrag) & (dcWork['t_last'] != aTInf)
+        aMaxDrag = np.where(bAccepted, np.maximum(dcWork['max_drag'], aDrag), dcWork['max_drag'])
+        if np.any(bPeak):
+            aMaxDrag[bPeak] = np.maximum(aMaxDrag[bPeak], _getParabolaPeakBatch(
+                dcWork['t_prev'][bPeak], dcWork['drag_prev'][bPeak], dcWork['t_last'][bPeak], dcWork['drag_last'][bPeak], dcWork['t'][bPeak], aDrag[bPeak]))
+        dcWork['max_drag'] = aMaxDrag
+        for sPrev, sLast, aNew in (('t_prev', 't_last', dcWork['t']), ('drag_prev', 'drag_last', aDrag)):
+            dcWork[sPrev] = np.where(bAccepted, dcWork[sLast], dcWork[sPrev])
+            dcWork[sLast] = np.where(bAccepted, aNew, dcWork[sLast])
+
+        # Stream out finished trajectories and shrink the working set
+        bDone = (dcWork['h'] <= 0.0) | (dcWork['t'] >= fMaxTime)
+        if np.any(bDone):
+            aIndex = dcWork['index'][bDone]
+            dcResults['landing_time'][aIndex] = np.where(dcWork['h'][bDone] <= 0.0, dcWork['t'][bDone], np.nan)
+            dcResults['impact_velocity'][aIndex] = np.where(dcWork['h'][bDone] <= 0.0, dcWork['v'][bDone], np.nan)
+            dcResults['max_drag_force'][aIndex] = dcWork['max_drag'][bDone]
+            dcResults['steps'][aIndex] = dcWork['steps'][bDone]
+            dcResults['converged'][aIndex] = True
+            bKeep = ~bDone
+            dcWork = {sKey: aValue[bKeep] for sKey, aValue in dcWork.items()}
+
+    if dcWork['index'].size:
+        dcResults['steps'][dcWork['index']] = dcWork['steps']
+        warnings.warn(f"{dcWork['index'].size} of {iCount} descents did not finish within {iMaxIterations} iterations!", CDescentConvergenceWarning, stacklevel=2)
+    return {sKey: dcResults[sKey].reshape(tShape) for sKey in list(dict.fromkeys(list(lStatistics)+['converged']))}
+
+def _getParabolaPeakBatch(aX0: np.ndarray, aY0: np.ndarray, aX1: np.ndarray, aY1: np.ndarray, aX2: np.ndarray, aY2: np.ndarray):
+    """
+    Vectorized _getParabolaPeak
+    """
+    aD01, aD12 = (aY1-aY0)/(aX1-aX0), (aY2-aY1)/(aX2-aX1)
+    aCurvature = (aD12-aD01)/(aX2-aX0)
+    bConcave = aCurvature < 0.0
+    aCurvature = np.where(bConcave, aCurvature, -1.0)
+    aXPeak = 0.5*(aX0+aX1) - aD01/(2.0*aCurvature)
+    return np.where(bConcave, aY1 + aD01*(aXPeak-aX1) + aCurvature*(aXPeak-aX0)*(aXPeak-aX1), aY1)
+
+def _findHermiteRootBatch(aY0: np.ndarray, aY1: np.ndarray, aD0: np.ndarray, aD1: np.ndarray, iIterations: int = 50, fTol: float = 1e-12):
+    """
+    Vectorized _findHermiteRoot
+    """
+    aLo, aHi = np.zeros_like(aY0), np.ones_like(aY0)
+    aTau = aY0/(aY0-aY1)
+    for _ in range(iIterations):
+        aY = _evaluateHermite(aY0, aY1, aD0, aD1, aTau)
+        if np.all(np.abs(aY) < fTol): break
+        bPositive = aY > 0.0
+        aLo = np.where(bPositive, aTau, aLo)
+        aHi = np.where(bPositive, aHi, aTau)
+        aTau2 = aTau*aTau
+        aDY = (6*aTau2-6*aTau)*aY0 + (3*aTau2-4*aTau+1)*aD0 + (-6*aTau2+6*aTau)*aY1 + (3*aTau2-2*aTau)*aD1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            aTauNew = aTau-aY/aDY
+        aTau = np.where((aLo < aTauNew) & (aTauNew < aHi), aTauNew, 0.5*(aLo+aHi))
+    return aTau
@@ -0,0 +1,247 @@
+"""
+Wind drift under canopy - landing points and dispersion footprint
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from Calculations.ConstantParameters import *
+from Calculations.Air import getAirDensity
+from Calculations.AtmosphereTable import CAtmosphereTable
+from Calculations.Atmosphere import CLayeredAtmosphere
+from Calculations.CParachute import getVelocityFromDiameter
+from Calculations.MonteCarlo import sampleDistribution, mergeMoments
+
+# Sampled inputs besides the INPUT_PARAMETERS entries
+DRIFT_INPUTS = ("MASS", "CANOPY_DIAMETER", "DEPLOY_ALTITUDE", "WIND_SPEED_FACTOR", "WIND_DIRECTION_OFFSET")
+DRIFT_DEFAULT_INPUTS = {"WIND_SPEED_FACTOR": 1.0, "WIND_DIRECTION_OFFSET": 0.0}
+DRIFT_ALTITUDE_STEP = 25.0 # [m] - altitude layer of the drift integration
+DRIFT_ELLIPSE_LEVELS = (0.5, 0.9, 0.99)
+WIND_PROFILE_COLUMNS = ("altitude", "speed", "direction")
+
+class CWindProfile():
+    """
+    Layered wind profile - speed [m/s] and meteorological direction [deg] (where the wind blows from,
+    clockwise from north) at the given altitudes [m] above the reference point.
+    East/north components are interpolated linearly, outside the profile the nearest layer is used.
+    """
+
+    def __init__(self, aAltitude: np.ndarray | list, aSpeed: np.ndarray | list, aDirection: np.ndarray | list):
+        aAltitude, aSpeed, aDirection = (np.asarray(_Value, dtype=float).ravel() for _Value in (aAltitude, aSpeed, aDirection))
+        if not aAltitude.size == aSpeed.size == aDirection.size or aAltitude.size == 0:
+            raise ValueError("Wind profile needs the same, non-zero number of altitudes, speeds and directions")
+        aOrder = np.argsort(aAltitude, kind='stable')
+        self.aAltitude = aAltitude[aOrder]
+        self.aSpeed = aSpeed[aOrder]
+        self.aDirection = aDirection[aOrder]
+        # Wind blowing from the direction moves the vehicle towards the opposite one
+        aRadians = np.radians(self.aDirection)
+        self.aEast = -self.aSpeed*np.sin(aRadians)
+        self.aNorth = -self.aSpeed*np.cos(aRadians)
+
+    def getWind(self, aAltitude: np.ndarray | float):
+        """
+        East and north wind components [m/s] at the given altitudes
+        """
+        return np.interp(aAltitude, self.aAltitude, self.aEast), np.interp(aAltitude, self.aAltitude, self.aNorth)
+
+def loadWindProfile(sPath: str, sSeparator: str = ';'):
+    """
+    Read a wind profile from a CSV (sSeparator) or Parquet file with the
+    'altitude' [m], 'speed' [m/s] and 'direction' [deg] columns
+    """
+    dfProfile = pd.read_parquet(sPath) if sPath.lower().endswith(".parquet") else pd.read_csv(sPath, sep=sSeparator)
+    lMissing = [sColumn for sColumn in WIND_PROFILE_COLUMNS if sColumn not in dfProfile.columns]
+    if lMissing: raise KeyError(f"Missing wind profile columns: {lMissing}")
+    return CWindProfile(*(dfProfile[sColumn].to_numpy(dtype=float) for sColumn in WIND_PROFILE_COLUMNS))
+
+def getLandingPoints(
+        cWind: CWindProfile,
+        _Mass: np.ndarray | float,
+        _Diameter: np.ndarray | float,
+        _DeployAltitude: np.ndarray | float,
+        _SpeedFactor: np.ndarray | float = 1.0,
+        _DirectionOffset: np.ndarray | float = 0.0,
+        fRefPressure: float = 101325.0,
+        fRefTemp: float = 288.15,
+        fRefHumidity: float = 0.0,
+        cAtmosphere: CAtmosphereTable | CLayeredAtmosphere | None = None,
+        dcParameters: dict = INPUT_PARAMETERS,
+        fStep: float = DRIFT_ALTITUDE_STEP
+    ):
+    """
+    Landing points of canopies deployed at _DeployAltitude [m] above the reference point, for all
+    inputs at once (broadcast against each other, parameters may be arrays as well).
+    The canopy descends at the local steady velocity (getVelocityFromDiameter at the air density of the
+    layer) and drifts with the wind; the wind is scaled by _SpeedFactor and turned by _DirectionOffset [deg].
+    Integrated over fStep [m] altitude layers - no trajectories are stored.
+    Returns a dict: 'east', 'north' [m] (from the deployment point), 'descent_time' [s]
+    """
+    tShape = np.broadcast_shapes(*(np.shape(_Value) for _Value in (_Mass, _Diameter, _DeployAltitude, _SpeedFactor, _DirectionOffset)))
+    aAltitude = np.broadcast_to(np.asarray(_DeployAltitude, dtype=float), tShape)
+    # V = V_1/sqrt(ro) - velocity at unit air density, scaled per layer
+    aVelocity = getVelocityFromDiameter(np.asarray(_Diameter, dtype=float), np.asarray(_Mass, dtype=float), {**dcParameters, "AIR_DENSITY": 1.0})
+    aRadians = np.radians(_DirectionOffset)
+    aCos, aSin = np.asarray(_SpeedFactor)*np.cos(aRadians), np.asarray(_SpeedFactor)*np.sin(aRadians)
+
+    # Layers from the ground to the highest deployment, density and wind at the layer midpoints
+    fTop = float(np.max(aAltitude, initial=0.0))
+    iLayers = max(1, int(np.ceil(fTop/fStep)))
+    aBottom = np.arange(iLayers)*fStep
+    aMid = aBottom+0.5*fStep
+    if cAtmosphere is not None:
+        aDensity = cAtmosphere.getDensity(aMid)
+    else:
+        # One density profile for all rows - sampled gravity is averaged
+        aDensity = getAirDensity(fRefPressure, fRefTemp, -aMid, fRefHumidity, {"G_ACCELERATION": float(np.mean(dcParameters["G_ACCELERATION"]))})
+    aWindEast, aWindNorth = cWind.getWind(aMid)
+
+    aTime = np.zeros(tShape)
+    aEast = np.zeros(tShape)
+    aNorth = np.zeros(tShape)
+    for iLayer in range(iLayers):
+        # dt = dh/V(h), partial top layer below the deployment altitude
+        aHeight = np.clip(aAltitude-aBottom[iLayer], 0.0, fStep)
+        aStep = aHeight*np.sqrt(aDensity[iLayer])/aVelocity
+        aTime += aStep
+        # Wind turned clockwise (from north) by the direction offset
+        aEast += aStep*(aWindEast[iLayer]*aCos+aWindNorth[iLayer]*aSin)
+        aNorth += aStep*(aWindNorth[iLayer]*aCos-aWindEast[iLayer]*aSin)
+    return {"east": aEast, "north": aNorth, "descent_time": aTime}
+
+def _getDistributions(dcDistributions: dict, dcParameters: dict):
+    """
+    Complete the distribution definitions with constant INPUT_PARAMETERS and default wind perturbation values
+    """
+    lUnknown = [sKey for sKey in dcDistributions if sKey not in dcParameters and sKey not in DRIFT_INPUTS]
+    if lUnknown: raise KeyError(f"Unknown drift inputs: {lUnknown}")
+    lMissing = [sKey for sKey in DRIFT_INPUTS if sKey not in dcDistributions and sKey not in DRIFT_DEFAULT_INPUTS]
+    if lMissing: raise KeyError(f"Missing drift inputs: {lMissing}")
+    dcOut = {sKey: float(_Value) for sKey, _Value in dcParameters.items()}
+    dcOut.update(DRIFT_DEFAULT_INPUTS)
+    dcOut.update(dcDistributions)
+    return dcOut
+
+def _evaluateSamples(cWind: CWindProfile, dcDistributions: dict, cSeedSequence: np.random.SeedSequence, iSamples: int, dcAtmosphere: dict):
+    """
+    Sample inputs with an independent generator and calculate the landing points
+    """
+    cGenerator = np.random.default_rng(cSeedSequence)
+    dcSamples = {sKey: sampleDistribution(cGenerator, _Distribution, iSamples) for sKey, _Distribution in dcDistributions.items()}
+    dcParameters = {sKey: _Value for sKey, _Value in dcSamples.items() if sKey not in DRIFT_INPUTS}
+    return getLandingPoints(
+        cWind, dcSamples["MASS"], dcSamples["CANOPY_DIAMETER"], dcSamples["DEPLOY_ALTITUDE"],
+        dcSamples["WIND_SPEED_FACTOR"], dcSamples["WIND_DIRECTION_OFFSET"], dcParameters=dcParameters, **dcAtmosphere
+    )
+
+def _runChunk(tArgs: tuple):
+    """
+    Worker - evaluate one chunk and reduce it to the footprint raster and moments
+    """
+    cWind, dcDistributions, iSeed, iChunk, iSamples, dcAtmosphere, aEastEdges, aNorthEdges = tArgs
+    dcPoints = _evaluateSamples(cWind, dcDistributions, np.random.SeedSequence(iSeed, spawn_key=(1, iChunk)), iSamples, dcAtmosphere)
+    bValid = np.isfinite(dcPoints["east"]) & np.isfinite(dcPoints["north"])
+    aEast, aNorth, aTime = dcPoints["east"][bValid], dcPoints["north"][bValid], dcPoints["descent_time"][bValid]
+    aCounts, _, _ = np.histogram2d(aEast, aNorth, bins=(aEastEdges, aNorthEdges))
+    aPoints = np.stack([aEast, aNorth])
+    aMean = aPoints.mean(axis=1) if aEast.size else np.zeros(2)
+    aDeviation = aPoints-aMean[:, None]
+    return {
+        'counts': aCounts.astype(np.int64),
+        'count': aEast.size,
+        'mean': aMean,
+        # Summed deviation products - [[ee, en], [en, nn]]
+        'm2': aDeviation@aDeviation.T,
+        'time_sum': aTime.sum(),
+        'time_min': aTime.min(initial=np.inf),
+        'time_max': aTime.max(initial=-np.inf),
+    }
+
+def getDispersionEllipse(aMean: np.ndarray, aCovariance: np.ndarray, fLevel: float):
+    """
+    Ellipse containing fLevel of a bivariate normal distribution with the given mean and covariance (east, north):
+    semi-axes sqrt(-2*ln(1-p)*lambda). Returns dict: 'level', 'center' [m], 'semi_major', 'semi_minor' [m],
+    'azimuth' [deg] - major axis direction clockwise from north
+    """
+    aEigenvalues, aEigenvectors = np.linalg.eigh(aCovariance)
+    fScale = np.sqrt(-2.0*np.log(1.0-fLevel))
+    fEast, fNorth = aEigenvectors[:, 1]
+    return {
+        'level': fLevel,
+        'center': aMean,
+        'semi_major': fScale*np.sqrt(max(aEigenvalues[1], 0.0)),
+        'semi_minor': fScale*np.sqrt(max(aEigenvalues[0], 0.0)),
+        'azimuth': np.degrees(np.arctan2(fEast, fNorth)) % 180.0,
+    }
+
+def runDriftDispersion(
+        cWind: CWindProfile,
+        dcDistributions: dict,
+        iSamples: int,
+        iSeed: int = 0,
+        dcParameters: dict = INPUT_PARAMETERS,
+        iWorkers: int | None = None,
+        iChunkSize: int = 250000,
+        iBins: int = 100,
+        lLevels: list | tuple = DRIFT_ELLIPSE_LEVELS,
+        fRefPressure: float = 101325.0,
+        fRefTemp: float = 288.15,
+        fRefHumidity: float = 0.0,
+        cAtmosphere: CAtmosphereTable | CLayeredAtmosphere | None = None,
+        fStep: float = DRIFT_ALTITUDE_STEP
+    ):
+    """
+    Landing dispersion of canopies drifting in the cWind profile.
+    dcDistributions maps MASS [kg], CANOPY_DIAMETER [m], DEPLOY_ALTITUDE [m], WIND_SPEED_FACTOR [-] (default 1),
+    WIND_DIRECTION_OFFSET [deg] (default 0) and any INPUT_PARAMETERS key to a distribution definition
+    (see sampleDistribution); parameters not given are taken from dcParameters.
+    Chunks are evaluated on a process pool as in runMonteCarlo (iWorkers=1 runs in-process) and reduced
+    to a footprint raster and moments, so memory does not grow with iSamples.
+    Returns dict:
+    * 'samples', 'mean' [m] (east, north), 'covariance' [m2]
+    * 'ellipses' - getDispersionEllipse for each of lLevels
+    * 'raster' - {'counts' (iBins x iBins, east x north), 'east_edges', 'north_edges' [m], 'outside'}
+    * 'descent_time' - {'mean', 'min', 'max'} [s]
+    """
+    if iSamples <= 0: raise ValueError(f"Number of samples has to be positive ({iSamples})")
+    dcDistributions = _getDistributions(dcDistributions, dcParameters)
+    dcAtmosphere = {"fRefPressure": fRefPressure, "fRefTemp": fRefTemp, "fRefHumidity": fRefHumidity, "cAtmosphere": cAtmosphere, "fStep": fStep}
+
+    # Pilot run (own random stream) to fix the raster extent
+    dcPilot = _evaluateSamples(cWind, dcDistributions, np.random.SeedSequence(iSeed, spawn_key=(0,)), min(iSamples, 20000), dcAtmosphere)
+    lEdges = []
+    for sKey in ("east", "north"):
+        aValues = dcPilot[sKey][np.isfinite(dcPilot[sKey])]
+        fLow, fHigh = (aValues.min(), aValues.max()) if aValues.size else (0.0, 1.0)
+        fMargin = 0.25*(fHigh-fLow) if fHigh > fLow else max(abs(fLow), 1.0)*1e-3
+        lEdges.append(np.linspace(fLow-fMargin, fHigh+fMargin, iBins+1))
+
+    lChunks = [
+        (cWind, dcDistributions, iSeed, iChunk, min(iChunkSize, iSamples-iChunk*iChunkSize), dcAtmosphere, *lEdges)
+        for iChunk in range(int(np.ceil(iSamples/iChunkSize)))
+    ]
+    if iWorkers == 1:
+        lResults = list(map(_runChunk, lChunks))
+    else:
+        with ProcessPoolExecutor(max_workers=iWorkers) as cExecutor:
+            lResults = list(cExecutor.map(_runChunk, lChunks))
+
+    aCounts = np.sum([dcReduced['counts'] for dcReduced in lResults], axis=0)
+    tMoments = (0, np.zeros(2), np.zeros((2, 2)))
+    for dcReduced in lResults:
+        tMoments = mergeMoments(tMoments, (dcReduced['count'], dcReduced['mean'], dcReduced['m2']))
+    iCount, aMean, aM2 = tMoments
+    aCovariance = aM2/iCount
+    return {
+        'samples': iSamples,
+        'mean': aMean,
+        'covariance': aCovariance,
+        'ellipses': [getDispersionEllipse(aMean, aCovariance, fLevel) for fLevel in lLevels],
+        'raster': {'counts': aCounts, 'east_edges': lEdges[0], 'north_edges': lEdges[1], 'outside': int(iCount-aCounts.sum())},
+        'descent_time': {
+            'mean': sum(dcReduced['time_sum'] for dcReduced in lResults)/iCount,
+            'min': min(dcReduced['time_min'] for dcReduced in lResults),
+            'max': max(dcReduced['time_max'] for dcReduced in lResults),
+        },
+    }
@@ -0,0 +1,195 @@
+"""
+Design-space grid solver - N-dimensional result cubes over any combination of inputs
+"""
+
+import os
+import numpy as np
+
+from Calculations.ConstantParameters import *
+from Calculations.CParachute import CParachuteBatch, getDiamaterFromVelocity, getVelocityFromDiameter
+
+# Grid axes besides the INPUT_PARAMETERS entries
+GRID_INPUTS = ("MASS", "TARGET_VELOCITY", "CANOPY_DIAMETER", "OPEN_VELOCITY")
+GRID_OUTPUTS = ("diameter", "descent_velocity", "inflation_time", "ballistic_parameter", "pflanz", "oscalc", "simplified")
+GRID_CHUNK_SIZE = 1000000
+GRID_MAX_RAM_SIZE = 2**31 # [B] - larger result cubes require sMemmapDir
+
+class CGridResult():
+    """
+    Labelled N-D result cubes - dcResults maps output name -> array of shape tShape,
+    dcAxes maps axis name -> axis values (in the order of array dimensions)
+    """
+
+    def __init__(self, dcAxes: dict, dcResults: dict):
+        self.dcAxes = dcAxes
+        self.dcResults = dcResults
+        self.tShape = tuple(aValues.size for aValues in dcAxes.values())
+
+    def __getitem__(self, sOutput: str):
+        return self.dcResults[sOutput]
+
+    def _getIndexer(self, sAxis: str, _Selection):
+        """
+        Label-based selection on one axis:
+        * scalar - nearest axis value (the axis is dropped)
+        * (low, high) - all axis values in the closed range
+        * slice - positional slice
+        """
+        aValues = self.dcAxes[sAxis]
+        if isinstance(_Selection, slice):
+            return _Selection
+        if isinstance(_Selection, (tuple, list)):
+            aIndex = np.flatnonzero((aValues >= _Selection[0]) & (aValues <= _Selection[1]))
+            return slice(aIndex[0], aIndex[-1]+1) if aIndex.size else slice(0, 0)
+        return int(np.argmin(np.abs(aValues-_Selection)))
+
+    def select(self, sOutput: str, **dcSelection):
+        """
+        Slice one result cube by axis labels (see _getIndexer), e.g.
+        select('pflanz', MASS=10.0, AIR_DENSITY=(1.0, 1.2)).
+        Returns (array view, dict of the remaining axes)
+        """
+        lUnknown = [sAxis for sAxis in dcSelection if sAxis not in self.dcAxes]
+        if lUnknown: raise KeyError(f"Unknown grid axes: {lUnknown}")
+        lIndexers = []
+        dcAxesOut = {}
+        for sAxis, aValues in self.dcAxes.items():
+            _Indexer = self._getIndexer(sAxis, dcSelection[sAxis]) if sAxis in dcSelection else slice(None)
+            lIndexers.append(_Indexer)
+            if isinstance(_Indexer, slice): dcAxesOut[sAxis] = aValues[_Indexer]
+        return self.dcResults[sOutput][tuple(lIndexers)], dcAxesOut
+
+    def toDataFrame(self, lOutputs: list | tuple | None = None, **dcSelection):
+        """
+        Long-format pandas DataFrame (one row per grid cell) of the selected sub-grid - for exports
+        """
+        import pandas as pd
+        lOutputs = list(self.dcResults) if lOutputs is None else list(lOutputs)
+        dcColumns = {}
+        for sOutput in lOutputs:
+            aValues, dcAxes = self.select(sOutput, **dcSelection)
+            dcColumns[sOutput] = np.ravel(aValues)
+        lGrids = np.meshgrid(*dcAxes.values(), indexing='ij') if dcAxes else []
+        dcLabels = {sAxis: np.ravel(aGrid) for sAxis, aGrid in zip(dcAxes, lGrids)}
+        return pd.DataFrame({**dcLabels, **dcColumns})
+
+    def iterDataFrames(self, lOutputs: list | tuple | None = None, iChunkSize: int = GRID_CHUNK_SIZE):
+        """
+        Long-format DataFrames of at most iChunkSize grid cells (C order) - streamed exports of large grids
+        """
+        import pandas as pd
+        lOutputs = list(self.dcResults) if lOutputs is None else list(lOutputs)
+        iTotal = int(np.prod(self.tShape))
+        for iStart in range(0, iTotal, iChunkSize):
+            aFlat = np.arange(iStart, min(iStart+iChunkSize, iTotal))
+            lIndex = np.unravel_index(aFlat, self.tShape)
+            dcColumns = {sAxis: aValues[aIndex] for (sAxis, aValues), aIndex in zip(self.dcAxes.items(), lIndex)}
+            for sOutput in lOutputs:
+                dcColumns[sOutput] = self.dcResults[sOutput].reshape(-1)[iStart:iStart+aFlat.size]
+            yield pd.DataFrame(dcColumns)
+
+def _getBlocks(tShape: tuple, iChunkSize: int):
+    """
+    Split the grid into blocks of at most iChunkSize cells (unless a single cell row is larger).
+    Axes before iSplitAxis are fixed per block, iSplitAxis is cut into ranges, later axes are full.
+    Yields (prefix index tuple, slice on iSplitAxis)
+    """
+    iSplitAxis = len(tShape)-1
+    while iSplitAxis > 0 and int(np.prod(tShape[iSplitAxis:])) <= iChunkSize:
+        iSplitAxis -= 1
+    iInner = int(np.prod(tShape[iSplitAxis+1:]))
+    iStep = max(1, iChunkSize//iInner)
+    for tPrefix in np.ndindex(*tShape[:iSplitAxis]):
+        for iStart in range(0, tShape[iSplitAxis], iStep):
+            yield tPrefix, slice(iStart, min(iStart+iStep, tShape[iSplitAxis]))
+
+def _evaluateBlock(dcInputs: dict, dcParameters: dict, lOutputs: list):
+    """
+    Evaluate the parachute model on broadcastable inputs
+    """
+    dcBlockParameters = {sKey: dcInputs.get(sKey, _Value) for sKey, _Value in dcParameters.items()}
+    if "CANOPY_DIAMETER" in dcInputs:
+        aDiameter = dcInputs["CANOPY_DIAMETER"]
+    else:
+        aDiameter = getDiamaterFromVelocity(dcInputs["TARGET_VELOCITY"], dcInputs["MASS"], dcBlockParameters)
+    cParachutes = CParachuteBatch(dcInputs["MASS"], aDiameter, dcInputs["OPEN_VELOCITY"], dcBlockParameters)
+    dcOut = {}
+    for sOutput in lOutputs:
+        if sOutput == 'diameter': dcOut[sOutput] = cParachutes.fCanopyDiameter
+        elif sOutput == 'descent_velocity': dcOut[sOutput] = getVelocityFromDiameter(cParachutes.fCanopyDiameter, cParachutes.fMass, cParachutes.dcParameters)
+        elif sOutput == 'inflation_time': dcOut[sOutput] = cParachutes.fInflationTime
+        elif sOutput == 'ballistic_parameter': dcOut[sOutput] = cParachutes.getBallisticParameter()
+        elif sOutput == 'pflanz': dcOut[sOutput] = cParachutes.getPeakOpeningLoadPflanz()
+        elif sOutput == 'oscalc': dcOut[sOutput] = cParachutes.getPeakOpeningLoadOSCALC(bWarn=False)
+        elif sOutput == 'simplified': dcOut[sOutput] = cParachutes.getPeakOpeningLoadSimplified()
+    return dcOut
+
+def solveGrid(
+        dcAxes: dict,
+        lOutputs: list | tuple = GRID_OUTPUTS,
+        dcParameters: dict = INPUT_PARAMETERS,
+        iChunkSize: int = GRID_CHUNK_SIZE,
+        sMemmapDir: str | None = None,
+        dtype: type = np.float64,
+        fnProgress = None
+    ):
+    """
+    Evaluate the parachute model on the cartesian product of the given axes.
+    dcAxes maps MASS [kg], TARGET_VELOCITY [m/s] or CANOPY_DIAMETER [m], OPEN_VELOCITY [m/s]
+    and any INPUT_PARAMETERS key to 1-D axis values; scalar values are fixed inputs (not grid axes).
+    The product is never materialized - inputs are broadcast over blocks of at most iChunkSize cells,
+    so working memory does not depend on the grid size. The result cubes themselves take
+    len(lOutputs)*cells*itemsize bytes (5.6 GB for 10**8 cells and all 7 float64 outputs) - without
+    sMemmapDir they are allocated in RAM (up to GRID_MAX_RAM_SIZE, larger grids raise ValueError),
+    with sMemmapDir they are written to .npy memory-mapped files in that directory.
+    fnProgress(iDone, iTotal) is called after every block.
+    Returns CGridResult.
+    """
+    lUnknown = [sKey for sKey in dcAxes if sKey not in dcParameters and sKey not in GRID_INPUTS]
+    if lUnknown: raise KeyError(f"Unknown grid inputs: {lUnknown}")
+    lMissing = [sKey for sKey in ("MASS", "OPEN_VELOCITY") if sKey not in dcAxes]
+    if "TARGET_VELOCITY" not in dcAxes and "CANOPY_DIAMETER" not in dcAxes: lMissing.append("TARGET_VELOCITY or CANOPY_DIAMETER")
+    if lMissing: raise KeyError(f"Missing grid inputs: {lMissing}")
+    if "TARGET_VELOCITY" in dcAxes and "CANOPY_DIAMETER" in dcAxes: raise ValueError("Grid inputs TARGET_VELOCITY and CANOPY_DIAMETER are exclusive - give only one of them")
+    lUnknown = [sOutput for sOutput in lOutputs if sOutput not in GRID_OUTPUTS]
+    if lUnknown: raise KeyError(f"Unknown grid outputs: {lUnknown}")
+
+    dcFixed = {sKey: float(_Value) for sKey, _Value in dcAxes.items() if np.ndim(_Value) == 0}
+    dcGridAxes = {sKey: np.asarray(_Value, dtype=float).ravel() for sKey, _Value in dcAxes.items() if np.ndim(_Value) != 0}
+    if not dcGridAxes: raise ValueError("At least one grid input has to be an array of axis values")
+    tShape = tuple(aValues.size for aValues in dcGridAxes.values())
+    iTotal = int(np.prod(tShape))
+    iResultSize = len(lOutputs)*iTotal*np.dtype(dtype).itemsize
+    if sMemmapDir is None and iResultSize > GRID_MAX_RAM_SIZE:
+        raise ValueError(f"Result cubes take {iResultSize/2**30:.1f} GiB - give sMemmapDir to store them on disk")
+
+    dcResults = {}
+    for sOutput in lOutputs:
+        if sMemmapDir is None:
+            dcResults[sOutput] = np.empty(tShape, dtype=dtype)
+        else:
+            os.makedirs(sMemmapDir, exist_ok=True)
+            dcResults[sOutput] = np.lib.format.open_memmap(os.path.join(sMemmapDir, f"{sOutput}.npy"), mode='w+', dtype=dtype, shape=tShape)
+
+    iDone = 0
+    for tPrefix, cSlice in _getBlocks(tShape, iChunkSize):
+        # Block dimensions: split axis and all following axes
+        iFirstAxis = len(tPrefix)
+        dcInputs = dict(dcFixed)
+        for iAxis, (sKey, aValues) in enumerate(dcGridAxes.items()):
+            if iAxis < iFirstAxis:
+                dcInputs[sKey] = aValues[tPrefix[iAxis]]
+            else:
+                aAxisValues = aValues[cSlice] if iAxis == iFirstAxis else aValues
+                lShape = [1]*(len(tShape)-iFirstAxis)
+                lShape[iAxis-iFirstAxis] = -1
+                dcInputs[sKey] = aAxisValues.reshape(lShape)
+        tBlockShape = (cSlice.stop-cSlice.start,)+tShape[iFirstAxis+1:]
+        for sOutput, aValues in _evaluateBlock(dcInputs, dcParameters, lOutputs).items():
+            dcResults[sOutput][tPrefix+(cSlice,)] = np.broadcast_to(aValues, tBlockShape)
+        iDone += int(np.prod(tBlockShape))
+        if fnProgress is not None: fnProgress(iDone, iTotal)
+
+    for aValues in dcResults.values():
+        if isinstance(aValues, np.memmap): aValues.flush()
+    return CGridResult(dcGridAxes, dcResults)
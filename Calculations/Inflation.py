@@ -0,0 +1,118 @@
+"""
+Canopy inflation - opening force history coupled with the vehicle deceleration
+"""
+
+import cmath
+import functools
+import math
+import numpy as np
+
+INFLATION_STEPS = 60 # integration steps during inflation (and per inflation time after it)
+INFLATION_DURATION = 1.5 # integrated time span [t_inf]
+
+def getDragAreaExponent(_DragIntegral: np.ndarray | float):
+    """
+    Exponent j of the drag area growth C_dS(t)/C_dS_o = (t/t_inf)**j
+    with the given drag integral int_0^1 (C_dS/C_dS_o) d(t/t_inf) = 1/(j+1)
+    """
+    return 1.0/_DragIntegral-1.0
+
+def _getInflationGrid(_Exponent, iSteps: int, fDuration: float):
+    """
+    Normalized node times t/t_inf (graded as (i/iSteps)**2 during inflation - light vehicles peak early),
+    C_dS/C_dS_o at the nodes and averaged over the steps (Simpson) - floats or per-row arrays
+    """
+    fnRatio = lambda fTau: 0.0 if fTau == 0.0 else 1.0 if fTau >= 1.0 else fTau**_Exponent
+    tTimes = tuple((iStep/iSteps)**2 for iStep in range(iSteps+1))
+    tTimes += tuple(1.0+iStep/iSteps for iStep in range(1, round(iSteps*(fDuration-1.0))+1))
+    tNodes = tuple(fnRatio(fTau) for fTau in tTimes)
+    tMeans = tuple(
+        (tNodes[iStep]+4.0*fnRatio(0.5*(tTimes[iStep]+tTimes[iStep+1]))+tNodes[iStep+1])/6.0
+        for iStep in range(len(tTimes)-1)
+    )
+    return tTimes, tNodes, tMeans
+
+_getCachedInflationGrid = functools.lru_cache(maxsize=32)(_getInflationGrid)
+
+def integrateInflation(
+        _Mass: np.ndarray | float,
+        _DragArea: np.ndarray | float,
+        _InflationTime: np.ndarray | float,
+        _OpenVelocity: np.ndarray | float,
+        _AirDensity: np.ndarray | float,
+        _GAcceleration: np.ndarray | float,
+        _DragIntegral: np.ndarray | float,
+        iSteps: int = INFLATION_STEPS,
+        fDuration: float = INFLATION_DURATION,
+        bHistory: bool = True,
+        _InitialDragArea: np.ndarray | float = 0.0,
+        _ExtraDragArea: np.ndarray | float = 0.0
+    ):
+    """
+    Opening force history F(t) = ro*V**2/2*C_dS(t) of a canopy inflating from line stretch
+    (C_dS = 0 at the opening velocity V_1) to the full drag area C_dS_o at t_inf,
+    integrated together with the vertical deceleration m*dV/dt = m*g - F.
+    A reefed canopy opening further starts from _InitialDragArea instead of 0, the drag of other
+    canopies/the vehicle (_ExtraDragArea [m2]) decelerates the vehicle but is not part of F
+    over fDuration (at least 1) inflation times - iSteps steps until t_inf, iSteps per t_inf after it.
+    Inputs are floats or arrays (broadcast, complex-safe). Returns a dict:
+    * 'peak_load' [N], 'peak_time' [s], 'impulse' [N*s], 'final_velocity' [m/s], 'distance' [m]
+    * with bHistory also 'time' [s], 'velocity' [m/s], 'drag_area' [m2] and 'force' [N]
+      histories (step axis last)
+    """
+    tInputs = (_Mass, _DragArea, _InflationTime, _OpenVelocity, _AirDensity, _GAcceleration, _DragIntegral)
+    _Exponent = getDragAreaExponent(_DragIntegral)
+    bScalar = all(np.ndim(_Value) == 0 for _Value in tInputs)
+    if np.ndim(_Exponent) == 0:
+        tTimes, tNodes, tMeans = _getCachedInflationGrid(_Exponent.item() if isinstance(_Exponent, np.generic) else _Exponent, iSteps, fDuration)
+    else:
+        tTimes, tNodes, tMeans = _getInflationGrid(np.asarray(_Exponent), iSteps, fDuration)
+
+    # m*dV/dt = m*g - F, F = ro*V**2/2*(C_dS_i + (C_dS_o-C_dS_i)*r), r - growth ratio
+    _Deceleration = _AirDensity*(_DragArea-_InitialDragArea)/(2.0*_Mass)
+    _Force = _Mass*_Deceleration
+    _InitialForce = _AirDensity*_InitialDragArea/2.0
+    _ExtraDeceleration = _AirDensity*(_InitialDragArea+_ExtraDragArea)/(2.0*_Mass)
+
+    # Scalar inputs (CParachute) use the math module - numpy call overhead dominates otherwise
+    fnTanh = (cmath.tanh if any(np.iscomplexobj(_Value) for _Value in tInputs) else math.tanh) if bScalar else np.tanh
+    _Velocity = _OpenVelocity if bScalar else np.broadcast_arrays(_OpenVelocity, _Deceleration, _InflationTime)[0]*1.0
+    _Previous = (_InitialForce+_Force*tNodes[0])*_Velocity*_Velocity
+    _Peak = _Previous
+    _PeakTime = 0.0*_InflationTime
+    _Impulse = 0.0*_Previous
+    _Distance = 0.0*_Velocity
+    lVelocity, lForce = [_Velocity], [_Previous]
+    for iStep, fMean in enumerate(tMeans):
+        # Exact step of dV/dt = g - a*V**2 with a = k*C_dS/C_dS_o averaged over the step
+        # (stable for any step size): V' = w*(V + w*T)/(w + V*T), w = sqrt(g/a), T = tanh(a*w*dt)
+        _TimeStep = (tTimes[iStep+1]-tTimes[iStep])*_InflationTime
+        _A = _ExtraDeceleration+_Deceleration*fMean
+        _Terminal = (_GAcceleration/_A)**0.5
+        _Tanh = fnTanh(_A*_Terminal*_TimeStep)
+        _Start = _Velocity
+        _Velocity = _Terminal*(_Velocity+_Terminal*_Tanh)/(_Terminal+_Velocity*_Tanh)
+        _Distance = _Distance+0.5*_TimeStep*(_Start+_Velocity)
+        _Current = (_InitialForce+_Force*tNodes[iStep+1])*_Velocity*_Velocity
+        # Trapezoidal impulse, running peak (compared on the real part - complex-step safe)
+        _Impulse = _Impulse+0.5*_TimeStep*(_Previous+_Current)
+        if bScalar:
+            if _Current.real > _Peak.real: _Peak, _PeakTime = _Current, tTimes[iStep+1]*_InflationTime
+        else:
+            bPeak = np.real(_Current) > np.real(_Peak)
+            _Peak = np.where(bPeak, _Current, _Peak)
+            _PeakTime = np.where(bPeak, tTimes[iStep+1]*_InflationTime, _PeakTime)
+        _Previous = _Current
+        if bHistory:
+            lVelocity.append(_Velocity)
+            lForce.append(_Current)
+
+    dcResult = {"peak_load": _Peak, "peak_time": _PeakTime, "impulse": _Impulse, "final_velocity": _Velocity, "distance": _Distance}
+    if bHistory:
+        tShape = np.shape(_Current)
+        fnStack = lambda lValues: np.stack([np.broadcast_to(_Value, tShape) for _Value in lValues], axis=-1)
+        dcResult["time"] = fnStack([fTau*_InflationTime for fTau in tTimes])
+        dcResult["velocity"] = fnStack(lVelocity)
+        dcResult["drag_area"] = fnStack([_InitialDragArea+(_DragArea-_InitialDragArea)*fRatio for fRatio in tNodes])
+        dcResult["force"] = fnStack(lForce)
+    return dcResult
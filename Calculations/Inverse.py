@@ -0,0 +1,172 @@
+"""
+Inverse problems - canopy diameter or opening velocity for a given peak opening load limit
+"""
+
+import numpy as np
+
+from Calculations.ConstantParameters import *
+from Calculations.CParachute import CParachuteBatch
+
+LOAD_METHODS = ("pflanz", "oscalc", "simplified")
+INVERSE_SCAN_POINTS = 33 # log-spaced points of the initial bracket scan
+
+def solveBracketed(
+        fnFunction,
+        aLow: np.ndarray,
+        aHigh: np.ndarray,
+        fXTol: float = 1e-12,
+        fFTol: float = 0.0,
+        iMaxIterations: int = 200
+    ):
+    """
+    Vectorized root finding on brackets [aLow, aHigh] - Illinois (modified regula falsi) iterations,
+    guaranteed to converge like bisection but superlinear on smooth functions.
+    fnFunction(aX, aIndex) evaluates the function for the rows aIndex at points aX.
+    Rows are removed from the working set as soon as they converge.
+    Returns (aRoot, aConverged); rows without a sign change on the bracket are NaN.
+    """
+    aLow, aHigh = (np.array(_Value, dtype=float) for _Value in np.broadcast_arrays(aLow, aHigh))
+    iRows = aLow.size
+    aLow, aHigh = aLow.ravel(), aHigh.ravel()
+    aIndexAll = np.arange(iRows)
+    aLowValue = fnFunction(aLow, aIndexAll)
+    aHighValue = fnFunction(aHigh, aIndexAll)
+
+    aRoot = np.full(iRows, np.nan)
+    aConverged = np.zeros(iRows, dtype=bool)
+    # Roots on the bracket ends
+    for aX, aValue in ((aLow, aLowValue), (aHigh, aHighValue)):
+        bZero = np.abs(aValue) <= fFTol
+        aRoot[bZero] = aX[bZero]
+        aConverged |= bZero
+    bActive = ~aConverged & (np.sign(aLowValue) != np.sign(aHighValue)) & np.isfinite(aLowValue) & np.isfinite(aHighValue)
+    aIndex = np.flatnonzero(bActive)
+    aA, aFA, aB, aFB = aLow[aIndex], aLowValue[aIndex], aHigh[aIndex], aHighValue[aIndex]
+    aLast = aB.copy()
+
+    for _ in range(iMaxIterations):
+        if aIndex.size == 0: break
+        # Secant (false position) point, bisection if degenerate
+        aX = (aA*aFB-aB*aFA)/(aFB-aFA)
+        bBad = ~np.isfinite(aX) | (aX <= np.minimum(aA, aB)) | (aX >= np.maximum(aA, aB))
+        aX[bBad] = 0.5*(aA[bBad]+aB[bBad])
+        aFX = fnFunction(aX, aIndex)
+        # Keep the sign change between (A, B); halve the stale end value (Illinois)
+        bSwap = np.sign(aFX) != np.sign(aFB)
+        aA = np.where(bSwap, aB, aA)
+        aFA = np.where(bSwap, aFB, 0.5*aFA)
+        aB, aFB = aX, aFX
+
+        bDone = (np.abs(aFX) <= fFTol) | (np.abs(aX-aLast) <= fXTol*(1.0+np.abs(aX))) | (np.abs(aB-aA) <= fXTol*(1.0+np.abs(aX)))
+        aRoot[aIndex[bDone]] = aX[bDone]
+        aConverged[aIndex[bDone]] = True
+        bKeep = ~bDone
+        aIndex, aA, aFA, aB, aFB, aLast = aIndex[bKeep], aA[bKeep], aFA[bKeep], aB[bKeep], aFB[bKeep], aX[bKeep]
+
+    # Not converged within iMaxIterations - best estimate
+    aRoot[aIndex] = aB
+    return aRoot, aConverged
+
+def scanBracket(fnFunction, aLow: np.ndarray, aHigh: np.ndarray, iPoints: int = INVERSE_SCAN_POINTS):
+    """
+    Narrow the brackets [aLow, aHigh] (positive) to the first sign change from negative
+    to non-negative on a log-spaced scan - selects the first root of non-monotonic functions
+    (the integrated OSCALC load falls again for very large canopies).
+    Rows without such a change keep their original bracket.
+    """
+    aLow, aHigh = np.array(aLow, dtype=float), np.array(aHigh, dtype=float)
+    aIndexAll = np.arange(aLow.size)
+    aGrid = np.geomspace(aLow, aHigh, iPoints)
+    aNegative = np.stack([fnFunction(aPoint, aIndexAll) < 0.0 for aPoint in aGrid])
+    aFirst = np.argmax(~aNegative[1:] & aNegative[:-1], axis=0)
+    bFound = (~aNegative[1:] & aNegative[:-1]).any(axis=0)
+    aNewLow, aNewHigh = aLow.copy(), aHigh.copy()
+    aNewLow[bFound] = aGrid[aFirst[bFound], aIndexAll[bFound]]
+    aNewHigh[bFound] = aGrid[aFirst[bFound]+1, aIndexAll[bFound]]
+    return aNewLow, aNewHigh
+
+def _getRows(dcParameters: dict, aIndex: np.ndarray, iRows: int):
+    """
+    Parameters for the selected rows (per-row arrays are indexed, scalars passed through)
+    """
+    return {sKey: np.broadcast_to(_Value, iRows)[aIndex] if np.ndim(_Value) else _Value for sKey, _Value in dcParameters.items()}
+
+def _getLoadFactor(sMethod: str, dcParameters: dict):
+    """
+    Load factor K of the methods with a closed form F_max = K*ro*V_1**2/2*C_d*S_o, None otherwise
+    (OSCALC - integrated inflation, solved iteratively)
+    """
+    if sMethod in ("pflanz", "simplified"):
+        return np.asarray(dcParameters["OPENING_LOAD_SHOCK_FACTOR"])*np.asarray(dcParameters["OPENING_FORCE_REDUCTION_FACTOR"])
+    return None
+
+def _getLoad(sMethod: str, aMass: np.ndarray, aDiameter: np.ndarray, aOpenVelocity: np.ndarray, dcParameters: dict):
+    cParachutes = CParachuteBatch(aMass, aDiameter, aOpenVelocity, dcParameters)
+    if sMethod == "pflanz": return cParachutes.getPeakOpeningLoadPflanz()
+    if sMethod == "oscalc": return cParachutes.getPeakOpeningLoadOSCALC(bWarn=False)
+    return cParachutes.getPeakOpeningLoadSimplified()
+
+def _solveLoad(aLoadLimit, aMass, aDiameter, aOpenVelocity, sUnknown: str, sMethod: str, dcParameters: dict, bClosedForm: bool, tBracket: tuple):
+    if sMethod not in LOAD_METHODS: raise ValueError(f"Unknown load method: {sMethod}")
+    # Common shape of the inputs and the per-case parameter arrays
+    lInputs = [aLoadLimit, aMass, aDiameter, aOpenVelocity]
+    tShape = np.broadcast_shapes(*(np.shape(_Value) for _Value in lInputs+list(dcParameters.values())))
+    aLoadLimit, aMass, aDiameter, aOpenVelocity = (np.broadcast_to(np.asarray(_Value, dtype=float), tShape) for _Value in lInputs)
+    iRows = aLoadLimit.size
+    dcParameters = {sKey: np.broadcast_to(_Value, tShape).ravel() if np.ndim(_Value) else _Value for sKey, _Value in dcParameters.items()}
+    aLoadLimit, aMass, aDiameter, aOpenVelocity = aLoadLimit.ravel(), aMass.ravel(), aDiameter.ravel(), aOpenVelocity.ravel()
+
+    _LoadFactor = _getLoadFactor(sMethod, dcParameters) if bClosedForm else None
+    if _LoadFactor is not None:
+        # F_max = K*ro*V_1**2/2*C_d*pi*D_0**2/4
+        aScale = _LoadFactor*dcParameters["AIR_DENSITY"]/2.0*dcParameters["DRAG_COEFF"]*np.pi/4.0
+        if sUnknown == "diameter":
+            aResult = np.sqrt(aLoadLimit/(aScale*aOpenVelocity**2))
+        else:
+            aResult = np.sqrt(aLoadLimit/(aScale*aDiameter**2))
+        return aResult.reshape(tShape)
+
+    # Load grows monotonically with the diameter and with the opening velocity
+    def fnResidual(aX: np.ndarray, aIndex: np.ndarray):
+        dcRows = _getRows(dcParameters, aIndex, iRows)
+        if sUnknown == "diameter":
+            return _getLoad(sMethod, aMass[aIndex], aX, aOpenVelocity[aIndex], dcRows)-aLoadLimit[aIndex]
+        return _getLoad(sMethod, aMass[aIndex], aDiameter[aIndex], aX, dcRows)-aLoadLimit[aIndex]
+
+    aLow, aHigh = scanBracket(fnResidual, np.full(iRows, float(tBracket[0])), np.full(iRows, float(tBracket[1])))
+    aResult, _ = solveBracketed(fnResidual, aLow, aHigh)
+    return aResult.reshape(tShape)
+
+def getDiameterFromLoad(
+        _LoadLimit: np.ndarray | float,
+        _Mass: np.ndarray | float,
+        _OpenVelocity: np.ndarray | float,
+        sMethod: str = "pflanz",
+        dcParameters: dict = INPUT_PARAMETERS,
+        bClosedForm: bool = True,
+        tBracket: tuple = (1e-3, 1e3)
+    ):
+    """
+    Largest canopy diameter [m] whose peak opening load (sMethod) at the opening velocity
+    stays under the load limit [N]. Inputs and dcParameters values may be arrays (broadcast).
+    Closed form where the load model allows it, bracketed iterations on tBracket [m] otherwise
+    (first crossing of the limit, NaN if the limit is not reached within the bracket).
+    """
+    return _solveLoad(_LoadLimit, _Mass, 1.0, _OpenVelocity, "diameter", sMethod, dcParameters, bClosedForm, tBracket)
+
+def getOpenVelocityFromLoad(
+        _LoadLimit: np.ndarray | float,
+        _Mass: np.ndarray | float,
+        _Diameter: np.ndarray | float,
+        sMethod: str = "pflanz",
+        dcParameters: dict = INPUT_PARAMETERS,
+        bClosedForm: bool = True,
+        tBracket: tuple = (1e-2, 1e3)
+    ):
+    """
+    Maximum opening velocity [m/s] for which the peak opening load (sMethod) of the canopy
+    stays under the load limit [N]. Inputs and dcParameters values may be arrays (broadcast).
+    Closed form where the load model allows it, bracketed iterations on tBracket [m/s] otherwise
+    (first crossing of the limit, NaN if the limit is not reached within the bracket).
+    """
+    return _solveLoad(_LoadLimit, _Mass, _Diameter, 1.0, "velocity", sMethod, dcParameters, bClosedForm, tBracket)
@@ -0,0 +1,167 @@
+"""
+Monte Carlo dispersion of opening loads and descent velocity
+"""
+
+from Calculations.ConstantParameters import *
+from Calculations.CParachute import CParachuteBatch, getVelocityFromDiameter
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Sampled inputs besides the INPUT_PARAMETERS entries
+MONTE_CARLO_INPUTS = ("MASS", "CANOPY_DIAMETER", "OPEN_VELOCITY")
+MONTE_CARLO_OUTPUTS = ("pflanz", "oscalc", "simplified", "descent_velocity", "inflation_time")
+
+def sampleDistribution(cGenerator: np.random.Generator, _Distribution: tuple | float, iSamples: int):
+    """
+    Draw samples from a distribution definition:
+    * constant value (float)
+    * ('normal', mean, std)
+    * ('uniform', low, high)
+    * ('lognormal', mean, sigma) - parameters of the underlying normal distribution
+    * ('triangular', low, mode, high)
+    """
+    if np.isscalar(_Distribution):
+        return np.full(iSamples, float(_Distribution))
+    sType, *lArgs = _Distribution
+    if sType == 'normal': return cGenerator.normal(lArgs[0], lArgs[1], iSamples)
+    if sType == 'uniform': return cGenerator.uniform(lArgs[0], lArgs[1], iSamples)
+    if sType == 'lognormal': return cGenerator.lognormal(lArgs[0], lArgs[1], iSamples)
+    if sType == 'triangular': return cGenerator.triangular(lArgs[0], lArgs[1], lArgs[2], iSamples)
+    raise ValueError(f"Unknown distribution type: {sType}")
+
+def _getDistributions(dcDistributions: dict, dcParameters: dict):
+    """
+    Complete the distribution definitions with constant INPUT_PARAMETERS values
+    """
+    lUnknown = [sKey for sKey in dcDistributions if sKey not in dcParameters and sKey not in MONTE_CARLO_INPUTS]
+    if lUnknown: raise KeyError(f"Unknown Monte Carlo inputs: {lUnknown}")
+    lMissing = [sKey for sKey in MONTE_CARLO_INPUTS if sKey not in dcDistributions]
+    if lMissing: raise KeyError(f"Missing Monte Carlo inputs: {lMissing}")
+    dcOut = {sKey: float(_Value) for sKey, _Value in dcParameters.items()}
+    dcOut.update(dcDistributions)
+    return dcOut
+
+def _evaluateSamples(dcDistributions: dict, cSeedSequence: np.random.SeedSequence, iSamples: int):
+    """
+    Sample inputs with an independent generator and evaluate the vectorized parachute model
+    """
+    cGenerator = np.random.default_rng(cSeedSequence)
+    dcSamples = {sKey: sampleDistribution(cGenerator, _Distribution, iSamples) for sKey, _Distribution in dcDistributions.items()}
+    dcParameters = {sKey: _Value for sKey, _Value in dcSamples.items() if sKey not in MONTE_CARLO_INPUTS}
+    cParachutes = CParachuteBatch(dcSamples["MASS"], dcSamples["CANOPY_DIAMETER"], dcSamples["OPEN_VELOCITY"], dcParameters)
+    dcOut = {
+        'pflanz': cParachutes.getPeakOpeningLoadPflanz(),
+        'oscalc': cParachutes.getPeakOpeningLoadOSCALC(bWarn=False),
+        'simplified': cParachutes.getPeakOpeningLoadSimplified(),
+        'descent_velocity': getVelocityFromDiameter(cParachutes.fCanopyDiameter, cParachutes.fMass, cParachutes.dcParameters),
+        'inflation_time': cParachutes.fInflationTime,
+    }
+    return dcOut, int(np.count_nonzero(cParachutes.fGNFInf < 4.0))
+
+def _runChunk(tArgs: tuple):
+    """
+    Worker - evaluate one chunk and reduce it to fine histograms and moments
+    """
+    dcDistributions, iSeed, iChunk, iSamples, dcRanges, iFineBins = tArgs
+    dcOutputs, iLowInflation = _evaluateSamples(dcDistributions, np.random.SeedSequence(iSeed, spawn_key=(1, iChunk)), iSamples)
+    dcReduced = {}
+    for sKey, aValues in dcOutputs.items():
+        fLow, fHigh = dcRanges[sKey]
+        aValues = aValues[np.isfinite(aValues)]
+        aIndex = np.floor((aValues-fLow)/(fHigh-fLow)*iFineBins).astype(np.int64)
+        # Bin 0 - underflow, bin iFineBins+1 - overflow
+        aCounts = np.bincount(np.clip(aIndex+1, 0, iFineBins+1), minlength=iFineBins+2)
+        dcReduced[sKey] = {
+            'counts': aCounts,
+            'min': aValues.min(initial=np.inf),
+            'max': aValues.max(initial=-np.inf),
+            'count': aValues.size,
+            'mean': aValues.mean() if aValues.size else 0.0,
+            'm2': np.square(aValues-aValues.mean()).sum() if aValues.size else 0.0,
+        }
+    return dcReduced, iLowInflation
+
+def mergeMoments(tA: tuple, tB: tuple):
+    """
+    Merge (count, mean, M2 - sum of squared deviations) of two sample sets - Chan et al. parallel update,
+    no cancellation of sum(x**2)/n - mean**2 for outputs with a large mean.
+    Means may be vectors - M2 is then the matrix of the summed deviation products.
+    """
+    iCountA, fMeanA, fM2A = tA
+    iCountB, fMeanB, fM2B = tB
+    iCount = iCountA+iCountB
+    if iCount == 0: return tA
+    fDelta = fMeanB-fMeanA
+    # mean = mean_a + delta*n_b/n, M2 = M2_a + M2_b + delta*delta'*n_a*n_b/n
+    return iCount, fMeanA+fDelta*iCountB/iCount, fM2A+fM2B+np.multiply.outer(fDelta, fDelta)*iCountA*iCountB/iCount
+
+def runMonteCarlo(
+        dcDistributions: dict,
+        iSamples: int,
+        iSeed: int = 0,
+        dcParameters: dict = INPUT_PARAMETERS,
+        iWorkers: int | None = None,
+        iChunkSize: int = 250000,
+        lPercentiles: list | tuple = (1, 5, 50, 95, 99),
+        iBins: int = 50
+    ):
+    """
+    Monte Carlo dispersion of the CParachute peak opening loads, descent velocity and inflation time.
+    dcDistributions maps MASS [kg], CANOPY_DIAMETER [m], OPEN_VELOCITY [m/s] and any INPUT_PARAMETERS
+    key to a distribution definition (see sampleDistribution); parameters not given are taken from dcParameters.
+    Samples are split into fixed-size chunks, each with its own SeedSequence stream, and evaluated on a
+    process pool (iWorkers=1 runs in-process) - results depend on iSeed only, not on the worker count.
+    Chunks are reduced to fine histograms in the workers, so memory does not grow with iSamples.
+    Returns dict: output name -> {'mean', 'std', 'min', 'max', 'percentiles', 'histogram', 'bin_edges'}.
+    Percentiles are resolved to 1/(64*iBins) of the sampled range.
+    """
+    if iSamples <= 0: raise ValueError(f"Number of samples has to be positive ({iSamples})")
+    dcDistributions = _getDistributions(dcDistributions, dcParameters)
+    iFineBins = 64*iBins
+
+    # Pilot run (own random stream) to fix histogram ranges
+    dcPilot, _ = _evaluateSamples(dcDistributions, np.random.SeedSequence(iSeed, spawn_key=(0,)), min(iSamples, 20000))
+    dcRanges = {}
+    for sKey, aValues in dcPilot.items():
+        aValues = aValues[np.isfinite(aValues)]
+        fLow, fHigh = (aValues.min(), aValues.max()) if aValues.size else (0.0, 1.0)
+        fMargin = 0.25*(fHigh-fLow) if fHigh > fLow else max(abs(fLow), 1.0)*1e-3
+        dcRanges[sKey] = (fLow-fMargin, fHigh+fMargin)
+
+    lChunks = [
+        (dcDistributions, iSeed, iChunk, min(iChunkSize, iSamples-iChunk*iChunkSize), dcRanges, iFineBins)
+        for iChunk in range(int(np.ceil(iSamples/iChunkSize)))
+    ]
+    if iWorkers == 1:
+        lResults = list(map(_runChunk, lChunks))
+    else:
+        with ProcessPoolExecutor(max_workers=iWorkers) as cExecutor:
+            lResults = list(cExecutor.map(_runChunk, lChunks))
+
+    dcDataOut = {'samples': iSamples, 'low_inflation_time_count': sum(iLow for _, iLow in lResults)}
+    for sKey in MONTE_CARLO_OUTPUTS:
+        aCounts = np.sum([dcReduced[sKey]['counts'] for dcReduced, _ in lResults], axis=0)
+        fMin = min(dcReduced[sKey]['min'] for dcReduced, _ in lResults)
+        fMax = max(dcReduced[sKey]['max'] for dcReduced, _ in lResults)
+        iCount = aCounts.sum()
+        tMoments = (0, 0.0, 0.0)
+        for dcReduced, _ in lResults:
+            tMoments = mergeMoments(tMoments, (dcReduced[sKey]['count'], dcReduced[sKey]['mean'], dcReduced[sKey]['m2']))
+        _, fMean, fM2 = tMoments
+        fLow, fHigh = dcRanges[sKey]
+        aFineEdges = np.linspace(fLow, fHigh, iFineBins+1)
+        # Percentiles - linear interpolation of the cumulative fine histogram (under/overflow mapped to min/max)
+        aEdges = np.concatenate(([min(fMin, fLow)], aFineEdges, [max(fMax, fHigh)]))
+        aCumulative = np.concatenate(([0.0], np.cumsum(aCounts)))/iCount
+        aPercentiles = np.interp(np.asarray(lPercentiles)/100.0, aCumulative, aEdges)
+        dcDataOut[sKey] = {
+            'mean': fMean,
+            'std': np.sqrt(fM2/iCount),
+            'min': fMin,
+            'max': fMax,
+            'percentiles': dict(zip(lPercentiles, np.clip(aPercentiles, fMin, fMax))),
+            'histogram': aCounts[1:-1].reshape(iBins, 64).sum(axis=1),
+            'bin_edges': aFineEdges[::64],
+            'outside_histogram': int(aCounts[0]+aCounts[-1]),
+        }
+    return dcDataOut
@@ -0,0 +1,220 @@
+"""
+Multi-objective canopy optimization - Pareto front (NSGA-II) over the vectorized parachute model
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import numpy as np
+
+from Calculations.ConstantParameters import *
+from Calculations.MonteCarlo import MONTE_CARLO_INPUTS
+from Calculations.Sensitivity import SENSITIVITY_OUTPUTS, evaluateOutputs
+
+CANOPY_AREAL_DENSITY = 0.08 # [kg/m2] - canopy fabric, seams and suspension lines per nominal area
+OPTIMIZER_OUTPUTS = SENSITIVITY_OUTPUTS+("canopy_area", "canopy_mass")
+OPTIMIZER_POOL_ROWS = 20000 # candidates per generation from which the default evaluation uses a process pool
+PARETO_BLOCK_SIZE = 2**22 # [elements] - pairwise comparison block of the non-dominated sorting
+
+def evaluateCandidates(dcCandidates: dict, dcFixed: dict, lOutputs: list | tuple, fArealDensity: float = CANOPY_AREAL_DENSITY):
+    """
+    Outputs (OPTIMIZER_OUTPUTS) for arrays of candidate values; dcFixed holds the remaining
+    MONTE_CARLO_INPUTS and INPUT_PARAMETERS values
+    """
+    dcInputs = {**dcFixed, **dcCandidates}
+    dcOut = evaluateOutputs(dcInputs, [sOutput for sOutput in lOutputs if sOutput in SENSITIVITY_OUTPUTS])
+    aArea = np.pi*np.asarray(dcInputs["CANOPY_DIAMETER"])**2/4.0
+    if "canopy_area" in lOutputs: dcOut["canopy_area"] = aArea
+    if "canopy_mass" in lOutputs: dcOut["canopy_mass"] = aArea*fArealDensity
+    iRows = max(np.size(_Value) for _Value in dcCandidates.values())
+    return {sOutput: np.broadcast_to(dcOut[sOutput], iRows).astype(float) for sOutput in lOutputs}
+
+def _evaluateChunk(tArgs: tuple):
+    return evaluateCandidates(*tArgs)
+
+def _getNonDominated(aObjectives: np.ndarray):
+    """
+    Mask of the rows not dominated by any other row - pairwise comparisons in column blocks
+    of at most PARETO_BLOCK_SIZE elements
+    """
+    iRows, iObjectives = aObjectives.shape
+    bDominated = np.zeros(iRows, dtype=bool)
+    iBlock = max(1, PARETO_BLOCK_SIZE//max(iRows*iObjectives, 1))
+    for iStart in range(0, iRows, iBlock):
+        aBlock = aObjectives[None, iStart:iStart+iBlock, :]
+        # [i, j] - i dominates j: no worse in every objective, better in at least one
+        aDominates = np.all(aObjectives[:, None, :] <= aBlock, axis=2) & np.any(aObjectives[:, None, :] < aBlock, axis=2)
+        bDominated[iStart:iStart+iBlock] = np.any(aDominates, axis=0)
+    return ~bDominated
+
+def getParetoRanks(aObjectives: np.ndarray, aViolation: np.ndarray | None = None, iLimit: int | None = None):
+    """
+    Non-dominated sorting of the rows of aObjectives (minimized) - rank 0 is the Pareto front.
+    With constraint violations (>= 0) feasible rows dominate infeasible ones and infeasible
+    rows are ordered by the violation (constrained domination).
+    With iLimit sorting stops once iLimit rows are ranked - the remaining rows get rank iRows.
+    Fronts are peeled one at a time (see _getNonDominated) - memory grows with rows*PARETO_BLOCK_SIZE
+    elements instead of rows**2, time with fronts*rows**2.
+    """
+    iRows = len(aObjectives)
+    aRanks = np.full(iRows, iRows)
+    iLimit = iRows if iLimit is None else min(iLimit, iRows)
+    bFeasible = np.ones(iRows, dtype=bool) if aViolation is None else aViolation <= 0.0
+    aRemaining = np.flatnonzero(bFeasible)
+    iRank, iRanked = 0, 0
+    while iRanked < iLimit and aRemaining.size:
+        bFront = _getNonDominated(aObjectives[aRemaining])
+        aRanks[aRemaining[bFront]] = iRank
+        aRemaining = aRemaining[~bFront]
+        iRank, iRanked = iRank+1, iRanked+np.count_nonzero(bFront)
+    # Infeasible rows - after all feasible ones, one front per violation value
+    aInfeasible = np.flatnonzero(~bFeasible)
+    if iRanked < iLimit and aInfeasible.size:
+        _, aLevel = np.unique(aViolation[aInfeasible], return_inverse=True)
+        iLevels = np.searchsorted(np.cumsum(np.bincount(aLevel)), iLimit-iRanked)+1
+        bRanked = aLevel < iLevels
+        aRanks[aInfeasible[bRanked]] = iRank+aLevel[bRanked]
+    return aRanks
+
+def getCrowdingDistance(aObjectives: np.ndarray, aRanks: np.ndarray):
+    """
+    NSGA-II crowding distance within each front (boundary points - infinity)
+    """
+    iRows, iObjectives = aObjectives.shape
+    aDistance = np.zeros(iRows)
+    for iObjective in range(iObjectives):
+        aOrder = np.lexsort((aObjectives[:, iObjective], aRanks))
+        aSorted, aSortedRanks = aObjectives[aOrder, iObjective], aRanks[aOrder]
+        bStart = np.r_[True, aSortedRanks[1:] != aSortedRanks[:-1]]
+        bEnd = np.r_[aSortedRanks[1:] != aSortedRanks[:-1], True]
+        # Objective span of the front of every row
+        aGroup = np.cumsum(bStart)-1
+        aSpan = (aSorted[bEnd]-aSorted[bStart])[aGroup]
+        aGap = np.zeros(iRows)
+        aGap[1:-1] = aSorted[2:]-aSorted[:-2]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            aGap = np.where(aSpan > 0.0, aGap/aSpan, 0.0)
+        aGap[bStart | bEnd] = np.inf
+        aDistance[aOrder] += aGap
+    return aDistance
+
+def _selectParents(cGenerator: np.random.Generator, aRanks: np.ndarray, aDistance: np.ndarray, iCount: int):
+    """
+    Binary tournament - lower rank wins, larger crowding distance breaks ties
+    """
+    aFirst, aSecond = cGenerator.integers(0, aRanks.size, (2, iCount))
+    bFirst = (aRanks[aFirst] < aRanks[aSecond]) | ((aRanks[aFirst] == aRanks[aSecond]) & (aDistance[aFirst] >= aDistance[aSecond]))
+    return np.where(bFirst, aFirst, aSecond)
+
+def _getOffspring(cGenerator: np.random.Generator, aParents: np.ndarray, fCrossoverEta: float, fMutationEta: float):
+    """
+    Simulated binary crossover and polynomial mutation of unit-cube variables (rows - candidates)
+    """
+    iCount, iVariables = aParents.shape
+    aPairs = np.arange(2*((iCount+1)//2)) % iCount
+    aA, aB = aParents[aPairs[0::2]], aParents[aPairs[1::2]]
+    aU = cGenerator.random(aA.shape)
+    aBeta = np.where(aU <= 0.5, (2.0*aU)**(1.0/(fCrossoverEta+1.0)), (1.0/(2.0*(1.0-aU)))**(1.0/(fCrossoverEta+1.0)))
+    # Each variable is crossed over with probability 0.5
+    aBeta = np.where(cGenerator.random(aA.shape) < 0.5, aBeta, 1.0)
+    aChildren = np.concatenate((0.5*((1.0+aBeta)*aA+(1.0-aBeta)*aB), 0.5*((1.0-aBeta)*aA+(1.0+aBeta)*aB)))[:iCount]
+    aU = cGenerator.random(aChildren.shape)
+    aDelta = np.where(aU < 0.5, (2.0*aU)**(1.0/(fMutationEta+1.0))-1.0, 1.0-(2.0*(1.0-aU))**(1.0/(fMutationEta+1.0)))
+    bMutate = cGenerator.random(aChildren.shape) < 1.0/iVariables
+    return np.clip(np.where(bMutate, aChildren+aDelta, aChildren), 0.0, 1.0)
+
+def optimizeCanopy(
+        dcBounds: dict,
+        dcFixed: dict,
+        lObjectives: list | tuple = ("descent_velocity", "oscalc", "canopy_area"),
+        dcConstraints: dict | None = None,
+        iPopulation: int = 200,
+        iGenerations: int = 100,
+        iSeed: int = 0,
+        dcParameters: dict = INPUT_PARAMETERS,
+        fArealDensity: float = CANOPY_AREAL_DENSITY,
+        iWorkers: int | None = None,
+        fCrossoverEta: float = 15.0,
+        fMutationEta: float = 20.0
+    ):
+    """
+    Pareto set of canopy designs minimizing lObjectives (OPTIMIZER_OUTPUTS).
+    dcBounds maps the design variables (MONTE_CARLO_INPUTS or INPUT_PARAMETERS keys, e.g. CANOPY_DIAMETER)
+    to (low, high); dcFixed gives the other MONTE_CARLO_INPUTS (e.g. MASS, OPEN_VELOCITY), parameters
+    not given are taken from dcParameters. dcConstraints maps outputs to (min, max) limits (None - no limit).
+    Every generation the whole offspring population is evaluated as arrays, split into iWorkers
+    batches on a process pool (iWorkers=1 runs in-process; by default in-process below
+    OPTIMIZER_POOL_ROWS candidates, where the pool overhead exceeds the evaluation) - results depend on iSeed only.
+    iPopulation*(iGenerations+1) candidates are evaluated.
+    Returns dict: 'variables', 'outputs' (objectives and constrained outputs) - the Pareto set sorted
+    by the first objective, 'feasible' (bool per design), 'evaluations', 'generations'.
+    """
+    dcConstraints = dcConstraints or {}
+    lVariables = list(dcBounds)
+    lUnknown = [sKey for sKey in list(dcBounds)+list(dcFixed) if sKey not in dcParameters and sKey not in MONTE_CARLO_INPUTS]
+    lUnknown += [sOutput for sOutput in list(lObjectives)+list(dcConstraints) if sOutput not in OPTIMIZER_OUTPUTS]
+    if lUnknown: raise KeyError(f"Unknown optimizer inputs/outputs: {lUnknown}")
+    lMissing = [sKey for sKey in MONTE_CARLO_INPUTS if sKey not in dcBounds and sKey not in dcFixed]
+    if lMissing: raise KeyError(f"Missing optimizer inputs: {lMissing}")
+    dcFixed = {**{sKey: float(_Value) for sKey, _Value in dcParameters.items() if sKey not in dcBounds}, **dcFixed}
+    lOutputs = list(dict.fromkeys(list(lObjectives)+list(dcConstraints)))
+    aLow = np.array([dcBounds[sKey][0] for sKey in lVariables], dtype=float)
+    aHigh = np.array([dcBounds[sKey][1] for sKey in lVariables], dtype=float)
+    cGenerator = np.random.default_rng(iSeed)
+    if iWorkers is None: iWorkers = 1 if iPopulation < OPTIMIZER_POOL_ROWS else os.cpu_count() or 1
+
+    def evaluate(aUnit: np.ndarray, cExecutor):
+        aValues = aLow+aUnit*(aHigh-aLow)
+        lChunks = [
+            ({sKey: aChunk[:, iVariable] for iVariable, sKey in enumerate(lVariables)}, dcFixed, lOutputs, fArealDensity)
+            for aChunk in np.array_split(aValues, iWorkers) if len(aChunk)
+        ]
+        lResults = list(map(_evaluateChunk, lChunks)) if cExecutor is None else list(cExecutor.map(_evaluateChunk, lChunks))
+        dcOut = {sOutput: np.concatenate([dcResult[sOutput] for dcResult in lResults]) for sOutput in lOutputs}
+        aObjectives = np.stack([dcOut[sOutput] for sOutput in lObjectives], axis=1)
+        # Constraint violation - sum of the relative limit exceedances
+        aViolation = np.zeros(len(aUnit))
+        for sOutput, (_Min, _Max) in dcConstraints.items():
+            if _Min is not None: aViolation += np.maximum(0.0, (_Min-dcOut[sOutput])/max(abs(_Min), 1e-12))
+            if _Max is not None: aViolation += np.maximum(0.0, (dcOut[sOutput]-_Max)/max(abs(_Max), 1e-12))
+        # Non-finite outputs are treated as infeasible
+        bInvalid = ~np.all(np.isfinite(aObjectives), axis=1)
+        aObjectives[bInvalid] = np.inf
+        aViolation[bInvalid] = np.inf
+        return dcOut, aObjectives, aViolation
+
+    cExecutor = ProcessPoolExecutor(max_workers=iWorkers) if iWorkers > 1 else None
+    try:
+        aPopulation = cGenerator.random((iPopulation, len(lVariables)))
+        dcOut, aObjectives, aViolation = evaluate(aPopulation, cExecutor)
+        aRanks = getParetoRanks(aObjectives, aViolation)
+        aDistance = getCrowdingDistance(aObjectives, aRanks)
+        for _ in range(iGenerations):
+            aParents = aPopulation[_selectParents(cGenerator, aRanks, aDistance, iPopulation)]
+            aOffspring = _getOffspring(cGenerator, aParents, fCrossoverEta, fMutationEta)
+            dcOffspring, aOffspringObjectives, aOffspringViolation = evaluate(aOffspring, cExecutor)
+            # Elitist survival of parents and offspring - by rank, then by crowding distance
+            aPopulation = np.concatenate((aPopulation, aOffspring))
+            dcOut = {sOutput: np.concatenate((dcOut[sOutput], dcOffspring[sOutput])) for sOutput in lOutputs}
+            aObjectives = np.concatenate((aObjectives, aOffspringObjectives))
+            aViolation = np.concatenate((aViolation, aOffspringViolation))
+            aRanks = getParetoRanks(aObjectives, aViolation, iPopulation)
+            aDistance = getCrowdingDistance(aObjectives, aRanks)
+            aKeep = np.lexsort((-aDistance, aRanks))[:iPopulation]
+            aPopulation, aObjectives, aViolation, aRanks, aDistance = aPopulation[aKeep], aObjectives[aKeep], aViolation[aKeep], aRanks[aKeep], aDistance[aKeep]
+            dcOut = {sOutput: aValues[aKeep] for sOutput, aValues in dcOut.items()}
+    finally:
+        if cExecutor is not None: cExecutor.shutdown()
+
+    # Pareto set (unique designs) sorted by the first objective
+    aFront = np.flatnonzero(aRanks == 0)
+    _, aUnique = np.unique(aPopulation[aFront], axis=0, return_index=True)
+    aFront = aFront[aUnique]
+    aFront = aFront[np.argsort(aObjectives[aFront, 0], kind='stable')]
+    aValues = aLow+aPopulation[aFront]*(aHigh-aLow)
+    return {
+        'variables': {sKey: aValues[:, iVariable] for iVariable, sKey in enumerate(lVariables)},
+        'outputs': {sOutput: dcOut[sOutput][aFront] for sOutput in lOutputs},
+        'feasible': aViolation[aFront] <= 0.0,
+        'evaluations': iPopulation*(iGenerations+1),
+        'generations': iGenerations,
+    }
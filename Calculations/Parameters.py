@@ -0,0 +1,132 @@
+"""
+Immutable simulation parameter sets - validation, presets and precomputed derived constants
+"""
+
+import functools
+import math
+from collections.abc import Mapping
+
+from Calculations.ConstantParameters import *
+from Calculations.Air import _getPressureExponent
+
+PARAMETER_KEYS = tuple(INPUT_PARAMETERS)
+PARAMETER_SET_CACHE_SIZE = 64
+
+# Attribute names of the parameters (same order as PARAMETER_KEYS)
+_ATTRIBUTES = {
+    "AIR_DENSITY": "fAirDensity",
+    "DRAG_COEFF": "fDragCoeff",
+    "G_ACCELERATION": "fGAcceleration",
+    "DRAG_INTEGRAL": "fDragIntegral",
+    "INFLATION_CANOPY_FILL_CONST": "fFillConst",
+    "DECCELERATION_EXPONENT": "fDeccelerationExponent",
+    "OPENING_LOAD_SHOCK_FACTOR": "fShockFactor",
+    "OPENING_FORCE_REDUCTION_FACTOR": "fForceReductionFactor",
+}
+
+class CParameterSet(Mapping):
+    """
+    Frozen, hashable set of INPUT_PARAMETERS values. Behaves like the parameter dict
+    (cParameters["DRAG_COEFF"], dict(cParameters), **cParameters), exposes the values as
+    attributes and precomputes the derived constants used in the hot paths:
+    * fHalfDensityDrag = 0.5*ro*C_d [kg/m3]
+    * fLoadFactor = C_x*X_1 [-]
+    * fPressureExponent = g*M/(R*L) [-]
+    """
+
+    __slots__ = ("_tValues", "_iHash", *_ATTRIBUTES.values(), "fHalfDensityDrag", "fLoadFactor", "fPressureExponent")
+
+    def __init__(self, **dcValues):
+        lMissing = [sKey for sKey in PARAMETER_KEYS if sKey not in dcValues]
+        lUnknown = [sKey for sKey in dcValues if sKey not in PARAMETER_KEYS]
+        if lMissing or lUnknown: raise KeyError(f"Invalid parameter set - missing: {lMissing}, unknown: {lUnknown}")
+        tValues = tuple(float(dcValues[sKey]) for sKey in PARAMETER_KEYS)
+        for sKey, fValue in zip(PARAMETER_KEYS, tValues):
+            if not math.isfinite(fValue) or fValue <= 0.0: raise ValueError(f"Parameter {sKey} has to be a positive number ({fValue})")
+        if tValues[PARAMETER_KEYS.index("OPENING_FORCE_REDUCTION_FACTOR")] > 1.0: raise ValueError("Parameter OPENING_FORCE_REDUCTION_FACTOR has to be in (0, 1>")
+
+        fnSet = object.__setattr__
+        fnSet(self, "_tValues", tValues)
+        fnSet(self, "_iHash", hash(tValues))
+        for sKey, fValue in zip(PARAMETER_KEYS, tValues):
+            fnSet(self, _ATTRIBUTES[sKey], fValue)
+        fnSet(self, "fHalfDensityDrag", 0.5*self.fAirDensity*self.fDragCoeff)
+        fnSet(self, "fLoadFactor", self.fShockFactor*self.fForceReductionFactor)
+        fnSet(self, "fPressureExponent", _getPressureExponent(self.fGAcceleration))
+
+    def __setattr__(self, sName, _Value):
+        raise AttributeError("CParameterSet is immutable - use replace()")
+
+    def __delattr__(self, sName):
+        raise AttributeError("CParameterSet is immutable")
+
+    def __reduce__(self):
+        return (_fromValues, (self._tValues,))
+
+    def __getitem__(self, sKey: str):
+        try:
+            return self._tValues[PARAMETER_KEYS.index(sKey)]
+        except ValueError:
+            raise KeyError(sKey) from None
+
+    def __iter__(self):
+        return iter(PARAMETER_KEYS)
+
+    def __len__(self):
+        return len(PARAMETER_KEYS)
+
+    def __hash__(self):
+        return self._iHash
+
+    def __eq__(self, other):
+        if isinstance(other, CParameterSet): return self._tValues == other._tValues
+        return Mapping.__eq__(self, other)
+
+    def __repr__(self):
+        return f"CParameterSet({', '.join(f'{sKey}={fValue!r}' for sKey, fValue in zip(PARAMETER_KEYS, self._tValues))})"
+
+    def replace(self, **dcChanges):
+        """
+        New parameter set with some values changed
+        """
+        return CParameterSet(**{**dict(zip(PARAMETER_KEYS, self._tValues)), **dcChanges})
+
+    def toDict(self):
+        return dict(zip(PARAMETER_KEYS, self._tValues))
+
+def _fromValues(tValues: tuple):
+    return CParameterSet(**dict(zip(PARAMETER_KEYS, tValues)))
+
+@functools.lru_cache(maxsize=PARAMETER_SET_CACHE_SIZE)
+def _getCachedParameterSet(tItems: tuple):
+    return CParameterSet(**dict(tItems))
+
+def getParameterSet(dcParameters: Mapping = INPUT_PARAMETERS):
+    """
+    CParameterSet for a parameter dict (cached - the same dict values give the same object).
+    Parameter sets are returned unchanged.
+    """
+    if isinstance(dcParameters, CParameterSet): return dcParameters
+    return _getCachedParameterSet(tuple(dcParameters.items()))
+
+DEFAULT_PARAMETERS = CParameterSet(**INPUT_PARAMETERS)
+
+# Typical values per canopy type (Knacke, Parachute Recovery Systems Design Manual):
+# drag coefficient C_d, opening force coefficient C_x and canopy fill constant n
+PARAMETER_PRESETS = {
+    "default": DEFAULT_PARAMETERS,
+    "flat_circular": DEFAULT_PARAMETERS.replace(DRAG_COEFF=0.77, OPENING_LOAD_SHOCK_FACTOR=1.7, INFLATION_CANOPY_FILL_CONST=8.0),
+    "conical": DEFAULT_PARAMETERS.replace(DRAG_COEFF=0.80, OPENING_LOAD_SHOCK_FACTOR=1.8, INFLATION_CANOPY_FILL_CONST=8.0),
+    "hemispherical": DEFAULT_PARAMETERS.replace(DRAG_COEFF=0.70, OPENING_LOAD_SHOCK_FACTOR=1.6, INFLATION_CANOPY_FILL_CONST=8.0),
+    "cruciform": DEFAULT_PARAMETERS.replace(DRAG_COEFF=0.75, OPENING_LOAD_SHOCK_FACTOR=1.2, INFLATION_CANOPY_FILL_CONST=11.7),
+    "annular": DEFAULT_PARAMETERS.replace(DRAG_COEFF=0.90, OPENING_LOAD_SHOCK_FACTOR=1.4, INFLATION_CANOPY_FILL_CONST=9.0),
+    "ringslot": DEFAULT_PARAMETERS.replace(DRAG_COEFF=0.60, OPENING_LOAD_SHOCK_FACTOR=1.05, INFLATION_CANOPY_FILL_CONST=14.0),
+    "ribbon": DEFAULT_PARAMETERS.replace(DRAG_COEFF=0.50, OPENING_LOAD_SHOCK_FACTOR=1.05, INFLATION_CANOPY_FILL_CONST=14.0),
+}
+
+def getPreset(sName: str, **dcChanges):
+    """
+    Parameter set of a canopy type preset, optionally with some values changed
+    """
+    if sName not in PARAMETER_PRESETS: raise KeyError(f"Unknown parameter preset: {sName} (available: {list(PARAMETER_PRESETS)})")
+    return PARAMETER_PRESETS[sName].replace(**dcChanges) if dcChanges else PARAMETER_PRESETS[sName]
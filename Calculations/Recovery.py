@@ -0,0 +1,217 @@
+"""
+Multi-stage recovery - drogue and main canopy sequencing with reefing, vectorized over configurations
+"""
+
+import numpy as np
+
+from Calculations.ConstantParameters import *
+from Calculations.CParachute import CParachuteBatch
+from Calculations.Air import getAirDensity
+from Calculations.AtmosphereTable import CAtmosphereTable
+from Calculations.Atmosphere import CLayeredAtmosphere
+from Calculations.Inflation import integrateInflation
+
+RECOVERY_TRIGGERS = ("apogee", "altitude", "timer")
+RECOVERY_MAX_DISTANCE = 50.0 # [m] - longest coast step with a frozen air density
+RECOVERY_MAX_TIME_STEP = 1.0 # [s]
+RECOVERY_BODY_DRAG_AREA = 0.01 # [m2] - C_d*S of the vehicle without canopies
+
+class CRecoveryStage():
+    """
+    One canopy of the recovery sequence, deployed when its trigger fires:
+    * 'apogee' - at the start of the descent (fTriggerValue ignored)
+    * 'altitude' - when the vehicle descends to fTriggerValue [m]
+    * 'timer' - fTriggerValue [s] after the deployment of the previous stage (after apogee for the first one)
+    lReefing [(drag area ratio, disreef delay [s])] - the canopy opens to the first ratio of its
+    full drag area and is disreefed to the next ratio (finally to 1) after the delay.
+    Diameter and trigger values may be arrays - one value per evaluated configuration.
+    bReleasePrevious cuts away the canopies of the previous stages when this one deploys.
+    """
+
+    def __init__(
+            self,
+            sName: str,
+            _Diameter: np.ndarray | float,
+            sTrigger: str = "apogee",
+            _TriggerValue: np.ndarray | float = 0.0,
+            lReefing: list | tuple = (),
+            bReleasePrevious: bool = False,
+            dcParameters: dict = INPUT_PARAMETERS
+        ):
+        if sTrigger not in RECOVERY_TRIGGERS: raise ValueError(f"Unknown deployment trigger: {sTrigger} (available: {RECOVERY_TRIGGERS})")
+        self.sName = sName
+        self._Diameter = _Diameter
+        self.sTrigger = sTrigger
+        self._TriggerValue = _TriggerValue
+        self.lReefing = [(_Ratio, _Delay) for _Ratio, _Delay in lReefing]
+        self.bReleasePrevious = bReleasePrevious
+        self.dcParameters = dcParameters
+
+    def getOpenings(self):
+        """
+        [(drag area ratio, delay after the previous opening [s])] - the first opening has no delay
+        """
+        lRatios = [_Ratio for _Ratio, _ in self.lReefing]+[1.0]
+        lDelays = [0.0]+[_Delay for _, _Delay in self.lReefing]
+        return list(zip(lRatios, lDelays))
+
+def _getCoastTime(aDistance: np.ndarray, aVelocity: np.ndarray, aA: np.ndarray, aG: np.ndarray):
+    """
+    Time to descend aDistance with dV/dt = g - a*V**2 (a frozen):
+    a*s = ln(cosh(x) + c*sinh(x)), x = sqrt(g*a)*t, c = V/w, w = sqrt(g/a) (log-domain, no overflow)
+    """
+    aRoot = np.sqrt(aG*aA)
+    aC = aVelocity*aA/aRoot
+    aF = (1.0-aC*aC)*np.exp(-2.0*aA*aDistance)
+    return (aA*aDistance+np.log1p(np.sqrt(1.0-aF))-np.log1p(aC))/aRoot
+
+def _getCoastDistance(aTime: np.ndarray, aVelocity: np.ndarray, aA: np.ndarray, aG: np.ndarray):
+    """
+    Distance descended in aTime with dV/dt = g - a*V**2 (a frozen) - inverse of _getCoastTime
+    """
+    aRoot = np.sqrt(aG*aA)
+    aC = aVelocity*aA/aRoot
+    aX = aRoot*aTime
+    return (aX+np.log((1.0+aC)+(1.0-aC)*np.exp(-2.0*aX))-np.log(2.0))/aA
+
+def _getCoastVelocity(aTime: np.ndarray, aVelocity: np.ndarray, aA: np.ndarray, aG: np.ndarray):
+    # V' = w*(V + w*T)/(w + V*T), T = tanh(sqrt(g*a)*t)
+    aTerminal = np.sqrt(aG/aA)
+    aTanh = np.tanh(np.sqrt(aG*aA)*aTime)
+    return aTerminal*(aVelocity+aTerminal*aTanh)/(aTerminal+aVelocity*aTanh)
+
+def simulateRecovery(
+        lStages: list,
+        _Mass: np.ndarray | float,
+        _ApogeeAltitude: np.ndarray | float,
+        _ApogeeVelocity: np.ndarray | float,
+        _BodyDragArea: np.ndarray | float = RECOVERY_BODY_DRAG_AREA,
+        aRefPressure: np.ndarray | float = 101325.0,
+        aRefTemp: np.ndarray | float = 288.15,
+        aRefHumidity: np.ndarray | float = 0.0,
+        cAtmosphere: CAtmosphereTable | CLayeredAtmosphere | None = None,
+        dcParameters: dict = INPUT_PARAMETERS,
+        fMaxDistance: float = RECOVERY_MAX_DISTANCE,
+        fMaxTimeStep: float = RECOVERY_MAX_TIME_STEP
+    ):
+    """
+    Vertical descent from apogee through the deployment sequence lStages (CRecoveryStage) to the ground,
+    for all configurations at once (inputs and stage values are broadcast against each other).
+    _ApogeeVelocity [m/s] is the (mostly horizontal) speed left at apogee - the opening velocity of an
+    apogee deployment in this vertical model, it has to be positive.
+    Between openings the descent is integrated exactly for a frozen air density (coast steps of at most
+    fMaxDistance [m] / fMaxTimeStep [s]). Every opening (deployment and each disreef) starts from the
+    state reached at its trigger: the OSCALC-style inflation (see integrateInflation) is integrated with
+    the drag of the other canopies at the local air density, Pflanz and simplified loads use the
+    equivalent diameter of the opened drag area. Altitude is measured upwards from the reference point [m].
+    Returns a dict:
+    * 'events' - list of dicts per opening: 'stage', 'ratio', 'time' [s], 'altitude' [m], 'velocity' [m/s],
+      'air_density' [kg/m3], 'inflation_time' [s], 'oscalc', 'pflanz', 'simplified' [N], 'impulse' [N*s]
+      (NaN where the vehicle landed before the opening)
+    * 'landing_time' [s], 'impact_velocity' [m/s], 'max_load' [N] (largest OSCALC load of all openings)
+    """
+    lInputs = [_Mass, _ApogeeAltitude, _ApogeeVelocity, _BodyDragArea]
+    for cStage in lStages: lInputs += [cStage._Diameter, cStage._TriggerValue]
+    tShape = np.broadcast_shapes(*(np.shape(_Value) for _Value in lInputs))
+    def toRow(_Value):
+        return np.broadcast_to(np.asarray(_Value, dtype=float), tShape).ravel().copy()
+
+    aMass = toRow(_Mass)
+    aG = toRow(dcParameters["G_ACCELERATION"])
+    aBodyDragArea = toRow(_BodyDragArea)
+    aRefPressure, aRefTemp, aRefHumidity = toRow(aRefPressure), toRow(aRefTemp), toRow(aRefHumidity)
+    # State: time [s], altitude [m] (upwards), velocity [m/s] (positive downwards)
+    aT = np.zeros(aMass.size)
+    aH = toRow(_ApogeeAltitude)
+    aV = toRow(_ApogeeVelocity)
+    # Zero opening velocity gives an infinite inflation time (t_inf = n*D_0/V_1**k)
+    if not np.all(aV > 0.0): raise ValueError("Apogee velocity has to be positive")
+    # Drag areas [m2] of the canopies of the previous stages and of the current stage
+    aOtherDragArea = np.zeros(aMass.size)
+    aStageDragArea = np.zeros(aMass.size)
+
+    def getDensity(aAltitude, aIndex = slice(None)):
+        if cAtmosphere is not None: return cAtmosphere.getDensity(aAltitude)
+        return getAirDensity(aRefPressure[aIndex], aRefTemp[aIndex], -aAltitude, aRefHumidity[aIndex], {"G_ACCELERATION": aG[aIndex]})
+
+    def coast(aTargetAltitude = None, aTargetTime = None):
+        """
+        Descend with the current drag area to the target altitude or time (or to the ground)
+        """
+        nonlocal aT, aH, aV
+        aDragConst = (aBodyDragArea+aOtherDragArea+aStageDragArea)/(2.0*aMass)
+        aFloor = np.zeros(aMass.size) if aTargetAltitude is None else np.maximum(aTargetAltitude, 0.0)
+        while True:
+            bActive = aH > aFloor+1e-9
+            if aTargetTime is not None: bActive &= aT < aTargetTime-1e-12
+            if not np.any(bActive): break
+            aIndex = np.flatnonzero(bActive)
+            aHA, aVA, aGA = aH[aIndex], aV[aIndex], aG[aIndex]
+            aDistance = np.minimum(aHA-aFloor[aIndex], fMaxDistance)
+            if aTargetTime is not None:
+                # Time step, density at the estimated midpoint; rows reaching the floor switch to distance steps
+                aTime = np.minimum(aTargetTime[aIndex]-aT[aIndex], fMaxTimeStep)
+                aA = getDensity(aHA-np.minimum(0.5*aVA*aTime, 0.5*aDistance), aIndex)*aDragConst[aIndex]
+                aTimeDistance = _getCoastDistance(aTime, aVA, aA, aGA)
+                bFloor = aTimeDistance >= aDistance
+                aTime = np.where(bFloor, _getCoastTime(aDistance, aVA, aA, aGA), aTime)
+                aDistance = np.where(bFloor, aDistance, aTimeDistance)
+            else:
+                aA = getDensity(aHA-0.5*aDistance, aIndex)*aDragConst[aIndex]
+                aTime = _getCoastTime(aDistance, aVA, aA, aGA)
+            aV[aIndex] = _getCoastVelocity(aTime, aVA, aA, aGA)
+            aH[aIndex] = np.where(aDistance >= aHA-aFloor[aIndex], aFloor[aIndex], aHA-aDistance)
+            aT[aIndex] += aTime
+
+    lEvents = []
+    aStageTime = np.zeros(aMass.size) # deployment time of the previous stage
+    for cStage in lStages:
+        dcStageParameters = {sKey: toRow(_Value) for sKey, _Value in cStage.dcParameters.items()}
+        # Deployment trigger
+        if cStage.sTrigger == "altitude": coast(aTargetAltitude=toRow(cStage._TriggerValue))
+        elif cStage.sTrigger == "timer": coast(aTargetTime=aStageTime+toRow(cStage._TriggerValue))
+        aStageTime = aT.copy()
+        # Canopies of the previous stages - all cut away on release
+        aOtherDragArea = np.zeros(aMass.size) if cStage.bReleasePrevious else aOtherDragArea+aStageDragArea
+        aStageDragArea = np.zeros(aMass.size)
+        aFullDragArea = dcStageParameters["DRAG_COEFF"]*np.pi*toRow(cStage._Diameter)**2/4.0
+        aOpeningTime = aT.copy()
+
+        for _Ratio, _Delay in cStage.getOpenings():
+            if np.any(toRow(_Delay) > 0.0): coast(aTargetTime=aOpeningTime+toRow(_Delay))
+            aOpeningTime = aT.copy()
+            bFlying = aH > 0.0
+            aDensity = getDensity(aH)
+            aDragArea = toRow(_Ratio)*aFullDragArea
+            # Equivalent diameters of the opened and the previously opened drag area
+            aDiameter = np.sqrt(4.0*aDragArea/(np.pi*dcStageParameters["DRAG_COEFF"]))
+            aPreviousDiameter = np.sqrt(4.0*aStageDragArea/(np.pi*dcStageParameters["DRAG_COEFF"]))
+            cParachutes = CParachuteBatch(aMass, aDiameter, aV, {**dcStageParameters, "AIR_DENSITY": aDensity})
+            # t_inf = n*(D_0-D_i)/(V_1**k) - reefed canopies inflate only by the diameter increment
+            aInflationTime = dcStageParameters["INFLATION_CANOPY_FILL_CONST"]*(aDiameter-aPreviousDiameter)/(aV**dcStageParameters["DECCELERATION_EXPONENT"])
+            dcInflation = integrateInflation(
+                aMass, aDragArea, aInflationTime, aV, aDensity, aG, dcStageParameters["DRAG_INTEGRAL"],
+                fDuration=1.0, bHistory=False, _InitialDragArea=aStageDragArea, _ExtraDragArea=aBodyDragArea+aOtherDragArea
+            )
+            fnEvent = lambda aValues: np.where(bFlying, aValues, np.nan).reshape(tShape)
+            lEvents.append({
+                "stage": cStage.sName, "ratio": _Ratio,
+                "time": fnEvent(aT), "altitude": fnEvent(aH), "velocity": fnEvent(aV), "air_density": fnEvent(aDensity),
+                "inflation_time": fnEvent(aInflationTime), "oscalc": fnEvent(dcInflation["peak_load"]),
+                "pflanz": fnEvent(cParachutes.getPeakOpeningLoadPflanz()), "simplified": fnEvent(cParachutes.getPeakOpeningLoadSimplified()),
+                "impulse": fnEvent(dcInflation["impulse"]),
+            })
+            # State after the inflation (landed rows stay on the ground)
+            aT = np.where(bFlying, aT+aInflationTime, aT)
+            aV = np.where(bFlying, dcInflation["final_velocity"], aV)
+            aH = np.where(bFlying, np.maximum(aH-dcInflation["distance"], 0.0), aH)
+            aStageDragArea = aDragArea
+
+    coast()
+    return {
+        "events": lEvents,
+        "landing_time": aT.reshape(tShape),
+        "impact_velocity": aV.reshape(tShape),
+        # NaN-ignoring maximum over the openings
+        "max_load": np.fmax.reduce([dcEvent["oscalc"] for dcEvent in lEvents], axis=0) if lEvents else np.full(tShape, np.nan),
+    }
@@ -0,0 +1,190 @@
+"""
+Sensitivity analysis - local derivatives and global (Sobol) indices of the CParachute outputs
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from Calculations.ConstantParameters import *
+from Calculations.CParachute import CParachuteBatch, getVelocityFromDiameter
+from Calculations.MonteCarlo import MONTE_CARLO_INPUTS, sampleDistribution, mergeMoments, _getDistributions
+
+SENSITIVITY_OUTPUTS = ("inflation_time", "ballistic_parameter", "pflanz", "oscalc", "simplified", "mass_ratio", "gnf", "descent_velocity")
+COMPLEX_STEP = 1e-30
+
+# Outputs are products of powers of the inputs: y = c*prod(x_j**e_j) * V_1**(s*k),
+# so dy/dx_j = y*e_j/x_j and dy/dk = s*y*ln(V_1) (k - DECCELERATION_EXPONENT).
+# Exponents e_j (inputs not listed - 0) and the factor s of the velocity exponent
+_ANALYTIC_EXPONENTS = {
+    # t_inf = n*D_0/V_1**k
+    "inflation_time": ({"INFLATION_CANOPY_FILL_CONST": 1.0, "CANOPY_DIAMETER": 1.0}, -1.0),
+    # A = 2*m/(C_d*S_o*ro*V_1*t_inf)
+    "ballistic_parameter": ({"MASS": 1.0, "DRAG_COEFF": -1.0, "CANOPY_DIAMETER": -3.0, "AIR_DENSITY": -1.0, "OPEN_VELOCITY": -1.0, "INFLATION_CANOPY_FILL_CONST": -1.0}, 1.0),
+    # F_max = ro*V_1**2/2*C_d*S_o*C_x*X_1
+    "pflanz": ({"AIR_DENSITY": 1.0, "OPEN_VELOCITY": 2.0, "DRAG_COEFF": 1.0, "CANOPY_DIAMETER": 2.0, "OPENING_LOAD_SHOCK_FACTOR": 1.0, "OPENING_FORCE_REDUCTION_FACTOR": 1.0}, 0.0),
+    "simplified": ({"AIR_DENSITY": 1.0, "OPEN_VELOCITY": 2.0, "DRAG_COEFF": 1.0, "CANOPY_DIAMETER": 2.0, "OPENING_LOAD_SHOCK_FACTOR": 1.0, "OPENING_FORCE_REDUCTION_FACTOR": 1.0}, 0.0),
+    # R_m = ro*(C_d*S_o)**(3/2)/m
+    "mass_ratio": ({"AIR_DENSITY": 1.0, "DRAG_COEFF": 1.5, "CANOPY_DIAMETER": 3.0, "MASS": -1.0}, 0.0),
+    # GNF = t_inf*V_1*DRAG_INTEGRAL/sqrt(C_d*S_o)
+    "gnf": ({"INFLATION_CANOPY_FILL_CONST": 1.0, "OPEN_VELOCITY": 1.0, "DRAG_INTEGRAL": 1.0, "DRAG_COEFF": -0.5}, -1.0),
+    # V = sqrt(2*m*g/(ro*S_o*C_d))
+    "descent_velocity": ({"MASS": 0.5, "G_ACCELERATION": 0.5, "AIR_DENSITY": -0.5, "DRAG_COEFF": -0.5, "CANOPY_DIAMETER": -1.0}, 0.0),
+}
+
+def evaluateOutputs(dcInputs: dict, lOutputs: list | tuple = SENSITIVITY_OUTPUTS):
+    """
+    CParachute outputs for arrays of MONTE_CARLO_INPUTS and INPUT_PARAMETERS values (complex-safe)
+    """
+    dcParameters = {sKey: _Value for sKey, _Value in dcInputs.items() if sKey not in MONTE_CARLO_INPUTS}
+    cParachutes = CParachuteBatch(dcInputs["MASS"], dcInputs["CANOPY_DIAMETER"], dcInputs["OPEN_VELOCITY"], dcParameters)
+    dcOut = {}
+    for sOutput in lOutputs:
+        if sOutput == "inflation_time": dcOut[sOutput] = cParachutes.fInflationTime
+        elif sOutput == "ballistic_parameter": dcOut[sOutput] = cParachutes.getBallisticParameter()
+        elif sOutput == "pflanz": dcOut[sOutput] = cParachutes.getPeakOpeningLoadPflanz()
+        elif sOutput == "simplified": dcOut[sOutput] = cParachutes.getPeakOpeningLoadSimplified()
+        elif sOutput in ("oscalc", "mass_ratio", "gnf"):
+            if not hasattr(cParachutes, "fPeakOpeningLoadOSCALC"): cParachutes.getPeakOpeningLoadOSCALC(bWarn=False)
+            dcOut[sOutput] = {"oscalc": cParachutes.fPeakOpeningLoadOSCALC, "mass_ratio": cParachutes.fMassRatio, "gnf": cParachutes.fGNFInf}[sOutput]
+        elif sOutput == "descent_velocity": dcOut[sOutput] = getVelocityFromDiameter(cParachutes.fCanopyDiameter, cParachutes.fMass, cParachutes.dcParameters)
+        else: raise KeyError(f"Unknown output: {sOutput}")
+    return dcOut
+
+def _getComplexStepJacobian(dcInputs: dict, lInputs: list, lOutputs: list, iPoints: int):
+    """
+    d(output)/d(input) = Im(f(x + i*h*e_j))/h for all points and inputs in one vectorized evaluation
+    """
+    iInputs = len(lInputs)
+    dcComplex = {}
+    for sKey, aValues in dcInputs.items():
+        aStacked = np.tile(aValues.astype(complex), iInputs).reshape(iInputs, iPoints)
+        if sKey in lInputs: aStacked[lInputs.index(sKey)] += 1j*COMPLEX_STEP
+        dcComplex[sKey] = aStacked.ravel()
+    dcOut = evaluateOutputs(dcComplex, lOutputs)
+    aJacobian = np.empty((iPoints, len(lOutputs), iInputs))
+    for iOutput, sOutput in enumerate(lOutputs):
+        aJacobian[:, iOutput, :] = (np.imag(np.broadcast_to(dcOut[sOutput], iInputs*iPoints))/COMPLEX_STEP).reshape(iInputs, iPoints).T
+    return aJacobian
+
+def getJacobian(
+        aMass: np.ndarray | float,
+        aCanopyDiameter: np.ndarray | float,
+        aOpenInitVelocity: np.ndarray | float,
+        dcParameters: dict = INPUT_PARAMETERS,
+        lOutputs: list | tuple = SENSITIVITY_OUTPUTS,
+        bAnalytic: bool = True
+    ):
+    """
+    Jacobian of the CParachute outputs w.r.t. mass, canopy diameter, opening velocity and every
+    INPUT_PARAMETERS entry, for a batch of design points (inputs and parameter values may be arrays).
+    Analytic derivatives of the closed-form expressions where available, vectorized complex-step otherwise
+    (bAnalytic=False - complex-step for all outputs).
+    Returns dict:
+    * 'inputs', 'outputs' - names along the last two axes
+    * 'values' - outputs, shape (points, outputs)
+    * 'jacobian' - dy/dx, shape (points, outputs, inputs)
+    * 'elasticity' - normalized sensitivities dln(y)/dln(x) = dy/dx*x/y, same shape
+    """
+    lOutputs = list(lOutputs)
+    lInputs = list(MONTE_CARLO_INPUTS)+list(dcParameters)
+    lArrays = np.broadcast_arrays(aMass, aCanopyDiameter, aOpenInitVelocity, *dcParameters.values())
+    dcInputs = {sKey: np.asarray(aValues, dtype=float).ravel() for sKey, aValues in zip(lInputs, lArrays)}
+    iPoints = dcInputs["MASS"].size
+
+    dcValues = evaluateOutputs(dcInputs, lOutputs)
+    aValues = np.stack([np.broadcast_to(dcValues[sOutput], iPoints) for sOutput in lOutputs], axis=1)
+    aX = np.stack([dcInputs[sKey] for sKey in lInputs], axis=1)
+    aJacobian = np.zeros((iPoints, len(lOutputs), len(lInputs)))
+
+    lNumeric = []
+    for iOutput, sOutput in enumerate(lOutputs):
+        if not bAnalytic or sOutput not in _ANALYTIC_EXPONENTS:
+            lNumeric.append(iOutput)
+            continue
+        dcExponents, fVelocityExponentFactor = _ANALYTIC_EXPONENTS[sOutput]
+        for sKey, fExponent in dcExponents.items():
+            iInput = lInputs.index(sKey)
+            aJacobian[:, iOutput, iInput] = aValues[:, iOutput]*fExponent/aX[:, iInput]
+        # Velocity exponent k appears as V_1**(s*k)
+        if fVelocityExponentFactor:
+            aJacobian[:, iOutput, lInputs.index("OPEN_VELOCITY")] += aValues[:, iOutput]*fVelocityExponentFactor*dcInputs["DECCELERATION_EXPONENT"]/dcInputs["OPEN_VELOCITY"]
+            aJacobian[:, iOutput, lInputs.index("DECCELERATION_EXPONENT")] = aValues[:, iOutput]*fVelocityExponentFactor*np.log(dcInputs["OPEN_VELOCITY"])
+    if lNumeric:
+        aJacobian[:, lNumeric, :] = _getComplexStepJacobian(dcInputs, lInputs, [lOutputs[iOutput] for iOutput in lNumeric], iPoints)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        aElasticity = aJacobian*aX[:, None, :]/aValues[:, :, None]
+    return {'inputs': lInputs, 'outputs': lOutputs, 'values': aValues, 'jacobian': aJacobian, 'elasticity': aElasticity}
+
+def _runSobolChunk(tArgs: tuple):
+    """
+    Worker - Saltelli sample matrices A, B and A_B(i) for one chunk, reduced to the sums of the estimators
+    """
+    dcDistributions, lFactors, lOutputs, iSeed, iChunk, iSamples = tArgs
+    cGenerator = np.random.default_rng(np.random.SeedSequence(iSeed, spawn_key=(2, iChunk)))
+    dcA = {sKey: sampleDistribution(cGenerator, _Distribution, iSamples) for sKey, _Distribution in dcDistributions.items()}
+    dcB = {sKey: sampleDistribution(cGenerator, dcDistributions[sKey], iSamples) for sKey in lFactors}
+    iFactors = len(lFactors)
+    # One evaluation: blocks [A, B, A_B(0), ..., A_B(k-1)]
+    dcStacked = {}
+    for sKey, aValues in dcA.items():
+        lBlocks = [aValues, dcB.get(sKey, aValues)]
+        lBlocks += [dcB[sKey] if sFactor == sKey else aValues for sFactor in lFactors]
+        dcStacked[sKey] = np.concatenate(lBlocks)
+    dcOut = evaluateOutputs(dcStacked, lOutputs)
+    dcSums = {}
+    for sOutput in lOutputs:
+        aY = np.broadcast_to(dcOut[sOutput], (iFactors+2)*iSamples).reshape(iFactors+2, iSamples)
+        aFA, aFB, aFAB = aY[0], aY[1], aY[2:]
+        # Output moments of the A and B samples (count, mean, M2)
+        aAB = aY[:2].ravel()
+        fMean = aAB.mean()
+        dcSums[sOutput] = {
+            'moments': (aAB.size, fMean, np.square(aAB-fMean).sum()),
+            # Saltelli (2010) first order and Jansen total effect estimators
+            'first': (aFB*(aFAB-aFA)).sum(axis=1),
+            'total': np.square(aFA-aFAB).sum(axis=1),
+        }
+    return dcSums
+
+def getSobolIndices(
+        dcDistributions: dict,
+        iSamples: int,
+        iSeed: int = 0,
+        dcParameters: dict = INPUT_PARAMETERS,
+        lOutputs: list | tuple = SENSITIVITY_OUTPUTS,
+        iWorkers: int | None = None,
+        iChunkSize: int = 50000
+    ):
+    """
+    Global sensitivity - first order and total Sobol indices of the outputs w.r.t. every input
+    with a random distribution (see MonteCarlo.sampleDistribution; constant inputs are not factors).
+    Saltelli sampling: iSamples*(factors+2) model evaluations, split into chunks with own
+    SeedSequence streams and evaluated on a process pool (iWorkers=1 - in-process);
+    results depend on iSeed only, not on the worker count.
+    Returns dict: 'factors' - input names, output name -> {'first': array, 'total': array, 'variance': float}
+    """
+    if iSamples <= 0: raise ValueError(f"Number of samples has to be positive ({iSamples})")
+    dcDistributions = _getDistributions(dcDistributions, dcParameters)
+    lFactors = [sKey for sKey, _Distribution in dcDistributions.items() if not np.isscalar(_Distribution)]
+    lOutputs = list(lOutputs)
+    lChunks = [
+        (dcDistributions, lFactors, lOutputs, iSeed, iChunk, min(iChunkSize, iSamples-iChunk*iChunkSize))
+        for iChunk in range(int(np.ceil(iSamples/iChunkSize)))
+    ]
+    if iWorkers == 1:
+        lResults = list(map(_runSobolChunk, lChunks))
+    else:
+        with ProcessPoolExecutor(max_workers=iWorkers) as cExecutor:
+            lResults = list(cExecutor.map(_runSobolChunk, lChunks))
+
+    dcDataOut = {'factors': lFactors, 'samples': iSamples}
+    for sOutput in lOutputs:
+        tMoments = (0, 0.0, 0.0)
+        for dcSums in lResults: tMoments = mergeMoments(tMoments, dcSums[sOutput]['moments'])
+        fVariance = tMoments[2]/(2*iSamples)
+        aFirst = sum(dcSums[sOutput]['first'] for dcSums in lResults)/iSamples
+        aTotal = sum(dcSums[sOutput]['total'] for dcSums in lResults)/(2*iSamples)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dcDataOut[sOutput] = {'first': aFirst/fVariance, 'total': aTotal/fVariance, 'variance': fVariance}
+    return dcDataOut
@@ -3,13 +3,19 @@ import dash_bootstrap_components as dbc
 from dash_bootstrap_components import themes
 from dash.dependencies import Input, Output, State
 import webbrowser
-import pandas as pd
 import datetime
+import flask
 
 from structure.page import serveSim1, serveSim2, serveNavbar, serveFooter, serveInputData
 from structure.plotter import plotResults, getEmptyPlot
+from structure.cache import RESULT_CACHE
+from structure.background import backgroundCallback, JOB_QUEUE, CQueueFullError
+from structure.export import sendResults, EXPORT_EXTENSIONS
+from structure.metrics import METRICS, logCallbackError
+from structure.api import getApiBlueprint, API_MAX_CONTENT_LENGTH
 from Calculations.CParachute import CParachute, calculateDiameterVelocityRelationship
 from Calculations.Air import getAirDensity
+from Calculations.Parameters import CParameterSet, getPreset
 from Calculations.ConstantParameters import INPUT_PARAMETERS, KELVIN_OFFSET
 
 import numpy as np
@@ -22,6 +28,39 @@ app = Dash(__name__,
 )
 app._favicon = r'app.png'
 
+# Result cache statistics - RESULT_CACHE, shared with the job processes if background callbacks are enabled
+@app.server.route('/cache-stats')
+def _serve_cache_stats():
+    return flask.jsonify({**RESULT_CACHE.getStats(), "background_jobs": JOB_QUEUE.getStats()})
+
+# Batched calculation API (/api/v1), oversized request bodies are refused before they are read
+app.server.register_blueprint(getApiBlueprint())
+app.server.config["MAX_CONTENT_LENGTH"] = API_MAX_CONTENT_LENGTH
+
+# Timers and counters in the Prometheus text format (PARASIM_METRICS=1)
+if METRICS.bEnabled:
+    METRICS.instrumentServer(app.server)
+
+    @app.server.route('/metrics')
+    def _serve_metrics():
+        dcCacheStats, dcJobStats = RESULT_CACHE.getStats(), JOB_QUEUE.getStats()
+        dcGauges = {
+            "result_cache_entries": (dcCacheStats["entries"], "Entries in the result cache"),
+            "result_cache_hits": (dcCacheStats["hits"], "Result cache hits"),
+            "result_cache_misses": (dcCacheStats["misses"], "Result cache misses"),
+            "background_jobs_running": (dcJobStats["running"], "Background jobs being calculated"),
+            "background_jobs_queued": (dcJobStats["queued"], "Background jobs waiting for a slot"),
+        }
+        return flask.Response(METRICS.render(dcGauges), mimetype="text/plain; version=0.0.4")
+
+def _setJobProgress(fnSetProgress, iPercent: int, sLabel: str):
+    fnSetProgress((iPercent, sLabel))
+
+def _getQueueProgress(fnSetProgress):
+    return lambda iPosition: _setJobProgress(fnSetProgress, 0, f"W kolejce ({iPosition})")
+
+SERVER_BUSY_MESSAGE = "Serwer zajęty - spróbuj ponownie za chwilę"
+
 def _serve_layout():
     return html.Div([
         html.Meta(charSet="utf-8"),
@@ -42,6 +81,7 @@ def _serve_layout():
     Output('page-content', 'children'),
     Input('url', 'pathname')
 )
+@METRICS.timed("callback", "display_page")
 def display_page(sUrl: str | None):
     return html.Div(
         [
@@ -70,6 +110,7 @@ app.layout = _serve_layout()
     Input('input-run-button', 'n_clicks'),
     Input('input-airdensity-input', 'value')
 )
+@METRICS.timed("callback", "airdensity", bProfile=True)
 def callback(fRefPressure: float, fRefTemp: float, fHeight: float, fHumidity: float, dcStore: dict, _Button, _ValAirInput): 
     sTrigger = callback_context.triggered_id
     if sTrigger == 'input-airdensity-input':
@@ -77,24 +118,44 @@ def callback(fRefPressure: float, fRefTemp: float, fHeight: float, fHumidity: fl
         return no_update, None, dcStyle, dcStyle, {}
     if _Button: 
         try:    
-            fRefPressure *= 100
-            fRefTemp += KELVIN_OFFSET # Celcius degrees to Kelvins
-            fHeight *= -1.0
-            fHumidity /= 100.0
-            fDensity = round(getAirDensity(fRefPressure, fRefTemp, fHeight, fHumidity, dcParameters = dcStore),3)
+            fDensity, dcData = _calculateAirDensity(fRefPressure, fRefTemp, fHeight, fHumidity, dcStore)
             dcStyle = {"background-color": "rgba(75,75,225, 0.5)"}
-            dcData = {
-                "Referencyjne ciśnienie atmosferyczne [hPa]": round(fRefPressure,1),
-                "Referencyjna temperatura powietrza [C]": round(fRefTemp,1),
-                "Względna wysokość otwarcia spadochronu [m]": fHeight,
-                "Referencyjna wilgotność powietrza [%]": round(fHumidity*100.0),
-                "Gęstość powietrza [kg/m3]]": round(fDensity,3),
-            }
             return fDensity, fDensity, dcStyle, dcStyle, dcData
         except Exception as E:
-            print(E)
+            logCallbackError("airdensity", E)
     return no_update, no_update, no_update, no_update, {}
 
+@RESULT_CACHE.memoize('airdensity')
+def _calculateAirDensity(fRefPressure: float, fRefTemp: float, fHeight: float, fHumidity: float, dcParameters: dict):
+    fRefPressure *= 100
+    fRefTemp += KELVIN_OFFSET # Celcius degrees to Kelvins
+    fHeight *= -1.0
+    fHumidity /= 100.0
+    with METRICS.measure("calculation", "getAirDensity"):
+        fDensity = round(float(getAirDensity(fRefPressure, fRefTemp, fHeight, fHumidity, dcParameters = dcParameters)),3)
+    dcData = {
+        "Referencyjne ciśnienie atmosferyczne [hPa]": round(fRefPressure,1),
+        "Referencyjna temperatura powietrza [C]": round(fRefTemp,1),
+        "Względna wysokość otwarcia spadochronu [m]": fHeight,
+        "Referencyjna wilgotność powietrza [%]": round(fHumidity*100.0),
+        "Gęstość powietrza [kg/m3]]": round(fDensity,3),
+    }
+    return fDensity, dcData
+
+@app.callback(
+    Output('input-dragcoeff-input', 'value'),
+    Output('input-schockfactor-input', 'value'),
+    Output('input-fillconst-input', 'value'),
+    Input('input-preset-dropdown', 'value'),
+    prevent_initial_call=True
+)
+@METRICS.timed("callback", "preset", bProfile=True)
+def callback(sPreset: str | None):
+    # Canopy type dependent parameters of the preset - the remaining inputs are kept
+    if not sPreset: return no_update, no_update, no_update
+    cPreset = getPreset(sPreset)
+    return cPreset.fDragCoeff, cPreset.fShockFactor, cPreset.fFillConst
+
 @app.callback(
     Output('input-parameters-store', 'data'),
     Input('input-airdensity-input', 'value'),
@@ -105,86 +166,142 @@ def callback(fRefPressure: float, fRefTemp: float, fHeight: float, fHumidity: fl
     Input('input-fillconst-input', 'value'),
     Input('input-deccel-input', 'value'),
     Input('input-draginteg-input', 'value'),
-    State('input-parameters-store', 'data')
 )
-def callback(fAirDensity: float, fGAccel: float, fDragCoeff: float, fSchockFactor: float, fForceReduction: float, fFillConst: float, fDeccelExp: float, fDragInteg: float, dcStore: dict):
-    dcStore["AIR_DENSITY"] = fAirDensity
-    dcStore["DRAG_COEFF"] = fDragCoeff
-    dcStore["G_ACCELERATION"] = fGAccel
-    dcStore["OPENING_LOAD_SHOCK_FACTOR"] = fSchockFactor
-    dcStore["OPENING_FORCE_REDUCTION_FACTOR"] = fForceReduction
-    dcStore["INFLATION_CANOPY_FILL_CONST"] = fFillConst
-    dcStore["DECCELERATION_EXPONENT"] = fDeccelExp
-    dcStore["DRAG_INTEGRAL"] = fDragInteg
-    return dcStore
+@METRICS.timed("callback", "parameters", bProfile=True)
+def callback(fAirDensity: float, fGAccel: float, fDragCoeff: float, fSchockFactor: float, fForceReduction: float, fFillConst: float, fDeccelExp: float, fDragInteg: float):
+    # Validated, immutable parameter set - the store keeps its plain dict form
+    try:
+        cParameters = CParameterSet(
+            AIR_DENSITY=fAirDensity,
+            DRAG_COEFF=fDragCoeff,
+            G_ACCELERATION=fGAccel,
+            OPENING_LOAD_SHOCK_FACTOR=fSchockFactor,
+            OPENING_FORCE_REDUCTION_FACTOR=fForceReduction,
+            INFLATION_CANOPY_FILL_CONST=fFillConst,
+            DECCELERATION_EXPONENT=fDeccelExp,
+            DRAG_INTEGRAL=fDragInteg,
+        )
+    except (TypeError, ValueError):
+        # Incomplete or invalid input - keep the previous parameters
+        return no_update
+    return cParameters.toDict()
 
-@app.callback(
+@backgroundCallback(
+    app,
     Output('simulation1-results-plot', 'figure'),
     Output('simulation1-diameter-input', 'value'),
     Output('simulation1-results-store', 'data'),
+    Output('simulation1-status-text', 'children'),
     State('simulation1-mass-input', 'value'),
     State('simulation1-velocity-input', 'value'),
     State('simulation1-velocitystart-input', 'value'),
     State('simulation1-velocitystop-input', 'value'),
     State('input-parameters-store', 'data'),
     State('simulation1-plotlang-radio', 'value'),
-    Input('simulation1-run-button', 'n_clicks')
+    Input('simulation1-run-button', 'n_clicks'),
+    progress=[Output('simulation1-progress-bar', 'value'), Output('simulation1-progress-bar', 'label')],
+    progress_default=[0, ""],
+    running=[
+        (Output('simulation1-run-button', 'disabled'), True, False),
+        (Output('simulation1-cancel-button', 'disabled'), False, True),
+    ],
+    cancel=[Input('simulation1-cancel-button', 'n_clicks')],
+    prevent_initial_call=True
 )
-def callback(fMass: float, fVelocity: float, fVelocityStart: float, fVelocityStop: float, dcParameters: dict, sLanguage: str, _Button):
+@METRICS.timed("callback", "simulation1", bProfile=True)
+def callback(fnSetProgress, fMass: float, fVelocity: float, fVelocityStart: float, fVelocityStop: float, dcParameters: dict, sLanguage: str, _Button):
     if _Button:
         try:
-            bIsPL = sLanguage=="PL"
-            aVelocity, aDiameters = calculateDiameterVelocityRelationship(
-                fMass=fMass,
-                tTargetVelocityRange=(fVelocityStart, fVelocityStop),
-                iSamples=100,
-                dcParameters=dcParameters
-            )
-
-            fVelocity = aVelocity[np.argmin(np.abs(aVelocity-fVelocity))]
-            fDiameter = aDiameters[np.argmin(np.abs(aVelocity-fVelocity))]
-            
-            dcData = {
-                "Masa pojazdu [kg]": fMass,
-                "Docelowa prędkość opadania [m/s]": round(fVelocity,3),
-                "Średnica czaszy spadochronu [m]": round(fDiameter,3),
-            }
-
-            return plotResults(
-                aVelocity, aDiameters, 
-                sColour="black", 
-                sXlabel="Docelowa prędkość opadania [m/s]" if bIsPL else "Target descent velocity [m/s]", 
-                sYLabel="Średnica czaszy [m]" if bIsPL else "Canopy diameter [m]", 
-                lHorizontalLines=[(fDiameter,'crimson')], lVerticalLines=[(fVelocity,'crimson')]
-            ), np.round(fDiameter,2), dcData
+            with JOB_QUEUE.slot(_getQueueProgress(fnSetProgress)):
+                _setJobProgress(fnSetProgress, 50, "Obliczenia...")
+                return *_runSimulation1(fMass, fVelocity, fVelocityStart, fVelocityStop, dcParameters, sLanguage), ""
+        except CQueueFullError:
+            return no_update, no_update, no_update, SERVER_BUSY_MESSAGE
         except Exception as E:
-            print(E)
-    return getEmptyPlot(), 0.0, {}
+            logCallbackError("simulation1", E)
+    return getEmptyPlot(), 0.0, {}, ""
 
+@RESULT_CACHE.memoize('simulation1')
+def _runSimulation1(fMass: float, fVelocity: float, fVelocityStart: float, fVelocityStop: float, dcParameters: dict, sLanguage: str):
+    bIsPL = sLanguage=="PL"
+    with METRICS.measure("calculation", "calculateDiameterVelocityRelationship"):
+        aVelocity, aDiameters = calculateDiameterVelocityRelationship(
+            fMass=fMass,
+            tTargetVelocityRange=(fVelocityStart, fVelocityStop),
+            iSamples=100,
+            dcParameters=dcParameters
+        )
 
-@app.callback(
+    fVelocity = aVelocity[np.argmin(np.abs(aVelocity-fVelocity))]
+    fDiameter = aDiameters[np.argmin(np.abs(aVelocity-fVelocity))]
+    
+    dcData = {
+        "Masa pojazdu [kg]": fMass,
+        "Docelowa prędkość opadania [m/s]": round(fVelocity,3),
+        "Średnica czaszy spadochronu [m]": round(fDiameter,3),
+    }
+
+    # Payload size and serialization time are measured only with the metrics enabled (extra serialization)
+    dcPlotStats = {} if METRICS.bEnabled else None
+    dcFigure = plotResults(
+        aVelocity, aDiameters, 
+        sColour="black", 
+        sXlabel="Docelowa prędkość opadania [m/s]" if bIsPL else "Target descent velocity [m/s]", 
+        sYLabel="Średnica czaszy [m]" if bIsPL else "Canopy diameter [m]", 
+        lHorizontalLines=[(fDiameter,'crimson')], lVerticalLines=[(fVelocity,'crimson')],
+        dcStats=dcPlotStats
+    )
+    METRICS.observePlot("simulation1", dcPlotStats)
+    return dcFigure, np.round(fDiameter,2), dcData
+
+
+@backgroundCallback(
+    app,
     Output('simulation2-numericdata-container', 'children'),
     Output('simulation2-results-store', 'data'),
+    Output('simulation2-status-text', 'children'),
     State('simulation2-mass-input', 'value'),
     State('simulation2-velocity-input', 'value'),
     State('simulation2-diameter-input', 'value'),
     State('input-parameters-store', 'data'),
-    Input('simulation2-run-button', 'n_clicks')
+    Input('simulation2-run-button', 'n_clicks'),
+    progress=[Output('simulation2-progress-bar', 'value'), Output('simulation2-progress-bar', 'label')],
+    progress_default=[0, ""],
+    running=[
+        (Output('simulation2-run-button', 'disabled'), True, False),
+        (Output('simulation2-cancel-button', 'disabled'), False, True),
+    ],
+    cancel=[Input('simulation2-cancel-button', 'n_clicks')],
+    prevent_initial_call=True
 )
-def callback(fMass: float, fVelocity: float, fDiameter: float, dcParameters: dict, _Button):
+@METRICS.timed("callback", "simulation2", bProfile=True)
+def callback(fnSetProgress, fMass: float, fVelocity: float, fDiameter: float, dcParameters: dict, _Button):
 
     if _Button:
         try:
-            cParachute = CParachute(
-                fCanopyDiameter = fDiameter,
-                fOpenInitVelocity = fVelocity,
-                fMass = fMass,
-                dcParameters = dcParameters,
-            )
-            dcDataLoad = cParachute.getPeakOpeningLoad()
-            fBallisticParam = cParachute.getBallisticParameter()
-
-            sReturn = html.Pre(
+            with JOB_QUEUE.slot(_getQueueProgress(fnSetProgress)):
+                _setJobProgress(fnSetProgress, 50, "Obliczenia...")
+                return *_runSimulation2(fMass, fVelocity, fDiameter, dcParameters), ""
+        except CQueueFullError:
+            return no_update, no_update, SERVER_BUSY_MESSAGE
+        except Exception as E: 
+            logCallbackError("simulation2", E)
+    
+    return "Brak danych", {}, ""
+
+@RESULT_CACHE.memoize('simulation2')
+def _runSimulation2(fMass: float, fVelocity: float, fDiameter: float, dcParameters: dict):
+    with METRICS.measure("calculation", "CParachute"):
+        cParachute = CParachute(
+            fCanopyDiameter = fDiameter,
+            fOpenInitVelocity = fVelocity,
+            fMass = fMass,
+            dcParameters = dcParameters,
+        )
+        dcDataLoad = cParachute.getPeakOpeningLoad()
+        fBallisticParam = cParachute.getBallisticParameter()
+
+    sReturn = html.Pre(
     f"""Masa pojazdu: {cParachute.fMass} kg.
 Prędkość przy otwarciu: {round(cParachute.fOpenInitVelocity,3)} m/s.
 Średnica czaszy spadochronu: {round(cParachute.fCanopyDiameter,3)} m.
@@ -192,22 +309,20 @@ Czas napełniania czaszy: {round(cParachute.fInflationTime,3)} s.
 Parametr balistyczny: {round(fBallisticParam,3)}.
 Szczytowe obciążenie przy otwarciu:
 \t* metoda Pflanz: {round(dcDataLoad['pflanz'],1)} N
-\t* metoda OSCALC: {round(dcDataLoad['oscalc'],1)} N"""
-                )
-            dcData = {
-                "Masa pojazdu [kg]": cParachute.fMass,
-                "Prędkość przy otwarciu [m/s]": round(cParachute.fOpenInitVelocity,3),
-                "Średnica czaszy spadochronu [m]": round(cParachute.fCanopyDiameter,3),
-                "Czas napełniania czaszy [s]": round(cParachute.fInflationTime,3),
-                "Parametr balistyczny [-]": round(fBallisticParam,3),
-                "Szczytowe obciążenie (Pflanz) [N]": round(dcDataLoad['pflanz'],1),
-                "Szczytowe obciążenie (OSCALC) [N]": round(dcDataLoad['oscalc'],1),
-            }
-            return sReturn, dcData
-        except Exception as E: 
-            print(E)  
-    
-    return "Brak danych", {}
+\t* metoda OSCALC: {round(dcDataLoad['oscalc'],1)} N
+Impuls siły otwarcia (OSCALC): {round(cParachute.fOpeningImpulse,1)} N*s"""
+        )
+    dcData = {
+        "Masa pojazdu [kg]": cParachute.fMass,
+        "Prędkość przy otwarciu [m/s]": round(cParachute.fOpenInitVelocity,3),
+        "Średnica czaszy spadochronu [m]": round(cParachute.fCanopyDiameter,3),
+        "Czas napełniania czaszy [s]": round(cParachute.fInflationTime,3),
+        "Parametr balistyczny [-]": round(fBallisticParam,3),
+        "Szczytowe obciążenie (Pflanz) [N]": round(dcDataLoad['pflanz'],1),
+        "Szczytowe obciążenie (OSCALC) [N]": round(dcDataLoad['oscalc'],1),
+        "Impuls siły otwarcia (OSCALC) [N*s]": round(cParachute.fOpeningImpulse,1),
+    }
+    return sReturn, dcData
     
 
 @app.callback(
@@ -218,6 +333,7 @@ Szczytowe obciążenie przy otwarciu:
     Input('simulation1-mass-input', 'value'),
     Input('simulation2-mass-input', 'value'),
 )
+@METRICS.timed("callback", "mass_sync", bProfile=True)
 def callback(fMass1: float, fMass2: float):
     sTrigger = callback_context.triggered_id
     if sTrigger == 'simulation1-mass-input':
@@ -238,6 +354,7 @@ def callback(fMass1: float, fMass2: float):
     Input('simulation1-diameter-input', 'value'),
     Input('simulation2-diameter-input', 'value')
 )
+@METRICS.timed("callback", "diameter_sync", bProfile=True)
 def callback(fDiameter: float, _Sim2Val):
     sTrigger = callback_context.triggered_id
     if sTrigger == 'simulation1-diameter-input':
@@ -250,52 +367,70 @@ def callback(fDiameter: float, _Sim2Val):
         return no_update, no_update, no_update
 
 
-@app.callback(
+@backgroundCallback(
+    app,
     Output('airdensity-results-download', 'data'),
     State('airdensity-results-store', 'data'),
-    Input('input-save-button', 'n_clicks')
+    State('input-format-radio', 'value'),
+    State('input-parameters-store', 'data'),
+    Input('input-save-button', 'n_clicks'),
+    running=[(Output('input-save-button', 'disabled'), True, False)],
+    prevent_initial_call=True
 )
-def callback(dcData: dict, _Button):
+@METRICS.timed("callback", "airdensity_download", bProfile=True)
+def callback(dcData: dict, sFormat: str, dcParameters: dict, _Button):
 
     if _Button:
         try:
-            sName = 'wyniki_gestosc_{}.csv'.format(datetime.datetime.now().strftime('%Y%m%d_%H%M%S'))
-            pdData = pd.DataFrame().from_dict({key: [dcData[key]] for key in dcData})
-            return dcc.send_data_frame(pdData.to_csv, sName, sep = ';', index = False, header=True, encoding='utf-8')
+            sFormat = sFormat.lower()
+            sName = 'wyniki_gestosc_{}.{}'.format(datetime.datetime.now().strftime('%Y%m%d_%H%M%S'), EXPORT_EXTENSIONS[sFormat])
+            return sendResults({key: [dcData[key]] for key in dcData}, sName, sFormat, dcMetadata={"parameters": dcParameters})
         except Exception as E: 
-            print(E)  
+            logCallbackError("airdensity_download", E)
     return no_update
 
-@app.callback(
+@backgroundCallback(
+    app,
     Output('simulation1-results-download', 'data'),
     State('simulation1-results-store', 'data'),
-    Input('simulation1-save-button', 'n_clicks')
+    State('simulation1-format-radio', 'value'),
+    State('input-parameters-store', 'data'),
+    Input('simulation1-save-button', 'n_clicks'),
+    running=[(Output('simulation1-save-button', 'disabled'), True, False)],
+    prevent_initial_call=True
 )
-def callback(dcData: dict, _Button):
+@METRICS.timed("callback", "simulation1_download", bProfile=True)
+def callback(dcData: dict, sFormat: str, dcParameters: dict, _Button):
 
     if _Button:
         try:
-            sName = 'wyniki_srednica_{}.csv'.format(datetime.datetime.now().strftime('%Y%m%d_%H%M%S'))
-            pdData = pd.DataFrame().from_dict({key: [dcData[key]] for key in dcData})
-            return dcc.send_data_frame(pdData.to_csv, sName, sep = ';', index = False, header=True, encoding='utf-8')
+            sFormat = sFormat.lower()
+            sName = 'wyniki_srednica_{}.{}'.format(datetime.datetime.now().strftime('%Y%m%d_%H%M%S'), EXPORT_EXTENSIONS[sFormat])
+            return sendResults({key: [dcData[key]] for key in dcData}, sName, sFormat, dcMetadata={"parameters": dcParameters})
         except Exception as E: 
-            print(E)  
+            logCallbackError("simulation1_download", E)
     return no_update
 
-@app.callback(
+@backgroundCallback(
+    app,
     Output('simulation2-results-download', 'data'),
     State('simulation2-results-store', 'data'),
-    Input('simulation2-save-button', 'n_clicks')
+    State('simulation2-format-radio', 'value'),
+    State('input-parameters-store', 'data'),
+    Input('simulation2-save-button', 'n_clicks'),
+    running=[(Output('simulation2-save-button', 'disabled'), True, False)],
+    prevent_initial_call=True
 )
-def callback(dcData: dict, _Button):
+@METRICS.timed("callback", "simulation2_download", bProfile=True)
+def callback(dcData: dict, sFormat: str, dcParameters: dict, _Button):
 
     if _Button:
         try:
-            sName = 'wyniki_obciazenia_{}.csv'.format(datetime.datetime.now().strftime('%Y%m%d_%H%M%S'))
-            pdData = pd.DataFrame().from_dict({key: [dcData[key]] for key in dcData})
-            return dcc.send_data_frame(pdData.to_csv, sName, sep = ';', index = False, header=True, encoding='utf-8')
+            sFormat = sFormat.lower()
+            sName = 'wyniki_obciazenia_{}.{}'.format(datetime.datetime.now().strftime('%Y%m%d_%H%M%S'), EXPORT_EXTENSIONS[sFormat])
+            return sendResults({key: [dcData[key]] for key in dcData}, sName, sFormat, dcMetadata={"parameters": dcParameters})
         except Exception as E: 
-            print(E)  
+            logCallbackError("simulation2_download", E)
     return no_update
 
 
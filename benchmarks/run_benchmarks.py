@@ -0,0 +1,174 @@
+"""
+Benchmark suite for the calculation and plotting hot paths
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks                      # run and print JSON
+    python -m benchmarks.run_benchmarks --output results.json
+    python -m benchmarks.run_benchmarks --save-baseline      # store results as the new baseline
+    python -m benchmarks.run_benchmarks --compare            # fail (exit code 1) on regressions
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+from Calculations.Air import getAirDensity
+from Calculations.CParachute import CParachute, CParachuteBatch, getDiamaterFromVelocity, calculateDiameterVelocityRelationship
+from structure.plotter import plotResults
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SIZES = (1, 1000, 1000000)
+# Scalar (Python loop) cases are skipped above this size by default
+MAX_SCALAR_SIZE = 1000
+
+def _getInputs(iSize: int):
+    cGenerator = np.random.default_rng(0)
+    return {
+        "pressure": cGenerator.uniform(95000.0, 105000.0, iSize),
+        "temperature": cGenerator.uniform(260.0, 310.0, iSize),
+        "height": -cGenerator.uniform(0.0, 5000.0, iSize),
+        "humidity": cGenerator.uniform(0.0, 1.0, iSize),
+        "mass": cGenerator.uniform(1.0, 50.0, iSize),
+        "diameter": cGenerator.uniform(0.3, 5.0, iSize),
+        "velocity": cGenerator.uniform(5.0, 25.0, iSize),
+        "open_velocity": cGenerator.uniform(20.0, 80.0, iSize),
+    }
+
+def _getCases(iSize: int, iMaxScalarSize: int):
+    """
+    Benchmark cases for given size - (name, kind, callable)
+    """
+    dcIn = _getInputs(iSize)
+    lScalar = {sKey: aValue.tolist() for sKey, aValue in dcIn.items()}
+    lCases = []
+
+    if iSize <= iMaxScalarSize:
+        lCases += [
+            ("getAirDensity", "scalar", lambda: [getAirDensity(fP, fT, fH, fRH) for fP, fT, fH, fRH in zip(lScalar["pressure"], lScalar["temperature"], lScalar["height"], lScalar["humidity"])]),
+            ("getDiamaterFromVelocity", "scalar", lambda: [getDiamaterFromVelocity(fV, fM) for fV, fM in zip(lScalar["velocity"], lScalar["mass"])]),
+            ("CParachute", "scalar", lambda: [CParachute(fM, fD, fV) for fM, fD, fV in zip(lScalar["mass"], lScalar["diameter"], lScalar["open_velocity"])]),
+            ("getPeakOpeningLoad", "scalar", lambda: [CParachute(fM, fD, fV).getPeakOpeningLoad() for fM, fD, fV in zip(lScalar["mass"], lScalar["diameter"], lScalar["open_velocity"])]),
+        ]
+    lCases += [
+        ("getAirDensity", "batched", lambda: getAirDensity(dcIn["pressure"], dcIn["temperature"], dcIn["height"], dcIn["humidity"])),
+        ("getDiamaterFromVelocity", "batched", lambda: getDiamaterFromVelocity(dcIn["velocity"], dcIn["mass"])),
+        ("calculateDiameterVelocityRelationship", "batched", lambda: calculateDiameterVelocityRelationship(5.0, (5.0, 25.0), iSize)),
+        ("CParachute", "batched", lambda: CParachuteBatch(dcIn["mass"], dcIn["diameter"], dcIn["open_velocity"])),
+        ("getPeakOpeningLoad", "batched", lambda: _getBatchLoads(dcIn)),
+        ("plotResults", "batched", lambda: plotResults(np.sort(dcIn["velocity"]), dcIn["diameter"], sXlabel="x", sYLabel="y", lHorizontalLines=[(1.0, 'crimson')], lVerticalLines=[(10.0, 'crimson')])),
+        ("plotResults(validated)", "batched", lambda: plotResults(np.sort(dcIn["velocity"]), dcIn["diameter"], sXlabel="x", sYLabel="y", lHorizontalLines=[(1.0, 'crimson')], lVerticalLines=[(10.0, 'crimson')], bValidate=True)),
+    ]
+    return lCases
+
+def _getBatchLoads(dcIn: dict):
+    # All three load models without the GNF warning check
+    cParachutes = CParachuteBatch(dcIn["mass"], dcIn["diameter"], dcIn["open_velocity"])
+    return cParachutes.getPeakOpeningLoadOSCALC(bWarn=False), cParachutes.getPeakOpeningLoadPflanz(), cParachutes.getPeakOpeningLoadSimplified()
+
+def timeCallable(fnCallable, fMinTime: float = 0.5, fMinMeasurement: float = 2e-3, iMaxRepeats: int = 200):
+    """
+    Time fnCallable for at least fMinTime [s] (min. 3 measurements), returns timings per call [s].
+    Fast calls are looped so that one measurement takes at least fMinMeasurement [s] (like timeit.autorange).
+    """
+    iNumber = 1
+    while True:
+        fT0 = time.perf_counter()
+        for _ in range(iNumber): fnCallable()
+        fElapsed = time.perf_counter()-fT0
+        if fElapsed >= fMinMeasurement: break
+        iNumber *= 2 if fElapsed == 0.0 else max(2, int(np.ceil(fMinMeasurement/fElapsed)))
+    lTimes = [fElapsed/iNumber]
+    fStart = time.perf_counter()
+    while len(lTimes) < 3 or (time.perf_counter()-fStart < fMinTime and len(lTimes) < iMaxRepeats):
+        fT0 = time.perf_counter()
+        for _ in range(iNumber): fnCallable()
+        lTimes.append((time.perf_counter()-fT0)/iNumber)
+    return lTimes, iNumber
+
+def runBenchmarks(lSizes: list | tuple = SIZES, iMaxScalarSize: int = MAX_SCALAR_SIZE, sFilter: str | None = None):
+    """
+    Run all benchmark cases - returns JSON-serializable dict
+    """
+    dcResults = {}
+    for iSize in lSizes:
+        for sName, sKind, fnCallable in _getCases(iSize, iMaxScalarSize):
+            sKey = f"{sName}[{sKind},{iSize}]"
+            if sFilter and sFilter not in sKey: continue
+            lTimes, iNumber = timeCallable(fnCallable)
+            dcResults[sKey] = {
+                "name": sName,
+                "kind": sKind,
+                "size": iSize,
+                "repeats": len(lTimes),
+                "loops": iNumber,
+                "min": min(lTimes),
+                "median": float(np.median(lTimes)),
+                "per_item": min(lTimes)/iSize,
+            }
+            print(f"{sKey:60s} {min(lTimes)*1e3:12.4f} ms", file=sys.stderr)
+    return {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+        },
+        "results": dcResults,
+    }
+
+def compareResults(dcCurrent: dict, dcBaseline: dict, fThreshold: float):
+    """
+    Compare min. timings against the baseline - returns list of regressions
+    (cases slower than the baseline by more than fThreshold, e.g. 0.25 = 25%)
+    """
+    lRegressions = []
+    for sKey, dcResult in dcCurrent["results"].items():
+        dcBase = dcBaseline["results"].get(sKey)
+        if dcBase is None: continue
+        fRatio = dcResult["min"]/dcBase["min"]
+        dcResult["baseline_ratio"] = fRatio
+        if fRatio > 1.0+fThreshold:
+            lRegressions.append({"case": sKey, "baseline": dcBase["min"], "current": dcResult["min"], "ratio": fRatio})
+    return lRegressions
+
+def main(lArgs: list | None = None):
+    cParser = argparse.ArgumentParser(description="ParaSim benchmarks")
+    cParser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="problem sizes")
+    cParser.add_argument("--max-scalar-size", type=int, default=MAX_SCALAR_SIZE, help="largest size for the scalar (Python loop) cases")
+    cParser.add_argument("--filter", default=None, help="run only cases containing this text")
+    cParser.add_argument("--output", default=None, help="write results JSON to this file (default: stdout)")
+    cParser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    cParser.add_argument("--save-baseline", action="store_true", help="store results as the baseline")
+    cParser.add_argument("--compare", action="store_true", help="compare with the baseline, exit code 1 on regressions")
+    cParser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs. baseline (0.25 = 25%%)")
+    cArgs = cParser.parse_args(lArgs)
+
+    dcResults = runBenchmarks(cArgs.sizes, cArgs.max_scalar_size, cArgs.filter)
+    lRegressions = []
+    if cArgs.compare:
+        with open(cArgs.baseline, encoding="utf-8") as cFile:
+            lRegressions = compareResults(dcResults, json.load(cFile), cArgs.threshold)
+        dcResults["regressions"] = lRegressions
+        dcResults["threshold"] = cArgs.threshold
+
+    sJson = json.dumps(dcResults, indent=2)
+    if cArgs.output:
+        with open(cArgs.output, "w", encoding="utf-8") as cFile: cFile.write(sJson)
+    else:
+        print(sJson)
+    if cArgs.save_baseline:
+        with open(cArgs.baseline, "w", encoding="utf-8") as cFile: cFile.write(sJson)
+
+    for dcRegression in lRegressions:
+        print(f"REGRESSION {dcRegression['case']}: {dcRegression['ratio']:.2f}x baseline", file=sys.stderr)
+    return 1 if lRegressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
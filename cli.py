@@ -0,0 +1,110 @@
+"""
+Headless batch calculations - design sweeps from CSV/Parquet case files
+
+Case file columns:
+* mass [kg], opening_velocity [m/s] - required
+* diameter [m] or target_velocity [m/s] - canopy diameter is computed from the target velocity if not given
+* ref_pressure [hPa], ref_temp [C], height [m], humidity [%] - optional, air density is computed if all are given
+  (with --atmosphere only the height column is used - ISA or a sounding file)
+* any INPUT_PARAMETERS key (e.g. DRAG_COEFF) - optional per-case parameter override
+
+Example:
+    python cli.py cases.csv results.parquet --chunk-size 100000
+"""
+
+import argparse
+import sys
+import numpy as np
+import pandas as pd
+
+from Calculations.CParachute import CParachuteBatch, getDiamaterFromVelocity
+from Calculations.Air import getAirDensity
+from Calculations.Atmosphere import CLayeredAtmosphere, getISAAtmosphere, loadSounding
+from Calculations.ConstantParameters import INPUT_PARAMETERS, KELVIN_OFFSET
+from structure.export import CResultWriter, EXPORT_FORMATS, getFormatFromPath
+
+ATMOSPHERE_COLUMNS = ("ref_pressure", "ref_temp", "height", "humidity")
+
+def calculateCases(pdCases: pd.DataFrame, dcParameters: dict = INPUT_PARAMETERS, cAtmosphere: CLayeredAtmosphere | None = None):
+    """
+    Evaluate one chunk of cases - returns the input columns with the results appended.
+    With cAtmosphere the air density at the 'height' column is taken from it.
+    """
+    pdOut = pdCases.copy()
+    dcCaseParameters = {
+        sKey: pdCases[sKey].fillna(_Default).to_numpy(dtype=float) if sKey in pdCases else _Default
+        for sKey, _Default in dcParameters.items()
+    }
+    # Air density at the opening altitude (same units as in the UI)
+    if cAtmosphere is not None and "height" in pdCases:
+        dcCaseParameters["AIR_DENSITY"] = cAtmosphere.getDensity(pdCases["height"].to_numpy(dtype=float))
+    elif all(sKey in pdCases for sKey in ATMOSPHERE_COLUMNS):
+        aDensity = getAirDensity(
+            pdCases["ref_pressure"].to_numpy(dtype=float)*100.0,
+            pdCases["ref_temp"].to_numpy(dtype=float)+KELVIN_OFFSET,
+            -pdCases["height"].to_numpy(dtype=float),
+            pdCases["humidity"].to_numpy(dtype=float)/100.0,
+            dcParameters=dcCaseParameters
+        )
+        dcCaseParameters["AIR_DENSITY"] = aDensity
+    pdOut["air_density"] = np.broadcast_to(dcCaseParameters["AIR_DENSITY"], len(pdCases))
+
+    aMass = pdCases["mass"].to_numpy(dtype=float)
+    if "diameter" in pdCases:
+        aDiameter = pdCases["diameter"].to_numpy(dtype=float)
+        if "target_velocity" in pdCases:
+            aMissing = np.isnan(aDiameter)
+            aDiameter = np.where(aMissing, getDiamaterFromVelocity(pdCases["target_velocity"].to_numpy(dtype=float), aMass, dcCaseParameters), aDiameter)
+    elif "target_velocity" in pdCases:
+        aDiameter = getDiamaterFromVelocity(pdCases["target_velocity"].to_numpy(dtype=float), aMass, dcCaseParameters)
+    else:
+        raise KeyError("Case file requires a 'diameter' or 'target_velocity' column")
+    pdOut["diameter"] = aDiameter
+
+    cParachutes = CParachuteBatch(aMass, aDiameter, pdCases["opening_velocity"].to_numpy(dtype=float), dcCaseParameters)
+    dcLoads = cParachutes.getPeakOpeningLoad()
+    pdOut["inflation_time"] = cParachutes.fInflationTime
+    pdOut["ballistic_parameter"] = cParachutes.getBallisticParameter()
+    pdOut["peak_load_pflanz"] = dcLoads["pflanz"]
+    pdOut["peak_load_oscalc"] = dcLoads["oscalc"]
+    pdOut["peak_load_simplified"] = dcLoads["simplified"]
+    pdOut["opening_impulse"] = cParachutes.fOpeningImpulse
+    return pdOut
+
+def readCases(sPath: str, iChunkSize: int, sSeparator: str):
+    """
+    Iterate over a CSV or Parquet case file in chunks of iChunkSize rows
+    """
+    if sPath.lower().endswith((".parquet", ".pq")):
+        import pyarrow.parquet as pq
+        cFile = pq.ParquetFile(sPath)
+        for cBatch in cFile.iter_batches(batch_size=iChunkSize):
+            yield cBatch.to_pandas()
+    else:
+        yield from pd.read_csv(sPath, sep=sSeparator, chunksize=iChunkSize)
+
+def main(lArgs: list | None = None):
+    cParser = argparse.ArgumentParser(description="ParaSim - headless batch calculations")
+    cParser.add_argument("input", help="case file (.csv or .parquet)")
+    cParser.add_argument("output", help="results file (.csv, .parquet, .arrow or .npz)")
+    cParser.add_argument("--format", choices=EXPORT_FORMATS, default=None, help="output format (default: from the output file extension)")
+    cParser.add_argument("--compression", default=None, help="output compression (e.g. snappy/zstd for parquet, lz4/zstd for arrow, gzip for csv)")
+    cParser.add_argument("--chunk-size", type=int, default=100000, help="rows processed at once")
+    cParser.add_argument("--sep", default=";", help="CSV separator of the input and output files")
+    cParser.add_argument("--atmosphere", default=None, help="'isa' or a sounding file (altitude [m], temperature [C], pressure [hPa], humidity [%%]) for the air density at the case height")
+    cParser.add_argument("--site-altitude", type=float, default=0.0, help="altitude of the case height reference in the atmosphere profile [m]")
+    cArgs = cParser.parse_args(lArgs)
+
+    cAtmosphere = None
+    if cArgs.atmosphere is not None:
+        cAtmosphere = getISAAtmosphere(cArgs.site_altitude) if cArgs.atmosphere.lower() == "isa" else loadSounding(cArgs.atmosphere, cArgs.site_altitude, cArgs.sep)
+
+    sFormat = cArgs.format or getFormatFromPath(cArgs.output)
+    with CResultWriter(cArgs.output, sFormat, cArgs.compression, {"parameters": INPUT_PARAMETERS}, cArgs.sep) as cWriter:
+        for pdCases in readCases(cArgs.input, cArgs.chunk_size, cArgs.sep):
+            cWriter.write(calculateCases(pdCases, cAtmosphere=cAtmosphere))
+            print(f"Processed {cWriter.iRows} cases", file=sys.stderr)
+    return cWriter.iRows
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""
+Stateless HTTP calculation API (/api/v1) on the Dash Flask server - batches of cases per request
+
+Request body - cases as columns, one row per case:
+* JSON: {"cases": {"mass": [...], ...} or [{"mass": ..., ...}, ...], "parameters": {...}}
+* CSV (';' separator), Parquet, Arrow IPC or NPZ (Content-Type, or the 'input' query argument)
+Response - JSON {"count": ..., "results": {column: [...]}} (NaN as null) or the binary formats
+of structure.export ('format' query argument or the Accept header).
+Columns use the units of cli.py: mass [kg], opening_velocity, target_velocity [m/s], diameter [m],
+ref_pressure [hPa], ref_temp [C], height [m], humidity [%]; INPUT_PARAMETERS keys override
+the parameters per case.
+"""
+
+import io
+import json
+import numpy as np
+import pandas as pd
+import flask
+
+from Calculations.CParachute import CParachuteBatch, getDiamaterFromVelocity, getVelocityFromDiameter
+from Calculations.Air import getAirDensity
+from Calculations.ConstantParameters import INPUT_PARAMETERS, KELVIN_OFFSET
+from structure.export import readResults, writeResults
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+API_PREFIX = "/api/v1"
+API_MAX_CASES = 1000000
+API_MAX_CONTENT_LENGTH = 256*2**20 # [B] - larger request bodies are refused (413) before they are read
+API_ATMOSPHERE_COLUMNS = ("ref_pressure", "ref_temp", "height")
+API_MIME_TYPES = {
+    "json": "application/json",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+    "npz": "application/x-npz",
+}
+
+class CApiError(Exception):
+    pass
+
+def _getFormat(sValue: str | None, sDefault: str = "json"):
+    """
+    Format from a query argument value or a MIME type
+    """
+    if not sValue: return sDefault
+    sValue = sValue.split(";")[0].strip().lower()
+    if sValue in API_MIME_TYPES: return sValue
+    return next((sKey for sKey, sMime in API_MIME_TYPES.items() if sMime == sValue), sDefault)
+
+def readCases(cRequest: flask.Request):
+    """
+    Cases (DataFrame) and request parameter overrides from the request body
+    """
+    sFormat = _getFormat(cRequest.args.get("input") or cRequest.mimetype)
+    if sFormat == "json":
+        dcBody = cRequest.get_json(silent=True)
+        if not isinstance(dcBody, dict) or "cases" not in dcBody: raise CApiError("JSON body requires the 'cases' field")
+        pdCases = pd.DataFrame(dcBody["cases"])
+        dcParameters = dcBody.get("parameters") or {}
+    else:
+        pdCases, _ = readResults(io.BytesIO(cRequest.get_data()), sFormat)
+        dcParameters = {}
+    if len(pdCases) > API_MAX_CASES: raise CApiError(f"Too many cases: {len(pdCases)} (limit {API_MAX_CASES})")
+    lUnknown = [sKey for sKey in dcParameters if sKey not in INPUT_PARAMETERS]
+    if lUnknown: raise CApiError(f"Unknown parameters: {lUnknown}")
+    return pdCases, {**INPUT_PARAMETERS, **dcParameters}
+
+def _getColumn(pdCases: pd.DataFrame, sColumn: str, _Default = None, bPositive: bool = False):
+    if sColumn in pdCases: aValues = pdCases[sColumn].to_numpy(dtype=float)
+    elif _Default is None: raise CApiError(f"Missing column: '{sColumn}'")
+    else: aValues = np.full(len(pdCases), float(_Default))
+    # Masses, diameters and velocities - zero or negative values give no physical result
+    if bPositive and not np.all(aValues > 0.0): raise CApiError(f"Column '{sColumn}' has to be positive")
+    return aValues
+
+def getCaseParameters(pdCases: pd.DataFrame, dcParameters: dict = INPUT_PARAMETERS):
+    """
+    Parameter arrays of the cases - per case columns override dcParameters, the air density is
+    computed from the reference atmosphere columns if given (as in cli.py)
+    """
+    dcCaseParameters = {
+        sKey: pdCases[sKey].fillna(_Default).to_numpy(dtype=float) if sKey in pdCases else float(_Default)
+        for sKey, _Default in dcParameters.items()
+    }
+    if all(sKey in pdCases for sKey in API_ATMOSPHERE_COLUMNS):
+        dcCaseParameters["AIR_DENSITY"] = getAirDensity(
+            _getColumn(pdCases, "ref_pressure")*100.0,
+            _getColumn(pdCases, "ref_temp")+KELVIN_OFFSET,
+            -_getColumn(pdCases, "height"),
+            _getColumn(pdCases, "humidity", 0.0)/100.0,
+            dcParameters=dcCaseParameters
+        )
+    return dcCaseParameters
+
+# Endpoint name -> function(cases, parameters) returning the result columns
+def _airDensity(pdCases: pd.DataFrame, dcParameters: dict):
+    lMissing = [sKey for sKey in API_ATMOSPHERE_COLUMNS if sKey not in pdCases]
+    if lMissing: raise CApiError(f"Missing columns: {lMissing}")
+    return {"air_density": getCaseParameters(pdCases, dcParameters)["AIR_DENSITY"]}
+
+def _diameterFromVelocity(pdCases: pd.DataFrame, dcParameters: dict):
+    dcCaseParameters = getCaseParameters(pdCases, dcParameters)
+    return {"diameter": getDiamaterFromVelocity(_getColumn(pdCases, "target_velocity", bPositive=True), _getColumn(pdCases, "mass", bPositive=True), dcCaseParameters)}
+
+def _velocityFromDiameter(pdCases: pd.DataFrame, dcParameters: dict):
+    dcCaseParameters = getCaseParameters(pdCases, dcParameters)
+    return {"descent_velocity": getVelocityFromDiameter(_getColumn(pdCases, "diameter", bPositive=True), _getColumn(pdCases, "mass", bPositive=True), dcCaseParameters)}
+
+def _peakLoads(pdCases: pd.DataFrame, dcParameters: dict):
+    dcCaseParameters = getCaseParameters(pdCases, dcParameters)
+    aMass = _getColumn(pdCases, "mass", bPositive=True)
+    if "diameter" in pdCases:
+        aDiameter = _getColumn(pdCases, "diameter", bPositive=True)
+    elif "target_velocity" in pdCases:
+        aDiameter = getDiamaterFromVelocity(_getColumn(pdCases, "target_velocity", bPositive=True), aMass, dcCaseParameters)
+    else:
+        raise CApiError("Cases require a 'diameter' or 'target_velocity' column")
+    cParachutes = CParachuteBatch(aMass, aDiameter, _getColumn(pdCases, "opening_velocity", bPositive=True), dcCaseParameters)
+    dcLoads = cParachutes.getPeakOpeningLoad()
+    return {
+        "diameter": aDiameter,
+        "inflation_time": cParachutes.fInflationTime,
+        "ballistic_parameter": cParachutes.getBallisticParameter(),
+        "peak_load_pflanz": dcLoads["pflanz"],
+        "peak_load_oscalc": dcLoads["oscalc"],
+        "peak_load_simplified": dcLoads["simplified"],
+        "opening_impulse": cParachutes.fOpeningImpulse,
+    }
+
+API_ENDPOINTS = {
+    "air-density": _airDensity,
+    "diameter-from-velocity": _diameterFromVelocity,
+    "velocity-from-diameter": _velocityFromDiameter,
+    "peak-loads": _peakLoads,
+}
+
+def writeResponse(dcResults: dict, iCount: int, sFormat: str, dcParameters: dict):
+    """
+    Response with the result columns in the requested format
+    """
+    if sFormat == "json":
+        dcColumns = {sKey: np.broadcast_to(np.asarray(_Value, dtype=float), iCount) for sKey, _Value in dcResults.items()}
+        if orjson is not None:
+            # Serializes the arrays directly (shortest round-trip floats, NaN as null)
+            _Body = orjson.dumps({"count": iCount, "results": dcColumns}, option=orjson.OPT_SERIALIZE_NUMPY)
+        else:
+            _Body = json.dumps({"count": iCount, "results": {
+                sKey: np.where(np.isfinite(aValues), aValues, None).tolist() for sKey, aValues in dcColumns.items()
+            }})
+        return flask.Response(_Body, mimetype=API_MIME_TYPES["json"])
+    cBuffer = io.BytesIO() if sFormat != "csv" else io.StringIO()
+    writeResults({sKey: np.broadcast_to(_Value, iCount) for sKey, _Value in dcResults.items()}, cBuffer, sFormat, dcMetadata={"parameters": dcParameters})
+    _Data = cBuffer.getvalue()
+    return flask.Response(_Data.encode("utf-8") if isinstance(_Data, str) else _Data, mimetype=API_MIME_TYPES[sFormat])
+
+def _getErrorResponse(sMessage: str, iStatus: int = 400):
+    return flask.Response(json.dumps({"error": sMessage}), status=iStatus, mimetype=API_MIME_TYPES["json"])
+
+def getApiBlueprint():
+    """
+    Flask blueprint with the POST endpoints of API_ENDPOINTS and GET /api/v1/endpoints (endpoint list)
+    """
+    cBlueprint = flask.Blueprint("parasim_api", __name__, url_prefix=API_PREFIX)
+
+    def handle(sEndpoint: str):
+        fnEndpoint = API_ENDPOINTS[sEndpoint]
+        try:
+            pdCases, dcParameters = readCases(flask.request)
+            sFormat = _getFormat(flask.request.args.get("format") or flask.request.accept_mimetypes.best_match(list(API_MIME_TYPES.values()), "application/json"))
+            with np.errstate(all='ignore'):
+                dcResults = fnEndpoint(pdCases, dcParameters)
+            return writeResponse(dcResults, len(pdCases), sFormat, dcParameters)
+        except (CApiError, KeyError, ValueError, TypeError) as E:
+            return _getErrorResponse(str(E))
+
+    for sEndpoint in API_ENDPOINTS:
+        cBlueprint.add_url_rule(f"/{sEndpoint}", endpoint=sEndpoint, view_func=lambda sEndpoint=sEndpoint: handle(sEndpoint), methods=["POST"])
+    cBlueprint.add_url_rule("/endpoints", endpoint="endpoints", view_func=lambda: flask.jsonify({
+        "endpoints": [f"{API_PREFIX}/{sEndpoint}" for sEndpoint in API_ENDPOINTS], "formats": list(API_MIME_TYPES), "parameters": INPUT_PARAMETERS
+    }))
+    return cBlueprint
@@ -0,0 +1,122 @@
+"""
+Background execution of the heavy callbacks - Dash background callbacks with a local diskcache backend
+"""
+
+import contextlib
+import functools
+import os
+import tempfile
+import time
+import uuid
+
+from structure.cache import RESULT_CACHE, CACHE_SIZE_LIMIT
+from structure.metrics import METRICS, LOGGER
+
+BACKGROUND_CACHE_DIR = os.environ.get("PARASIM_BACKGROUND_CACHE", os.path.join(tempfile.gettempdir(), "parasim-background"))
+BACKGROUND_MAX_RUNNING = 2 # jobs calculated at once
+BACKGROUND_MAX_QUEUED = 8 # jobs waiting for a free slot
+BACKGROUND_POLL_INTERVAL = 0.25 # [s]
+
+class CQueueFullError(Exception):
+    pass
+
+def _isAlive(iPid: int):
+    import psutil
+    try:
+        return psutil.Process(iPid).status() != psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return False
+
+class CJobQueue():
+    """
+    Bounded FIFO job queue shared by all server and job processes (state kept in the diskcache).
+    The first iMaxRunning registered jobs run, the next iMaxQueued wait, further jobs are rejected.
+    Jobs of dead processes (e.g. cancelled - the job process is killed) are removed automatically.
+    """
+
+    def __init__(self, cCache = None, iMaxRunning: int = BACKGROUND_MAX_RUNNING, iMaxQueued: int = BACKGROUND_MAX_QUEUED):
+        self.cCache = cCache
+        self.iMaxRunning = iMaxRunning
+        self.iMaxQueued = iMaxQueued
+
+    def _getJobs(self):
+        """
+        Registered jobs [(job id, pid)] without the jobs of dead processes - call inside a transaction
+        """
+        return [(sJob, iPid) for sJob, iPid in self.cCache.get("job-queue", []) if _isAlive(iPid)]
+
+    def getStats(self):
+        if self.cCache is None: return {"running": 0, "queued": 0}
+        with self.cCache.transact():
+            iJobs = len(self._getJobs())
+        return {"running": min(iJobs, self.iMaxRunning), "queued": max(0, iJobs-self.iMaxRunning)}
+
+    @contextlib.contextmanager
+    def slot(self, fnProgress = None):
+        """
+        Wait for a free slot (fnProgress(iPosition) is called while waiting), run the block, release the slot.
+        Raises CQueueFullError if the queue is full. Without a cache the block runs immediately.
+        """
+        if self.cCache is None:
+            yield
+            return
+        sJob = uuid.uuid4().hex
+        with self.cCache.transact():
+            lJobs = self._getJobs()
+            if len(lJobs) >= self.iMaxRunning+self.iMaxQueued:
+                raise CQueueFullError(f"Job queue is full ({len(lJobs)} jobs)")
+            self.cCache.set("job-queue", lJobs+[(sJob, os.getpid())])
+        try:
+            while True:
+                with self.cCache.transact():
+                    lJobs = self._getJobs()
+                    self.cCache.set("job-queue", lJobs)
+                iPosition = [sItem for sItem, _ in lJobs].index(sJob)
+                if iPosition < self.iMaxRunning: break
+                if fnProgress is not None: fnProgress(iPosition-self.iMaxRunning+1)
+                time.sleep(BACKGROUND_POLL_INTERVAL)
+            yield
+        finally:
+            with self.cCache.transact():
+                self.cCache.set("job-queue", [(sItem, iPid) for sItem, iPid in self._getJobs() if sItem != sJob])
+
+def getBackgroundManager():
+    """
+    DiskcacheManager and the job queue; (None, CJobQueue()) if the 'dash[diskcache]' extras are not installed.
+    RESULT_CACHE - the only result cache layer (the manager does not reuse results - job outputs,
+    including the errors, are removed once delivered) - is kept in the 'results' subdirectory,
+    the cache also collects the metrics of the job processes.
+    """
+    try:
+        import diskcache
+        from dash import DiskcacheManager
+        cCache = diskcache.Cache(BACKGROUND_CACHE_DIR)
+        METRICS.setSharedCache(cCache)
+        # Results in a separate store - its size limit never evicts the job state
+        RESULT_CACHE.setSharedCache(diskcache.Cache(os.path.join(BACKGROUND_CACHE_DIR, "results"), size_limit=CACHE_SIZE_LIMIT, eviction_policy='least-recently-used'))
+        return DiskcacheManager(cCache), CJobQueue(cCache)
+    except ImportError:
+        LOGGER.warning("Background callbacks disabled - install 'dash[diskcache]' to enable them")
+        return None, CJobQueue()
+
+BACKGROUND_MANAGER, JOB_QUEUE = getBackgroundManager()
+
+def backgroundCallback(cApp, *args, progress = None, running = None, cancel = None, **kwargs):
+    """
+    app.callback running in the background manager if available, otherwise a regular
+    (synchronous) callback. The decorated function always takes set_progress as the
+    first argument if progress is given (no-op in the synchronous mode).
+    """
+    def decorator(fnCallback):
+        if BACKGROUND_MANAGER is not None:
+            return cApp.callback(
+                *args, background=True, manager=BACKGROUND_MANAGER, progress=progress,
+                running=running, cancel=cancel, **kwargs
+            )(fnCallback)
+        if progress is None:
+            return cApp.callback(*args, **kwargs)(fnCallback)
+        @functools.wraps(fnCallback)
+        def wrapper(*lArgs):
+            return fnCallback(lambda _Value: None, *lArgs)
+        return cApp.callback(*args, **kwargs)(wrapper)
+    return decorator
@@ -0,0 +1,173 @@
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import numpy as np
+
+CACHE_MAX_ENTRIES = 256
+CACHE_TTL = 600.0 # [s]
+CACHE_SIZE_LIMIT = 2**28 # [B] - size limit of the shared (diskcache) store
+
+def _toCanonical(_Value):
+    """
+    Convert callback inputs to JSON-serializable, order-independent values
+    """
+    if isinstance(_Value, Mapping):
+        return {str(sKey): _toCanonical(_Item) for sKey, _Item in _Value.items()}
+    if isinstance(_Value, (list, tuple)):
+        return [_toCanonical(_Item) for _Item in _Value]
+    if isinstance(_Value, np.ndarray):
+        return _toCanonical(_Value.tolist())
+    if isinstance(_Value, np.generic):
+        return _Value.item()
+    return _Value
+
+def getCacheKey(sName: str, *args, **kwargs):
+    """
+    Canonical hash of (callback name, inputs, parameter dict)
+    """
+    sPayload = json.dumps([sName, _toCanonical(args), _toCanonical(kwargs)], sort_keys=True, separators=(',', ':'), default=repr)
+    return hashlib.sha256(sPayload.encode('utf-8')).hexdigest()
+
+RESULT_CACHE_TAG = "result-cache"
+
+class CResultCache():
+    """
+    Bounded, thread-safe LRU cache with time-to-live for callback results.
+    With a shared cache (setSharedCache) entries, the LRU order and counters are kept in the diskcache
+    instead, so results calculated in the background job processes are reused by all processes
+    (same iMaxEntries and fTTL bounds).
+    """
+
+    def __init__(self, iMaxEntries: int = CACHE_MAX_ENTRIES, fTTL: float = CACHE_TTL):
+        self.iMaxEntries = iMaxEntries
+        self.fTTL = fTTL
+        self._dcEntries = OrderedDict()
+        self._cLock = threading.Lock()
+        self.iHits = 0
+        self.iMisses = 0
+        self.iEvictions = 0
+        self._cShared = None
+
+    def setSharedCache(self, cCache):
+        """
+        Keep the entries and counters in a diskcache.Cache shared with the job processes
+        (entries of the previous server run are removed)
+        """
+        self._cShared = cCache
+        cCache.evict(RESULT_CACHE_TAG)
+        cCache.set(f"{RESULT_CACHE_TAG}-index", [])
+        for sCounter in ("hits", "misses", "evictions"):
+            cCache.set(f"{RESULT_CACHE_TAG}-{sCounter}", 0)
+
+    def _getShared(self, sKey: str):
+        # Entry lookup and LRU index update in one transaction (index - keys from the least recently used)
+        cCache = self._cShared
+        with cCache.transact():
+            bFound, _Value = cCache.get(f"{RESULT_CACHE_TAG}:{sKey}", default=(False, None))
+            lIndex = [sItem for sItem in cCache.get(f"{RESULT_CACHE_TAG}-index", []) if sItem != sKey]
+            cCache.set(f"{RESULT_CACHE_TAG}-index", lIndex+[sKey] if bFound else lIndex)
+            cCache.incr(f"{RESULT_CACHE_TAG}-{'hits' if bFound else 'misses'}")
+        return bFound, _Value
+
+    def _setShared(self, sKey: str, _Value):
+        cCache = self._cShared
+        with cCache.transact():
+            cCache.set(f"{RESULT_CACHE_TAG}:{sKey}", (True, _Value), expire=self.fTTL, tag=RESULT_CACHE_TAG)
+            lIndex = [sItem for sItem in cCache.get(f"{RESULT_CACHE_TAG}-index", []) if sItem != sKey]+[sKey]
+            while len(lIndex) > self.iMaxEntries:
+                # Expired entries are already gone - only live entries count as evictions
+                if cCache.delete(f"{RESULT_CACHE_TAG}:{lIndex.pop(0)}"): cCache.incr(f"{RESULT_CACHE_TAG}-evictions")
+            cCache.set(f"{RESULT_CACHE_TAG}-index", lIndex)
+
+    def get(self, sKey: str):
+        """
+        Returns (bFound, value)
+        """
+        if self._cShared is not None: return self._getShared(sKey)
+        with self._cLock:
+            tEntry = self._dcEntries.get(sKey)
+            if tEntry is None:
+                self.iMisses += 1
+                return False, None
+            fExpires, _Value = tEntry
+            if fExpires < time.monotonic():
+                del self._dcEntries[sKey]
+                self.iMisses += 1
+                return False, None
+            self._dcEntries.move_to_end(sKey)
+            self.iHits += 1
+            return True, _Value
+
+    def set(self, sKey: str, _Value):
+        if self._cShared is not None: return self._setShared(sKey, _Value)
+        with self._cLock:
+            self._dcEntries[sKey] = (time.monotonic()+self.fTTL, _Value)
+            self._dcEntries.move_to_end(sKey)
+            while len(self._dcEntries) > self.iMaxEntries:
+                self._dcEntries.popitem(last=False)
+                self.iEvictions += 1
+
+    def clear(self):
+        if self._cShared is not None:
+            with self._cShared.transact():
+                self._cShared.evict(RESULT_CACHE_TAG)
+                self._cShared.set(f"{RESULT_CACHE_TAG}-index", [])
+        with self._cLock:
+            self._dcEntries.clear()
+
+    def getStats(self):
+        """
+        Hit/miss counters
+        """
+        if self._cShared is not None:
+            cCache = self._cShared
+            with cCache.transact():
+                iHits, iMisses, iEvictions = (cCache.get(f"{RESULT_CACHE_TAG}-{sCounter}", 0) for sCounter in ("hits", "misses", "evictions"))
+                iEntries = sum(1 for sKey in cCache.get(f"{RESULT_CACHE_TAG}-index", []) if f"{RESULT_CACHE_TAG}:{sKey}" in cCache)
+            iRequests = iHits+iMisses
+            return {
+                "entries": iEntries,
+                "max_entries": self.iMaxEntries,
+                "ttl": self.fTTL,
+                "hits": iHits,
+                "misses": iMisses,
+                "evictions": iEvictions,
+                "hit_ratio": iHits/iRequests if iRequests else 0.0,
+                "shared": True,
+            }
+        with self._cLock:
+            iRequests = self.iHits+self.iMisses
+            return {
+                "entries": len(self._dcEntries),
+                "max_entries": self.iMaxEntries,
+                "ttl": self.fTTL,
+                "hits": self.iHits,
+                "misses": self.iMisses,
+                "evictions": self.iEvictions,
+                "hit_ratio": self.iHits/iRequests if iRequests else 0.0,
+                "shared": False,
+            }
+
+    def memoize(self, sName: str):
+        """
+        Decorator - return the cached result for the same (sName, inputs) instead of recomputing.
+        Exceptions are not cached.
+        """
+        def decorator(fnCallable):
+            @functools.wraps(fnCallable)
+            def wrapper(*args, **kwargs):
+                sKey = getCacheKey(sName, *args, **kwargs)
+                bFound, _Value = self.get(sKey)
+                if bFound: return _Value
+                _Value = fnCallable(*args, **kwargs)
+                self.set(sKey, _Value)
+                return _Value
+            return wrapper
+        return decorator
+
+RESULT_CACHE = CResultCache()
@@ -26,6 +26,7 @@ DESCRIPTION_INPUT_PARAMS = {
     "airdensity": "Gęstość powietrza na wysokości otwarcia spadochronu",
     "gaccel": "Przyśpieszenie ziemskie mierzone na platformie startowej",
     "dragcoeff": "Współczynnik oporu aerodynamicznego zależny od kształtu spadochronu",
+    "preset": "Typowe wartości współczynnika oporu, współczynnika wstrząsu i stałej napełniania dla danego typu czaszy",
 }
 
 DESCRIPTION_SIM1_PARAMS = {
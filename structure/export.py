@@ -0,0 +1,186 @@
+"""
+Result export - CSV and columnar binary formats (Parquet, Arrow IPC, NPZ) with column metadata
+"""
+
+import io
+import json
+import re
+import numpy as np
+import pandas as pd
+
+from structure.metrics import METRICS
+
+EXPORT_FORMATS = ("csv", "parquet", "arrow", "npz")
+EXPORT_EXTENSIONS = {"csv": "csv", "parquet": "parquet", "arrow": "arrow", "npz": "npz"}
+EXPORT_CHUNK_SIZE = 100000
+EXPORT_METADATA_KEY = "parasim"
+# Formats requiring an optional package
+EXPORT_FORMAT_BACKENDS = {"parquet": "pyarrow", "arrow": "pyarrow"}
+
+# Units of the columns without a "[unit]" suffix in the name
+COLUMN_UNITS = {
+    "mass": "kg", "MASS": "kg",
+    "opening_velocity": "m/s", "OPEN_VELOCITY": "m/s",
+    "target_velocity": "m/s", "TARGET_VELOCITY": "m/s", "descent_velocity": "m/s",
+    "diameter": "m", "CANOPY_DIAMETER": "m",
+    "ref_pressure": "hPa", "ref_temp": "C", "height": "m", "humidity": "%",
+    "air_density": "kg/m3", "AIR_DENSITY": "kg/m3",
+    "G_ACCELERATION": "m/s2",
+    "inflation_time": "s",
+    "ballistic_parameter": "-",
+    "peak_load_pflanz": "N", "peak_load_oscalc": "N", "peak_load_simplified": "N",
+    "pflanz": "N", "oscalc": "N", "simplified": "N",
+    "opening_impulse": "N*s",
+}
+
+def getAvailableFormats():
+    """
+    Export formats whose backend package can be imported
+    """
+    import importlib.util
+    return tuple(sFormat for sFormat in EXPORT_FORMATS if sFormat not in EXPORT_FORMAT_BACKENDS or importlib.util.find_spec(EXPORT_FORMAT_BACKENDS[sFormat]) is not None)
+
+def getFormatFromPath(sPath: str, sDefault: str = "csv"):
+    """
+    Export format from the file extension
+    """
+    sPath = str(sPath).lower()
+    if sPath.endswith(".pq"): return "parquet"
+    return next((sKey for sKey, sExtension in EXPORT_EXTENSIONS.items() if sPath.endswith("."+sExtension)), sDefault)
+
+def getColumnUnit(sColumn: str):
+    """
+    Unit of a result column - from the "[unit]" suffix (UI results) or COLUMN_UNITS
+    """
+    cMatch = re.search(r"\[([^\]]*)\]", str(sColumn))
+    return cMatch.group(1) if cMatch else COLUMN_UNITS.get(str(sColumn), "")
+
+def _toDataFrame(_Chunk):
+    if isinstance(_Chunk, pd.DataFrame): return _Chunk
+    return pd.DataFrame({sKey: np.ravel(_Value) for sKey, _Value in _Chunk.items()})
+
+def _iterChunks(_Results, iChunkSize: int):
+    """
+    DataFrames of at most iChunkSize rows from a DataFrame, a dict of columns or an iterable of those
+    """
+    if isinstance(_Results, (pd.DataFrame, dict)):
+        pdResults = _toDataFrame(_Results)
+        for iStart in range(0, max(len(pdResults), 1), iChunkSize):
+            yield pdResults.iloc[iStart:iStart+iChunkSize]
+    else:
+        for _Chunk in _Results:
+            yield _toDataFrame(_Chunk)
+
+class CResultWriter():
+    """
+    Streaming writer - chunks (DataFrames or dicts of columns) are appended one by one,
+    so large result sets never have to be materialized as a whole (except NPZ, which is written on close).
+    cTarget is a path or a binary file object.
+    Metadata (column units and dcMetadata, e.g. the parameter dict) is stored as JSON:
+    in the Parquet/Arrow schema metadata (units also per field) and as the '__metadata__' NPZ entry;
+    CSV has no metadata.
+    sCompression: Parquet - 'snappy' (default), 'zstd', 'gzip', 'none'; Arrow - 'lz4', 'zstd', None (default);
+    NPZ - any value other than None/'none' uses zip deflate; CSV - pandas compression ('gzip', 'zip', ...).
+    """
+
+    def __init__(self, cTarget, sFormat: str = "parquet", sCompression: str | None = None, dcMetadata: dict | None = None, sSeparator: str = ";"):
+        if sFormat not in EXPORT_FORMATS: raise ValueError(f"Unknown export format: {sFormat}")
+        self.cTarget = cTarget
+        self.sFormat = sFormat
+        self.sCompression = sCompression
+        self.dcMetadata = dcMetadata or {}
+        self.sSeparator = sSeparator
+        self._cWriter = None
+        self._lChunks = []
+        self.iRows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _getSchema(self, cTable):
+        import pyarrow as pa
+        lFields = [
+            cField.with_metadata({"unit": getColumnUnit(cField.name)}) for cField in cTable.schema
+        ]
+        dcMetadata = {**self.dcMetadata, "units": {cField.name: getColumnUnit(cField.name) for cField in cTable.schema}}
+        return pa.schema(lFields, metadata={EXPORT_METADATA_KEY: json.dumps(dcMetadata, default=float, ensure_ascii=False)})
+
+    def write(self, _Chunk):
+        pdChunk = _toDataFrame(_Chunk)
+        if self.sFormat == "csv":
+            pdChunk.to_csv(
+                self.cTarget, sep=self.sSeparator, index=False, header=self.iRows == 0,
+                mode="w" if self.iRows == 0 else "a", encoding="utf-8", compression=self.sCompression
+            )
+        elif self.sFormat == "npz":
+            self._lChunks.append(pdChunk)
+        else:
+            import pyarrow as pa
+            cTable = pa.Table.from_pandas(pdChunk, preserve_index=False)
+            if self._cWriter is None:
+                self._cSchema = self._getSchema(cTable)
+                if self.sFormat == "parquet":
+                    import pyarrow.parquet as pq
+                    self._cWriter = pq.ParquetWriter(self.cTarget, self._cSchema, compression=self.sCompression or "snappy")
+                else:
+                    self._cWriter = pa.ipc.new_file(self.cTarget, self._cSchema, options=pa.ipc.IpcWriteOptions(compression=self.sCompression))
+            self._cWriter.write_table(cTable.cast(self._cSchema))
+        self.iRows += len(pdChunk)
+
+    def close(self):
+        if self.sFormat == "npz":
+            pdResults = pd.concat(self._lChunks, ignore_index=True) if self._lChunks else pd.DataFrame()
+            dcArrays = {str(sColumn): pdResults[sColumn].to_numpy() for sColumn in pdResults}
+            dcMetadata = {**self.dcMetadata, "units": {sColumn: getColumnUnit(sColumn) for sColumn in dcArrays}, "columns": list(dcArrays)}
+            fnSave = np.savez if self.sCompression in (None, "none") else np.savez_compressed
+            # Column names may not be valid archive names - store them positionally
+            fnSave(self.cTarget, __metadata__=np.array(json.dumps(dcMetadata, default=float, ensure_ascii=False)), **{f"column_{iColumn}": aValues for iColumn, aValues in enumerate(dcArrays.values())})
+            self._lChunks = []
+        elif self._cWriter is not None:
+            self._cWriter.close()
+            self._cWriter = None
+
+def writeResults(_Results, cTarget, sFormat: str = "parquet", sCompression: str | None = None, dcMetadata: dict | None = None, iChunkSize: int = EXPORT_CHUNK_SIZE, sSeparator: str = ";"):
+    """
+    Write results (DataFrame, dict of columns or an iterable of chunks) in chunks of iChunkSize rows,
+    see CResultWriter. Returns the number of rows written
+    """
+    with CResultWriter(cTarget, sFormat, sCompression, dcMetadata, sSeparator) as cWriter:
+        for pdChunk in _iterChunks(_Results, iChunkSize):
+            cWriter.write(pdChunk)
+    return cWriter.iRows
+
+def readResults(cSource, sFormat: str | None = None, sSeparator: str = ";"):
+    """
+    Read exported results - returns (DataFrame, metadata dict)
+    """
+    if sFormat is None: sFormat = getFormatFromPath(cSource)
+    if sFormat == "csv":
+        return pd.read_csv(cSource, sep=sSeparator), {}
+    if sFormat == "npz":
+        with np.load(cSource) as cArchive:
+            dcMetadata = json.loads(str(cArchive["__metadata__"]))
+            pdResults = pd.DataFrame({sColumn: cArchive[f"column_{iColumn}"] for iColumn, sColumn in enumerate(dcMetadata.pop("columns"))})
+        return pdResults, dcMetadata
+    import pyarrow as pa
+    if sFormat == "parquet":
+        import pyarrow.parquet as pq
+        cTable = pq.read_table(cSource)
+    else:
+        cTable = pa.ipc.open_file(cSource).read_all()
+    sMetadata = (cTable.schema.metadata or {}).get(EXPORT_METADATA_KEY.encode(), b"{}")
+    return cTable.to_pandas(), json.loads(sMetadata)
+
+def sendResults(_Results, sName: str, sFormat: str = "csv", sCompression: str | None = None, dcMetadata: dict | None = None):
+    """
+    dcc.Download data of the results in the given format
+    """
+    from dash import dcc
+    def fnWrite(cBuffer: io.BytesIO):
+        with METRICS.measure("calculation", f"export_{sFormat}"):
+            # Chunks are encoded straight into the binary download buffer (CSV - UTF-8 text per chunk)
+            writeResults(_Results, cBuffer, sFormat, sCompression, dcMetadata)
+    return dcc.send_bytes(fnWrite, sName)
@@ -0,0 +1,272 @@
+"""
+Opt-in instrumentation - timers and counters of the callbacks and calculations, sampled cProfile
+dumps, structured (JSON lines) logs and Prometheus text exposition for the /metrics endpoint
+"""
+
+import contextlib
+import cProfile
+import datetime
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+METRICS_ENABLED = os.environ.get("PARASIM_METRICS", "").lower() in ("1", "true", "yes", "on")
+METRICS_LOG_FILE = os.environ.get("PARASIM_METRICS_LOG") # JSON lines log, default - 'parasim.metrics' logger only
+PROFILE_RATE = float(os.environ.get("PARASIM_PROFILE_RATE", "0")) # fraction of the profiled calls run under cProfile
+PROFILE_DIR = os.environ.get("PARASIM_PROFILE_DIR", "profiles")
+METRICS_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0) # [s]
+METRICS_PREFIX = "parasim"
+METRICS_SHARED_KEY = "metrics" # diskcache key of the job process values
+# Metric family -> (label name, help text)
+METRIC_FAMILIES = {
+    "callback": ("callback", "Dash callback duration [s]"),
+    "calculation": ("calculation", "Calculation, plotting and export duration [s]"),
+    "http_request": ("path", "Flask request duration including Dash serialization [s]"),
+    "error": ("callback", "Exceptions caught in the callbacks"),
+    "plot_serialization": ("plot", "Figure JSON serialization duration [s]"),
+    "plot_payload_bytes": ("plot", "JSON payload of the plotted figures [B]"),
+}
+
+LOGGER = logging.getLogger("parasim")
+METRICS_LOGGER = logging.getLogger("parasim.metrics")
+if METRICS_ENABLED and METRICS_LOG_FILE:
+    _cHandler = logging.FileHandler(METRICS_LOG_FILE)
+    _cHandler.setFormatter(logging.Formatter("%(message)s"))
+    METRICS_LOGGER.addHandler(_cHandler)
+    METRICS_LOGGER.setLevel(logging.INFO)
+
+class CMetrics():
+    """
+    Thread-safe registry of duration histograms and counters, labelled by family and name.
+    Disabled registry returns the decorated functions unchanged - no overhead.
+    Background job processes merge their values into the shared (diskcache) store after every
+    timed call, the server process renders its own values together with the shared ones.
+    Forked job processes start with an empty registry (the server values are not copied), the
+    shared store is cleared when the server process attaches it.
+    """
+
+    def __init__(self, bEnabled: bool = METRICS_ENABLED, fProfileRate: float = PROFILE_RATE, sProfileDir: str = PROFILE_DIR):
+        self.bEnabled = bEnabled
+        self.fProfileRate = fProfileRate
+        self.sProfileDir = sProfileDir
+        self.cSharedCache = None
+        # Spawned/forked job processes inherit the server pid
+        self.iServerPid = int(os.environ.setdefault("PARASIM_SERVER_PID", str(os.getpid())))
+        self._dcHistograms = {} # (family, name) -> [bucket counts, sum, count]
+        self._dcCounters = {} # (family, name) -> value
+        self._cLock = threading.Lock()
+        self._cLocal = threading.local()
+        if hasattr(os, "register_at_fork"): os.register_at_fork(after_in_child=self._resetAfterFork)
+
+    def _resetAfterFork(self):
+        # The forked copy holds the parent's values - they must not be flushed again
+        self._cLock = threading.Lock()
+        self._cLocal = threading.local()
+        self._dcHistograms = {}
+        self._dcCounters = {}
+
+    def setSharedCache(self, cCache):
+        """
+        Store (diskcache.Cache) for the values of the background job processes.
+        The server process clears the values left by its previous runs.
+        """
+        self.cSharedCache = cCache
+        if os.getpid() == self.iServerPid: cCache.delete(METRICS_SHARED_KEY)
+
+    def observe(self, sFamily: str, sName: str, fDuration: float):
+        """
+        Add a duration [s] to the histogram and write it to the structured log
+        """
+        with self._cLock:
+            lEntry = self._dcHistograms.get((sFamily, sName))
+            if lEntry is None: lEntry = self._dcHistograms[(sFamily, sName)] = [[0]*len(METRICS_BUCKETS), 0.0, 0]
+            for iBucket, fBound in enumerate(METRICS_BUCKETS):
+                if fDuration <= fBound:
+                    lEntry[0][iBucket] += 1
+                    break
+            lEntry[1] += fDuration
+            lEntry[2] += 1
+        if METRICS_LOGGER.isEnabledFor(logging.INFO):
+            self.log("timer", family=sFamily, name=sName, duration=fDuration)
+
+    def increment(self, sFamily: str, sName: str, fValue: float = 1.0):
+        if not self.bEnabled: return
+        with self._cLock:
+            self._dcCounters[(sFamily, sName)] = self._dcCounters.get((sFamily, sName), 0.0)+fValue
+
+    def observePlot(self, sName: str, dcStats: dict | None):
+        """
+        Figure statistics filled by plotter.plotResults (dcStats) - serialization duration,
+        payload size counter and a structured log record
+        """
+        if not self.bEnabled or dcStats is None: return
+        self.observe("plot_serialization", sName, dcStats["serialization_time"])
+        self.increment("plot_payload_bytes", sName, dcStats["payload_bytes"])
+        if METRICS_LOGGER.isEnabledFor(logging.INFO): self.log("plot", name=sName, **dcStats)
+
+    def log(self, sEvent: str, **kwargs):
+        """
+        Structured log record (one JSON object per line)
+        """
+        dcRecord = {"time": datetime.datetime.now().isoformat(timespec='milliseconds'), "pid": os.getpid(), "event": sEvent, **kwargs}
+        METRICS_LOGGER.info(json.dumps(dcRecord, default=repr))
+
+    @contextlib.contextmanager
+    def _measure(self, sFamily: str, sName: str, bProfile: bool):
+        cProfiler = None
+        # Sampled profiling of the outermost measured block only (profilers do not nest)
+        if bProfile and self.fProfileRate > 0.0 and not getattr(self._cLocal, 'bProfiling', False) and random.random() < self.fProfileRate:
+            cProfiler = cProfile.Profile()
+            self._cLocal.bProfiling = True
+            cProfiler.enable()
+        fStart = time.perf_counter()
+        try:
+            yield
+        finally:
+            fDuration = time.perf_counter()-fStart
+            if cProfiler is not None:
+                cProfiler.disable()
+                self._cLocal.bProfiling = False
+                self._dumpProfile(cProfiler, sFamily, sName)
+            self.observe(sFamily, sName, fDuration)
+            if os.getpid() != self.iServerPid: self.flush()
+
+    def measure(self, sFamily: str, sName: str, bProfile: bool = False):
+        """
+        Context manager timing the block (bProfile - sampled cProfile run, see PARASIM_PROFILE_RATE)
+        """
+        if not self.bEnabled: return contextlib.nullcontext()
+        return self._measure(sFamily, sName, bProfile)
+
+    def timed(self, sFamily: str, sName: str | None = None, bProfile: bool = False):
+        """
+        Decorator timing every call (name defaults to the function name)
+        """
+        def decorator(fnCallable):
+            if not self.bEnabled: return fnCallable
+            sLabel = sName or fnCallable.__name__
+            @functools.wraps(fnCallable)
+            def wrapper(*args, **kwargs):
+                with self._measure(sFamily, sLabel, bProfile):
+                    return fnCallable(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _dumpProfile(self, cProfiler: cProfile.Profile, sFamily: str, sName: str):
+        """
+        Save the stats (pstats/snakeviz format) to PROFILE_DIR
+        """
+        try:
+            os.makedirs(self.sProfileDir, exist_ok=True)
+            sPath = os.path.join(self.sProfileDir, f"{sFamily}-{sName}-{datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')}-{os.getpid()}.prof")
+            cProfiler.dump_stats(sPath)
+            if METRICS_LOGGER.isEnabledFor(logging.INFO): self.log("profile", family=sFamily, name=sName, path=sPath)
+        except OSError as E:
+            LOGGER.warning("Profile not saved: %s", E)
+
+    def _takeLocal(self, bReset: bool):
+        with self._cLock:
+            dcHistograms = {tKey: [list(lEntry[0]), lEntry[1], lEntry[2]] for tKey, lEntry in self._dcHistograms.items()}
+            dcCounters = dict(self._dcCounters)
+            if bReset:
+                self._dcHistograms.clear()
+                self._dcCounters.clear()
+        return dcHistograms, dcCounters
+
+    @staticmethod
+    def _merge(dcHistograms: dict, dcCounters: dict, dcOtherHistograms: dict, dcOtherCounters: dict):
+        for tKey, lEntry in dcOtherHistograms.items():
+            lTarget = dcHistograms.setdefault(tKey, [[0]*len(METRICS_BUCKETS), 0.0, 0])
+            lTarget[0] = [iCount+iOther for iCount, iOther in zip(lTarget[0], lEntry[0])]
+            lTarget[1] += lEntry[1]
+            lTarget[2] += lEntry[2]
+        for tKey, fValue in dcOtherCounters.items():
+            dcCounters[tKey] = dcCounters.get(tKey, 0.0)+fValue
+        return dcHistograms, dcCounters
+
+    def flush(self):
+        """
+        Move the values of this process to the shared store
+        """
+        if self.cSharedCache is None: return
+        dcHistograms, dcCounters = self._takeLocal(bReset=True)
+        if not dcHistograms and not dcCounters: return
+        with self.cSharedCache.transact():
+            dcShared, dcSharedCounters = self.cSharedCache.get(METRICS_SHARED_KEY, ({}, {}))
+            self.cSharedCache.set(METRICS_SHARED_KEY, self._merge(dcShared, dcSharedCounters, dcHistograms, dcCounters))
+
+    def getSnapshot(self):
+        """
+        (histograms, counters) of this process and the shared store
+        """
+        dcHistograms, dcCounters = self._takeLocal(bReset=False)
+        if self.cSharedCache is not None:
+            dcShared, dcSharedCounters = self.cSharedCache.get(METRICS_SHARED_KEY, ({}, {}))
+            self._merge(dcHistograms, dcCounters, dcShared, dcSharedCounters)
+        return dcHistograms, dcCounters
+
+    def render(self, dcGauges: dict | None = None):
+        """
+        Prometheus text exposition format (version 0.0.4); dcGauges - extra {name: (value, help text)}
+        """
+        dcHistograms, dcCounters = self.getSnapshot()
+        lLines = []
+        for sFamily, (sLabel, sHelp) in METRIC_FAMILIES.items():
+            lHistograms = sorted((sName, lEntry) for (sKey, sName), lEntry in dcHistograms.items() if sKey == sFamily)
+            if lHistograms:
+                sMetric = f"{METRICS_PREFIX}_{sFamily}_duration_seconds"
+                lLines += [f"# HELP {sMetric} {sHelp}", f"# TYPE {sMetric} histogram"]
+                for sName, (lCounts, fSum, iCount) in lHistograms:
+                    sLabels = f'{sLabel}="{_escapeLabel(sName)}"'
+                    iCumulative = 0
+                    for fBound, iBucket in zip(METRICS_BUCKETS, lCounts):
+                        iCumulative += iBucket
+                        lLines.append(f'{sMetric}_bucket{{{sLabels},le="{fBound:g}"}} {iCumulative}')
+                    lLines.append(f'{sMetric}_bucket{{{sLabels},le="+Inf"}} {iCount}')
+                    lLines.append(f"{sMetric}_sum{{{sLabels}}} {fSum!r}")
+                    lLines.append(f"{sMetric}_count{{{sLabels}}} {iCount}")
+            lCounters = sorted((sName, fValue) for (sKey, sName), fValue in dcCounters.items() if sKey == sFamily)
+            if lCounters:
+                sMetric = f"{METRICS_PREFIX}_{sFamily}_total"
+                lLines += [f"# HELP {sMetric} {sHelp}", f"# TYPE {sMetric} counter"]
+                lLines += [f'{sMetric}{{{sLabel}="{_escapeLabel(sName)}"}} {fValue:g}' for sName, fValue in lCounters]
+        for sName, (_Value, sHelp) in (dcGauges or {}).items():
+            sMetric = f"{METRICS_PREFIX}_{sName}"
+            lLines += [f"# HELP {sMetric} {sHelp}", f"# TYPE {sMetric} gauge", f"{sMetric} {float(_Value):g}"]
+        return "\n".join(lLines)+"\n"
+
+    def instrumentServer(self, cServer):
+        """
+        Time every request of the Flask server (Dash callbacks incl. serialization, layout, assets)
+        """
+        if not self.bEnabled: return
+        import flask
+
+        @cServer.before_request
+        def _startTimer():
+            flask.g.fMetricsStart = time.perf_counter()
+
+        @cServer.after_request
+        def _stopTimer(cResponse):
+            fStart = getattr(flask.g, 'fMetricsStart', None)
+            # Route rule, not the path - bounded number of label values
+            sRule = flask.request.url_rule.rule if flask.request.url_rule is not None else "unmatched"
+            if fStart is not None: self.observe("http_request", sRule, time.perf_counter()-fStart)
+            return cResponse
+
+def _escapeLabel(sValue: str):
+    return str(sValue).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def logCallbackError(sCallback: str, E: Exception):
+    """
+    Log an exception caught in a callback (with traceback) and count it
+    """
+    LOGGER.error("Callback '%s' failed: %s", sCallback, E, exc_info=E)
+    METRICS.increment("error", sCallback)
+    if METRICS_LOGGER.isEnabledFor(logging.INFO): METRICS.log("error", callback=sCallback, error=repr(E))
+
+METRICS = CMetrics()
@@ -1,12 +1,25 @@
 from dash import dcc, html
 import dash_bootstrap_components as dbc
 from structure.plotter import getEmptyPlot
+from structure.export import getAvailableFormats
 from structure.descriptions import *
 from Calculations.ConstantParameters import *
 
 APP_VERSION = '1.2'
 APP_YEAR = '2024'
 BASE_COLOR = '#008ede'
+# Canopy type presets (Calculations.Parameters.PARAMETER_PRESETS)
+PRESET_LABELS = {
+    'default': 'Domyślny',
+    'flat_circular': 'Płaski okrągły',
+    'conical': 'Stożkowy',
+    'hemispherical': 'Półsferyczny',
+    'cruciform': 'Krzyżowy',
+    'annular': 'Pierścieniowy',
+    'ringslot': 'Ringslot',
+    'ribbon': 'Taśmowy',
+}
+EXPORT_LABELS = {'csv': 'CSV', 'parquet': 'Parquet', 'arrow': 'Arrow', 'npz': 'NPZ'}
 
 def serveTooltip(sMessage: str, sTarget: str, sPlacement: str='top'):
     return dbc.Tooltip(
@@ -18,6 +31,47 @@ def serveTooltip(sMessage: str, sTarget: str, sPlacement: str='top'):
         }         
     )
 
+def serveExportFormat(sId: str):
+    """
+    File format of the saved results (only formats with an installed backend)
+    """
+    return html.Div(
+        [
+            "Format:",
+            dcc.RadioItems([EXPORT_LABELS[sFormat] for sFormat in getAvailableFormats()], 'CSV', id=f'{sId}-format-radio', inline=True, inputStyle={'margin': '0 3px 0 8px'}),
+        ],
+        style={'display': 'flex', 'justify-content': 'center', 'align-items': 'center', 'margin': '5px'}
+    )
+
+def serveJobControls(sId: str):
+    """
+    Cancel button, progress bar and status message of a background simulation
+    """
+    return [
+        dbc.Button(
+            "✖ Anuluj",
+            id=f"{sId}-cancel-button",
+            disabled=True,
+            style = {
+                'width': '100%',
+                'margin': '5px',
+                'background-color': 'white',
+                'color': BASE_COLOR,
+                'border-color': BASE_COLOR
+            }
+        ),
+        dbc.Progress(
+            id=f"{sId}-progress-bar",
+            value=0,
+            label="",
+            striped=True,
+            animated=True,
+            color=BASE_COLOR,
+            style={'margin': '5px', 'height': '20px'}
+        ),
+        html.Div(id=f"{sId}-status-text", style={'margin': '5px', 'color': 'crimson'}),
+    ]
+
 def serveNavbar():
     navbar = dbc.Navbar([
         html.Div([
@@ -172,6 +226,12 @@ def serveInputData():
                     dbc.CardBody([
                         html.Div(
                         [
+                            "Typ czaszy:",
+                            dcc.Dropdown(
+                                [{'label': sLabel, 'value': sPreset} for sPreset, sLabel in PRESET_LABELS.items()],
+                                None, id='input-preset-dropdown', placeholder='-', clearable=False, style={'text-align': 'left'}
+                            ),
+                            serveTooltip(DESCRIPTION_INPUT_PARAMS['preset'], 'input-preset-dropdown'),
                             "Gęstość powietrza [kg/m^3]:",
                             dcc.Input(type='number', id='input-airdensity-input', min=0, step=.001, value=INPUT_PARAMETERS["AIR_DENSITY"]),
                             serveTooltip(DESCRIPTION_INPUT_PARAMS['airdensity'], 'input-airdensity-input'),
@@ -230,6 +290,7 @@ def serveInputData():
                                 'border-color': BASE_COLOR
                             }
                         ),
+                        serveExportFormat("input"),
                     ],
                     className='buttons-container'
                 ),
@@ -343,6 +404,8 @@ def serveSim1():
                                 'border-color': BASE_COLOR
                             }
                         ),
+                        serveExportFormat("simulation1"),
+                        *serveJobControls("simulation1"),
                     ],
                     className='buttons-container'
                 ), 
@@ -464,6 +527,8 @@ def serveSim2():
                                 'border-color': BASE_COLOR
                             }
                         ),
+                        serveExportFormat("simulation2"),
+                        *serveJobControls("simulation2"),
                     ],
                     className='buttons-container'
                 ),
@@ -1,10 +1,18 @@
+import functools
+import time
 import numpy as np
 import plotly.graph_objects as go
 import plotly.subplots as sub
 import plotly.express as px
+import plotly.io as pio
 
 from dash import html
 
+from structure.metrics import METRICS
+
+PLOT_MAX_POINTS = 4000 # points sent to the browser per trace
+PLOT_WEBGL_THRESHOLD = 10000 # input points above which Scattergl is used
+
 def getEmptyPlot():
     return {
         "layout": {
@@ -28,12 +36,59 @@ def getEmptyPlot():
         }
     }
 
-def plotResults(aXArray: np.ndarray, aYArray: np.ndarray, sXlabel: str = "", sYLabel: str = "", sColour: str = "black", lHorizontalLines: list[tuple] = [], lVerticalLines: list[tuple] = []):
+def decimateMinMax(aXArray: np.ndarray, aYArray: np.ndarray, iMaxPoints: int):
+    """
+    Min-max (M4) downsampling - split the series into iMaxPoints/4 buckets and keep the first,
+    last, minimum and maximum point of each, so the drawn line keeps its envelope and extremes.
+    Returns the indices of the kept points (sorted)
+    """
+    iPoints = aYArray.size
+    iBuckets = max(1, iMaxPoints//4)
+    iBucketSize = int(np.ceil(iPoints/iBuckets))
+    iBuckets = int(np.ceil(iPoints/iBucketSize))
+    aY = np.asarray(aYArray, dtype=float)
+    aPadded = np.full(iBuckets*iBucketSize, np.nan)
+    aPadded[:iPoints] = aY
+    aPadded = aPadded.reshape(iBuckets, iBucketSize)
+    aStart = np.arange(iBuckets)*iBucketSize
+    aMin = aStart + np.argmin(np.where(np.isnan(aPadded), np.inf, aPadded), axis=1)
+    aMax = aStart + np.argmax(np.where(np.isnan(aPadded), -np.inf, aPadded), axis=1)
+    aLast = np.minimum(aStart+iBucketSize, iPoints)-1
+    return np.unique(np.concatenate((aStart, aMin, aMax, aLast)))
 
+def decimateLTTB(aXArray: np.ndarray, aYArray: np.ndarray, iMaxPoints: int):
+    """
+    Largest-Triangle-Three-Buckets downsampling to iMaxPoints points (first and last point kept).
+    Returns the indices of the kept points (sorted)
+    """
+    aX = np.asarray(aXArray, dtype=float)
+    aY = np.asarray(aYArray, dtype=float)
+    iPoints = aY.size
+    if iMaxPoints >= iPoints or iMaxPoints < 3: return np.arange(iPoints)
+    aEdges = np.linspace(1, iPoints-1, iMaxPoints-1).astype(np.int64)
+    aIndex = np.empty(iMaxPoints, dtype=np.int64)
+    aIndex[0], aIndex[-1] = 0, iPoints-1
+    iPrevious = 0
+    for iBucket in range(iMaxPoints-2):
+        iStart, iStop = aEdges[iBucket], aEdges[iBucket+1]
+        # Average of the next bucket (the last point for the last bucket)
+        iNextStop = aEdges[iBucket+2] if iBucket+2 < aEdges.size else iPoints
+        fNextX = aX[iStop:iNextStop].mean()
+        fNextY = aY[iStop:iNextStop].mean()
+        # Point forming the largest triangle with the previous point and the next bucket average
+        aArea = np.abs((aX[iPrevious]-fNextX)*(aY[iStart:iStop]-aY[iPrevious]) - (aX[iPrevious]-aX[iStart:iStop])*(fNextY-aY[iPrevious]))
+        iPrevious = iStart + int(np.argmax(aArea))
+        aIndex[iBucket+1] = iPrevious
+    return aIndex
+
+def _buildFigureValidated(aXArray, aYArray, sXlabel, sYLabel, sColour, lHorizontalLines, lVerticalLines, cTrace):
+    """
+    Figure built with plotly.graph_objects (validated)
+    """
     dcFigure = go.Figure()
 
     dcFigure.add_trace(
-        go.Scatter(
+        cTrace(
             x = aXArray, 
             y = aYArray,
             line_color=sColour,
@@ -99,4 +154,108 @@ def plotResults(aXArray: np.ndarray, aYArray: np.ndarray, sXlabel: str = "", sYL
         plot_bgcolor='white',
     )
 
-    return {'data': dcFigure['data'],'layout': dcFigure['layout']}
\ No newline at end of file
+    return {'data': dcFigure['data'],'layout': dcFigure['layout']}
+
+@functools.lru_cache(maxsize=8)
+def _getTemplate(sTemplate: str):
+    """
+    Plain dict of a plotly template (shared - do not modify)
+    """
+    return pio.templates[sTemplate].to_plotly_json()
+
+def _getLineShape(fValue: float, sColor: str, bHorizontal: bool):
+    """
+    Shape dict of add_hline/add_vline
+    """
+    dcShape = {
+        "layer": "below",
+        "line": {"color": sColor, "dash": "dash", "width": 2},
+        "opacity": 0.90,
+        "type": "line",
+    }
+    if bHorizontal:
+        dcShape.update(x0=0, x1=1, xref="x domain", y0=fValue, y1=fValue, yref="y")
+    else:
+        dcShape.update(x0=fValue, x1=fValue, xref="x", y0=0, y1=1, yref="y domain")
+    return dcShape
+
+def _getAxis(sLabel: str):
+    return {
+        "title": {"text": sLabel},
+        "tickfont": {"size": 12},
+        "showticklabels": True,
+        "mirror": True,
+        "ticks": "outside",
+        "showline": True,
+        "linecolor": "black",
+        "gridcolor": "lightgrey",
+    }
+
+def _buildFigureDict(aXArray, aYArray, sXlabel, sYLabel, sColour, lHorizontalLines, lVerticalLines, cTrace):
+    """
+    Same figure as _buildFigureValidated, emitted directly as a plain dict (no validation)
+    """
+    dcTrace = {
+        "hoverinfo": "text",
+        "hovertemplate": "Średnica: %{y:.3f} m<extra></extra>",
+        "line": {"color": sColour},
+        "mode": "lines",
+        "opacity": 0.90,
+        "showlegend": False,
+        "x": aXArray,
+        "y": aYArray,
+        "type": "scattergl" if cTrace is go.Scattergl else "scatter",
+    }
+    lShapes = [_getLineShape(fY, sColor, True) for fY, sColor in lHorizontalLines]
+    lShapes += [_getLineShape(fX, sColor, False) for fX, sColor in lVerticalLines]
+    dcLayout = {
+        "template": _getTemplate("seaborn"),
+        "transition": {"duration": 200},
+        "xaxis": _getAxis(sXlabel),
+        "yaxis": _getAxis(sYLabel),
+        "margin": {"l": 15, "r": 5, "t": 0, "b": 0},
+        "autosize": True,
+        "showlegend": False,
+        "hovermode": "x unified",
+        "plot_bgcolor": "white",
+    }
+    if lShapes: dcLayout["shapes"] = lShapes
+    return {'data': [dcTrace], 'layout': dcLayout}
+
+@METRICS.timed("calculation")
+def plotResults(
+        aXArray: np.ndarray, aYArray: np.ndarray,
+        sXlabel: str = "", sYLabel: str = "", sColour: str = "black",
+        lHorizontalLines: list[tuple] = [], lVerticalLines: list[tuple] = [],
+        iMaxPoints: int | None = PLOT_MAX_POINTS, sDecimation: str = "minmax",
+        iWebGLThreshold: int = PLOT_WEBGL_THRESHOLD, dcStats: dict | None = None,
+        bValidate: bool = False
+    ):
+    """
+    Line plot figure. Series longer than iMaxPoints are downsampled ('minmax' or 'lttb'),
+    series longer than iWebGLThreshold are drawn with WebGL (Scattergl).
+    The figure dict is built directly (bValidate=True - through validated plotly.graph_objects,
+    same result after serialization, several times slower).
+    If dcStats dict is given, it is filled with the point counts, trace type,
+    build and serialization time [s] and JSON payload size [B].
+    """
+    fStart = time.perf_counter()
+    aXArray, aYArray = np.asarray(aXArray), np.asarray(aYArray)
+    iPointsIn = aYArray.size
+    if iMaxPoints is not None and iPointsIn > iMaxPoints:
+        fnDecimate = decimateLTTB if sDecimation == "lttb" else decimateMinMax
+        aIndex = fnDecimate(aXArray, aYArray, iMaxPoints)
+        aXArray, aYArray = aXArray[aIndex], aYArray[aIndex]
+    cTrace = go.Scattergl if iPointsIn > iWebGLThreshold else go.Scatter
+
+    fnBuild = _buildFigureValidated if bValidate else _buildFigureDict
+    dcFigureOut = fnBuild(aXArray, aYArray, sXlabel, sYLabel, sColour, lHorizontalLines, lVerticalLines, cTrace)
+    if dcStats is not None:
+        dcStats["points_in"] = iPointsIn
+        dcStats["points_out"] = int(aYArray.size)
+        dcStats["trace_type"] = cTrace.__name__
+        dcStats["build_time"] = time.perf_counter()-fStart
+        fStart = time.perf_counter()
+        dcStats["payload_bytes"] = len(pio.to_json(dcFigureOut, validate=False).encode('utf-8'))
+        dcStats["serialization_time"] = time.perf_counter()-fStart
+    return dcFigureOut
\ No newline at end of file
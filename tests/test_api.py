@@ -0,0 +1,36 @@
+import flask
+import pytest
+
+from structure.api import getApiBlueprint
+
+@pytest.fixture
+def cClient():
+    cServer = flask.Flask(__name__)
+    cServer.register_blueprint(getApiBlueprint())
+    cServer.config["MAX_CONTENT_LENGTH"] = 4096
+    return cServer.test_client()
+
+def test_peak_loads(cClient):
+    cResponse = cClient.post("/api/v1/peak-loads", json={"cases": {"mass": [20, 10], "opening_velocity": [30, 25], "diameter": [2.0, 1.5]}})
+    assert cResponse.status_code == 200
+    dcBody = cResponse.get_json()
+    assert dcBody["count"] == 2
+    assert all(fLoad > 0.0 for fLoad in dcBody["results"]["peak_load_oscalc"])
+
+@pytest.mark.parametrize("sEndpoint, dcCases", [
+    ("peak-loads", {"mass": [20, -1], "opening_velocity": [30, 25], "diameter": [2.0, 1.5]}),
+    ("peak-loads", {"mass": [20, 10], "opening_velocity": [30, 0], "diameter": [2.0, 1.5]}),
+    ("peak-loads", {"mass": [20, 10], "opening_velocity": [30, 25], "diameter": [2.0, 0.0]}),
+    ("peak-loads", {"mass": [20, 10], "opening_velocity": [30, 25], "target_velocity": [5.0, -5.0]}),
+    ("peak-loads", {"mass": [20, None], "opening_velocity": [30, 25], "diameter": [2.0, 1.5]}),
+    ("velocity-from-diameter", {"mass": [20], "diameter": [-2.0]}),
+    ("diameter-from-velocity", {"mass": [0], "target_velocity": [5.0]}),
+])
+def test_non_positive_inputs(cClient, sEndpoint: str, dcCases: dict):
+    cResponse = cClient.post(f"/api/v1/{sEndpoint}", json={"cases": dcCases})
+    assert cResponse.status_code == 400
+    assert "has to be positive" in cResponse.get_json()["error"]
+
+def test_oversized_request(cClient):
+    cResponse = cClient.post("/api/v1/peak-loads", data=b"0"*8192, content_type="text/csv")
+    assert cResponse.status_code == 413
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from Calculations.Air import getAirDensity
+from Calculations.Atmosphere import getISAAtmosphere
+from Calculations.AtmosphereTable import getAtmosphereTable
+
+@pytest.mark.parametrize("sMethod", ["getTemperature", "getPressure", "getHumidity", "getDensity"])
+def test_scalar_altitude_matches_array(sMethod: str):
+    cAtmosphere = getISAAtmosphere()
+    aAltitude = np.array([-100.0, 500.0, 12000.0, 90000.0])
+    aValues = getattr(cAtmosphere, sMethod)(aAltitude)
+    for fAltitude, fValue in zip(aAltitude, aValues):
+        _Value = getattr(cAtmosphere, sMethod)(float(fAltitude))
+        assert np.ndim(_Value) == 0
+        assert _Value == pytest.approx(fValue)
+
+def test_isa_sea_level():
+    cAtmosphere = getISAAtmosphere()
+    assert cAtmosphere.getTemperature(0.0) == pytest.approx(288.15)
+    assert cAtmosphere.getPressure(0.0) == pytest.approx(101325.0)
+    assert cAtmosphere.getDensity(0.0) == pytest.approx(1.225, rel=1e-3)
+
+def test_table_scalar_altitude():
+    cTable = getAtmosphereTable(101325.0, 288.15)
+    fDensity = cTable.getDensity(500.0)
+    assert np.ndim(fDensity) == 0
+    assert fDensity == pytest.approx(cTable.getDensity(np.array([500.0]))[0])
+    assert cTable.getDensity(20000.0) == pytest.approx(getAirDensity(101325.0, 288.15, -20000.0, 0.0))
+
+@pytest.mark.parametrize("fRefHumidity", [0.0, 0.5, 0.98])
+def test_table_error_estimate(fRefHumidity: float):
+    # Estimate (not a guaranteed bound) - still above the error measured on a dense sample for these profiles
+    cTable = getAtmosphereTable(101325.0, 288.15, fRefHumidity, fResolution=100.0, fTargetError=1e-6)
+    aAltitude = np.linspace(0.0, 10000.0, 100003)
+    fError = np.max(np.abs(cTable.getDensity(aAltitude)-getAirDensity(101325.0, 288.15, -aAltitude, fRefHumidity)))
+    assert fError <= cTable.fErrorEstimate <= 1e-6
@@ -0,0 +1,30 @@
+import pytest
+
+from structure.cache import CResultCache
+
+def _getSharedCache(sPath: str):
+    diskcache = pytest.importorskip("diskcache")
+    return diskcache.Cache(sPath, size_limit=2**24, eviction_policy='least-recently-used')
+
+@pytest.mark.parametrize("bShared", [False, True])
+def test_lru_bound_and_counters(bShared: bool, tmp_path):
+    cCache = CResultCache(iMaxEntries=3)
+    if bShared: cCache.setSharedCache(_getSharedCache(str(tmp_path)))
+    for i in range(3): cCache.set(f"key{i}", i)
+    assert cCache.get("key0") == (True, 0) # key0 becomes the most recently used
+    cCache.set("key3", 3)
+    cCache.set("key4", 4)
+    assert cCache.get("key1") == (False, None)
+    assert cCache.get("key2") == (False, None)
+    assert cCache.get("key0") == (True, 0)
+    dcStats = cCache.getStats()
+    assert dcStats["shared"] == bShared
+    assert (dcStats["entries"], dcStats["max_entries"], dcStats["evictions"]) == (3, 3, 2)
+    assert (dcStats["hits"], dcStats["misses"]) == (2, 2)
+
+def test_shared_entries_visible_to_other_instances(tmp_path):
+    cServer, cJob = CResultCache(), CResultCache()
+    cServer.setSharedCache(_getSharedCache(str(tmp_path)))
+    cJob._cShared = cServer._cShared
+    cJob.set("key", {"result": 1.0})
+    assert cServer.get("key") == (True, {"result": 1.0})
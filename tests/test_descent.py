@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from Calculations.CParachute import CParachuteBatch
+from Calculations.Descent import CDescentConvergenceWarning, simulateDescentBatch
+
+def getParachutes():
+    return CParachuteBatch(np.array([5.0, 20.0, 50.0]), np.array([1.5, 2.5, 4.0]), 30.0)
+
+def test_batch_descent_converged():
+    dcResults = simulateDescentBatch(getParachutes(), 500.0)
+    assert np.all(dcResults["converged"])
+    assert np.all(np.isfinite(dcResults["landing_time"]))
+    assert np.all(dcResults["impact_velocity"] > 0.0)
+
+def test_batch_descent_not_converged():
+    with pytest.warns(CDescentConvergenceWarning, match="3 of 3"):
+        dcResults = simulateDescentBatch(getParachutes(), 500.0, lStatistics=("landing_time", "steps"), iMaxIterations=5)
+    assert not np.any(dcResults["converged"])
+    assert np.all(np.isnan(dcResults["landing_time"]))
+    assert np.all(dcResults["steps"] > 0)
+
+def test_batch_descent_time_limit():
+    # Rows stopped at fMaxTime are finished - no landing, no warning
+    dcResults = simulateDescentBatch(getParachutes(), 5000.0, fMaxTime=1.0)
+    assert np.all(dcResults["converged"])
+    assert np.all(np.isnan(dcResults["landing_time"]))
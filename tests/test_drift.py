@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from Calculations.Drift import CWindProfile, getLandingPoints, runDriftDispersion
+
+def _getUniformWind(fSpeed: float = 5.0, fDirection: float = 270.0):
+    return CWindProfile([0.0, 5000.0], [fSpeed, fSpeed], [fDirection, fDirection])
+
+def test_landing_points_uniform_wind():
+    # Wind from the west - drift to the east by speed*descent time
+    dcPoints = getLandingPoints(_getUniformWind(), np.array([10.0, 20.0]), 2.5, np.array([500.0, 1000.0]))
+    assert dcPoints["east"] == pytest.approx(5.0*dcPoints["descent_time"], rel=1e-12)
+    assert dcPoints["north"] == pytest.approx(0.0, abs=1e-9)
+    assert np.all(dcPoints["descent_time"] > 0.0)
+
+def test_direction_offset_and_speed_factor():
+    # Offset of 90 deg turns the wind from the west into a wind from the north
+    dcPoints = getLandingPoints(_getUniformWind(), 10.0, 2.5, 800.0, 2.0, 90.0)
+    assert dcPoints["north"] == pytest.approx(-2.0*5.0*dcPoints["descent_time"], rel=1e-12)
+    assert dcPoints["east"] == pytest.approx(0.0, abs=1e-9)
+
+def test_dispersion_shapes_and_moments():
+    dcDistributions = {"MASS": ("normal", 20.0, 0.5), "CANOPY_DIAMETER": 2.5, "DEPLOY_ALTITUDE": ("uniform", 800.0, 1200.0),
+                       "WIND_DIRECTION_OFFSET": ("normal", 0.0, 10.0)}
+    dcResults = runDriftDispersion(_getUniformWind(), dcDistributions, 5000, iWorkers=1, iChunkSize=1300, iBins=40)
+    assert dcResults["raster"]["counts"].shape == (40, 40)
+    assert dcResults["raster"]["east_edges"].shape == dcResults["raster"]["north_edges"].shape == (41,)
+    assert dcResults["raster"]["counts"].sum()+dcResults["raster"]["outside"] == 5000
+    assert dcResults["mean"].shape == (2,) and dcResults["mean"][0] > 0.0
+    assert dcResults["covariance"].shape == (2, 2)
+    assert dcResults["covariance"] == pytest.approx(dcResults["covariance"].T)
+    lEllipses = dcResults["ellipses"]
+    assert [dcEllipse["level"] for dcEllipse in lEllipses] == [0.5, 0.9, 0.99]
+    assert all(dcEllipse["semi_major"] >= dcEllipse["semi_minor"] > 0.0 for dcEllipse in lEllipses)
+    assert np.all(np.diff([dcEllipse["semi_major"] for dcEllipse in lEllipses]) > 0.0)
+
+@pytest.mark.parametrize("iSamples", [0, -1])
+def test_rejects_no_samples(iSamples: int):
+    with pytest.raises(ValueError):
+        runDriftDispersion(_getUniformWind(), {"MASS": 20.0, "CANOPY_DIAMETER": 2.5, "DEPLOY_ALTITUDE": 1000.0}, iSamples, iWorkers=1)
@@ -0,0 +1,27 @@
+import base64
+import gzip
+import io
+import numpy as np
+import pandas as pd
+import pytest
+
+from structure.export import readResults, sendResults, writeResults
+
+RESULTS = pd.DataFrame({"Masa pojazdu [kg]": np.arange(10.0), "Średnica czaszy spadochronu [m]": np.linspace(1.0, 3.0, 10)})
+
+def test_csv_chunks_to_binary_buffer():
+    cBuffer = io.BytesIO()
+    assert writeResults(RESULTS, cBuffer, "csv", iChunkSize=3) == 10
+    assert cBuffer.getvalue().decode("utf-8") == RESULTS.to_csv(sep=";", index=False)
+
+def test_csv_chunks_compressed():
+    cBuffer = io.BytesIO()
+    writeResults(RESULTS, cBuffer, "csv", "gzip", iChunkSize=4)
+    assert gzip.decompress(cBuffer.getvalue()).decode("utf-8") == RESULTS.to_csv(sep=";", index=False)
+
+@pytest.mark.parametrize("sFormat", ["csv", "parquet", "npz"])
+def test_send_results(sFormat: str):
+    dcDownload = sendResults(RESULTS, f"wyniki.{sFormat}", sFormat)
+    assert dcDownload["filename"] == f"wyniki.{sFormat}"
+    pdResults, _ = readResults(io.BytesIO(base64.b64decode(dcDownload["content"])), sFormat)
+    pd.testing.assert_frame_equal(pdResults, RESULTS)
@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+from Calculations.CParachute import CParachuteBatch
+from Calculations.GridSolver import solveGrid
+
+def test_grid_matches_batch():
+    aMass, aDiameter = np.array([5.0, 10.0, 20.0]), np.array([1.0, 2.0])
+    cResult = solveGrid({"MASS": aMass, "CANOPY_DIAMETER": aDiameter, "OPEN_VELOCITY": 30.0}, lOutputs=("pflanz",), iChunkSize=2)
+    aExpected = CParachuteBatch(aMass[:, None], aDiameter[None, :], 30.0).getPeakOpeningLoadPflanz()
+    assert cResult["pflanz"] == pytest.approx(aExpected, rel=1e-14)
+
+def test_exclusive_diameter_inputs():
+    with pytest.raises(ValueError):
+        solveGrid({"MASS": np.array([5.0, 10.0]), "TARGET_VELOCITY": 6.0, "CANOPY_DIAMETER": 2.0, "OPEN_VELOCITY": 30.0})
+
+def test_large_grid_requires_memmap():
+    # 10**8 cells, 7 float64 outputs - checked before any allocation
+    with pytest.raises(ValueError, match="sMemmapDir"):
+        solveGrid({"MASS": np.ones(10**4), "CANOPY_DIAMETER": np.ones(10**4), "OPEN_VELOCITY": 30.0})
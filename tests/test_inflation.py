@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from Calculations.CParachute import CParachute
+from Calculations.Inflation import integrateInflation
+from Calculations.Parameters import DEFAULT_PARAMETERS
+
+def _getInflationInputs(cParachute: CParachute):
+    cParameters = cParachute.dcParameters
+    return (
+        cParachute.fMass, cParachute.fVehicleDragArea, cParachute.fInflationTime, cParachute.fOpenInitVelocity,
+        cParameters.fAirDensity, cParameters.fGAcceleration, cParameters.fDragIntegral
+    )
+
+@pytest.mark.parametrize("tCase", [(20.0, 2.5, 30.0), (1.0, 3.0, 20.0), (50.0, 1.0, 60.0), (5.0, 5.0, 15.0)])
+def test_default_steps_converged(tCase: tuple):
+    # Default step count within 1% of a fine-step reference
+    tInputs = _getInflationInputs(CParachute(*tCase))
+    dcDefault = integrateInflation(*tInputs, bHistory=False)
+    dcReference = integrateInflation(*tInputs, iSteps=3000, bHistory=False)
+    for sKey in ("peak_load", "impulse", "final_velocity"):
+        assert dcDefault[sKey] == pytest.approx(dcReference[sKey], rel=1e-2)
+
+def test_infinite_mass_limit():
+    # No deceleration (and no gravity) - the velocity stays V_1, the peak is q_1*C_dS_o at t_inf (X_1 -> 1)
+    cParachute = CParachute(1e12, 2.5, 30.0, DEFAULT_PARAMETERS.replace(G_ACCELERATION=1e-9))
+    fFullLoad = cParachute.dcParameters.fHalfDensityDrag*30.0**2*cParachute.fCanopyArea
+    dcInflation = integrateInflation(*_getInflationInputs(cParachute), bHistory=False)
+    assert dcInflation["peak_load"]/fFullLoad == pytest.approx(1.0, rel=1e-6)
+    assert dcInflation["peak_time"] == pytest.approx(cParachute.fInflationTime)
+    assert cParachute.getPeakOpeningLoadOSCALC() == pytest.approx(fFullLoad, rel=1e-6)
+
+def test_load_factor_decreases_with_mass_ratio():
+    # Lighter vehicles decelerate during inflation - lower peak relative to q_1*C_dS_o
+    lRatios = []
+    for fMass in (1.0, 20.0, 1000.0):
+        cParachute = CParachute(fMass, 2.5, 30.0)
+        lRatios.append(cParachute.getPeakOpeningLoadOSCALC()/(cParachute.dcParameters.fHalfDensityDrag*30.0**2*cParachute.fCanopyArea))
+    assert np.all(np.diff(lRatios) > 0.0)
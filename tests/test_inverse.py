@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from Calculations.CParachute import CParachuteBatch
+from Calculations.ConstantParameters import INPUT_PARAMETERS
+from Calculations.Inverse import getDiameterFromLoad, getOpenVelocityFromLoad
+
+@pytest.mark.parametrize("sMethod", ["pflanz", "oscalc"])
+def test_parameter_arrays_with_scalar_inputs(sMethod: str):
+    dcParameters = {**INPUT_PARAMETERS, "DRAG_COEFF": np.array([0.7, 0.8, 0.9])}
+    aDiameter = getDiameterFromLoad(3000.0, 20.0, 30.0, sMethod, dcParameters)
+    assert aDiameter.shape == (3,)
+    for i, fDragCoeff in enumerate(dcParameters["DRAG_COEFF"]):
+        assert aDiameter[i] == pytest.approx(getDiameterFromLoad(3000.0, 20.0, 30.0, sMethod, {**INPUT_PARAMETERS, "DRAG_COEFF": fDragCoeff}), rel=1e-9)
+
+@pytest.mark.parametrize("sMethod", ["pflanz", "oscalc"])
+def test_solution_reaches_load_limit(sMethod: str):
+    aLoadLimit = np.array([1000.0, 3000.0])
+    aDiameter = getDiameterFromLoad(aLoadLimit, 20.0, 30.0, sMethod)
+    aVelocity = getOpenVelocityFromLoad(aLoadLimit, 20.0, aDiameter, sMethod)
+    cParachutes = CParachuteBatch(20.0, aDiameter, 30.0)
+    aLoad = cParachutes.getPeakOpeningLoadPflanz() if sMethod == "pflanz" else cParachutes.getPeakOpeningLoadOSCALC(bWarn=False)
+    assert aLoad == pytest.approx(aLoadLimit, rel=1e-8)
+    assert aVelocity == pytest.approx(30.0, rel=1e-8)
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from structure.metrics import CMetrics
+from structure.plotter import plotResults
+
+def test_plot_stats():
+    cMetrics = CMetrics(bEnabled=True)
+    dcStats = {}
+    plotResults(np.linspace(0.0, 1.0, 50), np.linspace(1.0, 2.0, 50), dcStats=dcStats)
+    cMetrics.observePlot("simulation1", dcStats)
+    dcHistograms, dcCounters = cMetrics.getSnapshot()
+    assert dcCounters[("plot_payload_bytes", "simulation1")] == dcStats["payload_bytes"] > 0
+    assert dcHistograms[("plot_serialization", "simulation1")][2] == 1
+    sText = cMetrics.render()
+    assert f'parasim_plot_payload_bytes_total{{plot="simulation1"}} {dcStats["payload_bytes"]:g}' in sText
+    assert 'parasim_plot_serialization_duration_seconds_count{plot="simulation1"} 1' in sText
+
+@pytest.mark.parametrize("bEnabled, dcStats", [(False, {"serialization_time": 0.1, "payload_bytes": 10}), (True, None)])
+def test_plot_stats_skipped(bEnabled: bool, dcStats: dict | None):
+    cMetrics = CMetrics(bEnabled=bEnabled)
+    cMetrics.observePlot("simulation1", dcStats)
+    assert cMetrics.getSnapshot() == ({}, {})
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from Calculations.MonteCarlo import mergeMoments, runMonteCarlo
+
+def test_merge_moments_large_mean():
+    # Offset much larger than the spread - sum(x**2)/n - mean**2 loses all digits here
+    cGenerator = np.random.default_rng(0)
+    aValues = 1e9+cGenerator.normal(0.0, 1e-3, 10000)
+    tMoments = (0, 0.0, 0.0)
+    for aChunk in np.array_split(aValues, 7):
+        tMoments = mergeMoments(tMoments, (aChunk.size, aChunk.mean(), np.square(aChunk-aChunk.mean()).sum()))
+    iCount, fMean, fM2 = tMoments
+    assert iCount == aValues.size
+    assert fMean == pytest.approx(aValues.mean(), rel=1e-15)
+    assert np.sqrt(fM2/iCount) == pytest.approx(aValues.std(), rel=1e-6)
+
+def test_constant_inputs_have_zero_std():
+    dcResults = runMonteCarlo({"MASS": 10.0, "CANOPY_DIAMETER": 2.0, "OPEN_VELOCITY": 30.0}, 3000, iWorkers=1, iChunkSize=700)
+    for sKey in ("pflanz", "oscalc", "descent_velocity"):
+        assert dcResults[sKey]["std"] <= 1e-12*dcResults[sKey]["mean"]
+        assert dcResults[sKey]["mean"] == pytest.approx(dcResults[sKey]["min"], rel=1e-14)
+
+@pytest.mark.parametrize("iSamples", [0, -10])
+def test_rejects_no_samples(iSamples: int):
+    with pytest.raises(ValueError):
+        runMonteCarlo({"MASS": 10.0, "CANOPY_DIAMETER": 2.0, "OPEN_VELOCITY": 30.0}, iSamples, iWorkers=1)
+
+def test_merge_moments_vectors():
+    cGenerator = np.random.default_rng(1)
+    aPoints = cGenerator.normal([1e6, -2e6], [3.0, 1.0], (5000, 2))
+    tMoments = (0, np.zeros(2), np.zeros((2, 2)))
+    for aChunk in np.array_split(aPoints, 6):
+        aDeviation = aChunk-aChunk.mean(axis=0)
+        tMoments = mergeMoments(tMoments, (len(aChunk), aChunk.mean(axis=0), aDeviation.T@aDeviation))
+    iCount, aMean, aM2 = tMoments
+    assert aMean == pytest.approx(aPoints.mean(axis=0), rel=1e-14)
+    assert aM2/iCount == pytest.approx(np.cov(aPoints.T, bias=True), rel=1e-9)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+import Calculations.Optimizer as Optimizer
+from Calculations.Optimizer import getParetoRanks, optimizeCanopy, CANOPY_AREAL_DENSITY
+
+# Fronts: {(1, 4), (2, 2), (4, 1)}, {(2, 4), (3, 3)}, {(4, 4)}
+PARETO_OBJECTIVES = np.array([[3.0, 3.0], [1.0, 4.0], [4.0, 4.0], [2.0, 2.0], [4.0, 1.0], [2.0, 4.0]])
+PARETO_RANKS = [1, 0, 2, 0, 0, 1]
+
+def test_pareto_ranks():
+    assert getParetoRanks(PARETO_OBJECTIVES).tolist() == PARETO_RANKS
+
+def test_pareto_ranks_small_blocks(monkeypatch):
+    monkeypatch.setattr(Optimizer, "PARETO_BLOCK_SIZE", 1)
+    assert getParetoRanks(PARETO_OBJECTIVES).tolist() == PARETO_RANKS
+
+def test_pareto_ranks_duplicates():
+    # Equal rows do not dominate each other
+    assert getParetoRanks(np.array([[1.0, 1.0], [1.0, 1.0], [2.0, 2.0]])).tolist() == [0, 0, 1]
+
+def test_pareto_ranks_limit():
+    aRanks = getParetoRanks(PARETO_OBJECTIVES, iLimit=2)
+    # The first front is complete, the rest is not ranked
+    assert aRanks.tolist() == [6, 0, 6, 0, 0, 6]
+
+def test_constrained_domination():
+    aViolation = np.array([0.0, 0.5, 0.0, 0.0, 0.2, 0.5])
+    aRanks = getParetoRanks(PARETO_OBJECTIVES, aViolation)
+    # Feasible rows by the objectives, infeasible after them by the violation only
+    assert aRanks.tolist() == [1, 4, 2, 0, 3, 4]
+
+def getMassBudgetRun(iSeed: int = 0, iWorkers: int | None = None, fMassBudget: float = 0.5):
+    return optimizeCanopy(
+        {"CANOPY_DIAMETER": (1.0, 4.0)},
+        {"MASS": 20.0, "OPEN_VELOCITY": 30.0},
+        lObjectives=("descent_velocity", "canopy_mass"),
+        dcConstraints={"canopy_mass": (None, fMassBudget)},
+        iPopulation=24, iGenerations=10, iSeed=iSeed, iWorkers=iWorkers,
+    )
+
+def test_mass_budget_run():
+    dcResults = getMassBudgetRun()
+    aDiameter = dcResults["variables"]["CANOPY_DIAMETER"]
+    assert dcResults["evaluations"] == 24*11
+    assert np.all(dcResults["feasible"])
+    assert np.all(dcResults["outputs"]["canopy_mass"] <= 0.5)
+    assert np.allclose(dcResults["outputs"]["canopy_mass"], np.pi*aDiameter**2/4.0*CANOPY_AREAL_DENSITY)
+    # Conflicting objectives - front sorted by the descent velocity, mass decreasing along it
+    assert np.all(np.diff(dcResults["outputs"]["descent_velocity"]) >= 0.0)
+    assert np.all(np.diff(dcResults["outputs"]["canopy_mass"]) <= 0.0)
+    # The budget limits the largest (slowest) canopy
+    assert aDiameter.max() == pytest.approx(np.sqrt(4.0*0.5/(np.pi*CANOPY_AREAL_DENSITY)), rel=2e-2)
+
+def test_mass_budget_infeasible():
+    # Smallest canopy (D = 1 m) is heavier than the budget
+    dcResults = getMassBudgetRun(fMassBudget=0.01)
+    assert not np.any(dcResults["feasible"])
+    assert dcResults["variables"]["CANOPY_DIAMETER"] == pytest.approx([1.0], abs=2e-2)
+
+def test_seeded_run_independent_of_workers():
+    dcSingle, dcPool = getMassBudgetRun(3, 1), getMassBudgetRun(3, 2)
+    assert np.array_equal(dcSingle["variables"]["CANOPY_DIAMETER"], dcPool["variables"]["CANOPY_DIAMETER"])
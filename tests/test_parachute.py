@@ -0,0 +1,44 @@
+import json
+
+import numpy as np
+import pytest
+
+from Calculations.CParachute import CParachute, CParachuteBatch, CInflationTimeWarning
+from Calculations.Parameters import getPreset
+
+@pytest.mark.parametrize("sPreset", ["default", "ringslot"])
+def test_batch_matches_scalar(sPreset: str):
+    cParameters = getPreset(sPreset)
+    aMass, aDiameter, aVelocity = np.array([1.0, 10.0, 45.0]), np.array([0.5, 2.0, 4.5]), np.array([20.0, 35.0, 70.0])
+    cBatch = CParachuteBatch(aMass, aDiameter, aVelocity, cParameters.toDict())
+    dcLoads = cBatch.getPeakOpeningLoad()
+    aBallistic = cBatch.getBallisticParameter()
+    for i in range(aMass.size):
+        cParachute = CParachute(aMass[i], aDiameter[i], aVelocity[i], cParameters)
+        dcLoad = cParachute.getPeakOpeningLoad()
+        assert cParachute.getBallisticParameter() == pytest.approx(aBallistic[i], rel=1e-12)
+        for sMethod in ("pflanz", "simplified", "oscalc"):
+            assert dcLoad[sMethod] == pytest.approx(dcLoads[sMethod][i], rel=1e-12)
+
+def test_pflanz_load():
+    # F_max = ro*V_1**2/2*C_d*S_o*C_x*X_1
+    cParameters = getPreset("conical")
+    cParachute = CParachute(10.0, 2.0, 30.0, cParameters)
+    fExpected = cParameters["AIR_DENSITY"]*30.0**2/2*cParameters["DRAG_COEFF"]*np.pi*cParameters["OPENING_LOAD_SHOCK_FACTOR"]*cParameters["OPENING_FORCE_REDUCTION_FACTOR"]
+    assert cParachute.getPeakOpeningLoadPflanz() == pytest.approx(fExpected, rel=1e-14)
+
+def test_peak_load_mapping():
+    dcLoads = CParachute(10.0, 2.0, 30.0).getPeakOpeningLoad()
+    assert list(dcLoads) == ["oscalc", "pflanz", "simplified"]
+    assert "pflanz" in dcLoads and "gnf" not in dcLoads
+    assert dict(dcLoads.items()) == {"oscalc": dcLoads.oscalc, "pflanz": dcLoads.pflanz, "simplified": dcLoads.simplified}
+    assert json.loads(json.dumps(dict(dcLoads))) == pytest.approx(dict(dcLoads))
+    with pytest.raises(KeyError):
+        dcLoads["gnf"]
+
+def test_low_gnf_warning():
+    # Large canopy opening at a low velocity - GNF below 4 in both paths
+    with pytest.warns(CInflationTimeWarning):
+        CParachute(0.5, 6.0, 5.0).getPeakOpeningLoadOSCALC()
+    with pytest.warns(CInflationTimeWarning):
+        CParachuteBatch(np.array([0.5, 10.0]), np.array([6.0, 2.0]), np.array([5.0, 30.0])).getPeakOpeningLoadOSCALC()
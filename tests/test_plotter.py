@@ -0,0 +1,22 @@
+import json
+
+import numpy as np
+import plotly.io as pio
+import pytest
+
+from structure.plotter import plotResults
+
+@pytest.mark.parametrize("dcKwargs", [
+    dict(),
+    dict(sXlabel="Prędkość [m/s]", sYLabel="Średnica [m]", sColour="blue"),
+    dict(lHorizontalLines=[(1.5, 'crimson')], lVerticalLines=[(10.0, 'crimson'), (12.0, 'green')]),
+    dict(lHorizontalLines=[(np.float64(0.5), 'black')], iWebGLThreshold=10),
+])
+def test_figure_builders_equivalent(dcKwargs: dict):
+    # The direct dict figure builder has to serialize to the same figure as the validated plotly.graph_objects path
+    cGenerator = np.random.default_rng(0)
+    aX = np.sort(cGenerator.uniform(0.0, 20.0, 100))
+    aY = cGenerator.uniform(0.0, 3.0, 100)
+    dcFast = json.loads(pio.to_json(plotResults(aX, aY, **dcKwargs), validate=False))
+    dcValidated = json.loads(pio.to_json(plotResults(aX, aY, bValidate=True, **dcKwargs), validate=False))
+    assert dcFast == dcValidated
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from Calculations.ConstantParameters import INPUT_PARAMETERS
+from Calculations.Inflation import integrateInflation
+from Calculations.Recovery import RECOVERY_BODY_DRAG_AREA, CRecoveryStage, simulateRecovery
+
+@pytest.mark.parametrize("_ApogeeVelocity", [0.0, -5.0, np.array([10.0, 0.0]), np.nan])
+def test_apogee_velocity_has_to_be_positive(_ApogeeVelocity):
+    with pytest.raises(ValueError):
+        simulateRecovery([CRecoveryStage("main", 2.5, "apogee")], 20.0, 1000.0, _ApogeeVelocity)
+
+def test_single_stage_recovery():
+    dcResults = simulateRecovery([CRecoveryStage("main", 2.5, "apogee")], 20.0, 1000.0, 15.0)
+    assert np.all(np.isfinite(dcResults["landing_time"]))
+    assert np.all(dcResults["impact_velocity"] > 0.0)
+
+def getTerminalVelocity(fMass: float, fDragArea: float, fAirDensity: float = 1.225):
+    # V = sqrt(2*m*g/(ro*C_d*S))
+    return np.sqrt(2.0*fMass*INPUT_PARAMETERS["G_ACCELERATION"]/(fAirDensity*fDragArea))
+
+def getDragArea(fDiameter: float):
+    return INPUT_PARAMETERS["DRAG_COEFF"]*np.pi*fDiameter**2/4.0
+
+def test_drogue_main_sequence():
+    lStages = [CRecoveryStage("drogue", 0.6, "apogee"), CRecoveryStage("main", 2.5, "altitude", 300.0)]
+    dcResults = simulateRecovery(lStages, 20.0, 1500.0, 15.0)
+    dcDrogue, dcMain = dcResults["events"]
+    assert (dcDrogue["stage"], dcMain["stage"]) == ("drogue", "main")
+    assert dcDrogue["altitude"] == pytest.approx(1500.0)
+    assert dcDrogue["time"] == 0.0
+    assert dcMain["time"] > dcDrogue["time"]+dcDrogue["inflation_time"]
+    # The main opens at about the drogue descent rate and both canopies stay attached
+    fDrogueVelocity = getTerminalVelocity(20.0, getDragArea(0.6)+RECOVERY_BODY_DRAG_AREA, float(dcMain["air_density"]))
+    assert dcMain["velocity"] == pytest.approx(fDrogueVelocity, rel=2e-2)
+    fImpactVelocity = getTerminalVelocity(20.0, getDragArea(0.6)+getDragArea(2.5)+RECOVERY_BODY_DRAG_AREA)
+    assert dcResults["impact_velocity"] == pytest.approx(fImpactVelocity, rel=1e-2)
+    assert dcResults["max_load"] == pytest.approx(max(dcDrogue["oscalc"], dcMain["oscalc"]))
+
+@pytest.mark.parametrize("fTriggerAltitude", [800.0, 300.0, 45.0])
+def test_altitude_trigger(fTriggerAltitude: float):
+    lStages = [CRecoveryStage("drogue", 0.6, "apogee"), CRecoveryStage("main", 2.5, "altitude", fTriggerAltitude)]
+    dcMain = simulateRecovery(lStages, 20.0, 1500.0, 15.0)["events"][1]
+    assert dcMain["altitude"] == pytest.approx(fTriggerAltitude)
+
+def test_timer_trigger():
+    lStages = [CRecoveryStage("drogue", 0.6, "timer", 2.0), CRecoveryStage("main", 2.5, "timer", 10.0)]
+    dcDrogue, dcMain = simulateRecovery(lStages, 20.0, 1500.0, 15.0)["events"]
+    # The first timer runs from apogee, the next ones from the previous deployment
+    assert dcDrogue["time"] == pytest.approx(2.0)
+    assert dcMain["time"] == pytest.approx(12.0)
+    assert dcDrogue["altitude"] < 1500.0
+
+def test_reefed_opening():
+    lStages = [CRecoveryStage("main", 2.5, "apogee", lReefing=[(0.3, 4.0)])]
+    dcResults = simulateRecovery(lStages, 20.0, 1000.0, 15.0)
+    dcReefed, dcDisreef = dcResults["events"]
+    assert (dcReefed["ratio"], dcDisreef["ratio"]) == (0.3, 1.0)
+    assert dcDisreef["time"] == pytest.approx(dcReefed["time"]+4.0)
+    # Disreefing inflates the canopy only by the diameter increment
+    fReefedDiameter = 2.5*np.sqrt(0.3)
+    fFillConst = INPUT_PARAMETERS["INFLATION_CANOPY_FILL_CONST"]*(2.5-fReefedDiameter)
+    assert dcDisreef["inflation_time"] == pytest.approx(fFillConst/dcDisreef["velocity"]**INPUT_PARAMETERS["DECCELERATION_EXPONENT"])
+    # The reefed canopy lowers the load of the full opening compared to an unreefed one at apogee
+    dcFull = simulateRecovery([CRecoveryStage("main", 2.5, "apogee")], 20.0, 1000.0, 15.0)["events"][0]
+    assert dcReefed["oscalc"] < dcFull["oscalc"]
+    assert dcResults["impact_velocity"] == pytest.approx(getTerminalVelocity(20.0, getDragArea(2.5)+RECOVERY_BODY_DRAG_AREA), rel=1e-2)
+
+def test_disreef_starts_from_reefed_inflation_state():
+    # Without a delay the disreef opens at the state the reefed inflation ended in
+    lStages = [CRecoveryStage("main", 2.5, "apogee", lReefing=[(0.3, 0.0)])]
+    dcReefed, dcDisreef = simulateRecovery(lStages, 20.0, 1000.0, 15.0)["events"]
+    dcInflation = integrateInflation(
+        20.0, 0.3*getDragArea(2.5), float(dcReefed["inflation_time"]), float(dcReefed["velocity"]), float(dcReefed["air_density"]),
+        INPUT_PARAMETERS["G_ACCELERATION"], INPUT_PARAMETERS["DRAG_INTEGRAL"],
+        fDuration=1.0, bHistory=False, _ExtraDragArea=RECOVERY_BODY_DRAG_AREA
+    )
+    assert dcDisreef["time"] == pytest.approx(dcReefed["time"]+dcReefed["inflation_time"])
+    assert dcDisreef["velocity"] == pytest.approx(dcInflation["final_velocity"])
+    assert dcDisreef["altitude"] == pytest.approx(dcReefed["altitude"]-dcInflation["distance"])
+    assert dcDisreef["velocity"] != pytest.approx(dcReefed["velocity"])
+
+def test_release_previous():
+    lAttached = [CRecoveryStage("drogue", 0.6, "apogee"), CRecoveryStage("main", 2.5, "altitude", 300.0)]
+    lReleased = [CRecoveryStage("drogue", 0.6, "apogee"), CRecoveryStage("main", 2.5, "altitude", 300.0, bReleasePrevious=True)]
+    fAttached = simulateRecovery(lAttached, 20.0, 1500.0, 15.0)["impact_velocity"]
+    fReleased = simulateRecovery(lReleased, 20.0, 1500.0, 15.0)["impact_velocity"]
+    assert fReleased > fAttached
+    assert fReleased == pytest.approx(getTerminalVelocity(20.0, getDragArea(2.5)+RECOVERY_BODY_DRAG_AREA), rel=1e-2)
+
+def test_batch_matches_single_configurations():
+    aMainDiameter = np.array([2.0, 2.5, 3.0])
+    aTriggerAltitude = np.array([[200.0], [400.0]])
+    def getStages(_Diameter, _TriggerValue):
+        return [CRecoveryStage("drogue", 0.6, "apogee"), CRecoveryStage("main", _Diameter, "altitude", _TriggerValue, lReefing=[(0.4, 3.0)])]
+    dcBatch = simulateRecovery(getStages(aMainDiameter, aTriggerAltitude), 20.0, 1500.0, 15.0)
+    assert dcBatch["landing_time"].shape == (2, 3)
+    for iRow, iColumn in np.ndindex(2, 3):
+        dcSingle = simulateRecovery(getStages(aMainDiameter[iColumn], aTriggerAltitude[iRow, 0]), 20.0, 1500.0, 15.0)
+        for sKey in ("landing_time", "impact_velocity", "max_load"):
+            assert dcBatch[sKey][iRow, iColumn] == pytest.approx(dcSingle[sKey])
+        for dcEvent, dcSingleEvent in zip(dcBatch["events"], dcSingle["events"]):
+            assert dcEvent["oscalc"][iRow, iColumn] == pytest.approx(dcSingleEvent["oscalc"])
+
+def test_landing_before_trigger():
+    lStages = [CRecoveryStage("drogue", 0.6, "apogee"), CRecoveryStage("main", 2.5, "timer", np.array([10.0, 1e4]))]
+    dcResults = simulateRecovery(lStages, 20.0, 1500.0, 15.0)
+    dcMain = dcResults["events"][1]
+    for sKey in ("time", "altitude", "velocity", "oscalc", "pflanz", "impulse"):
+        assert np.isfinite(dcMain[sKey][0])
+        assert np.isnan(dcMain[sKey][1])
+    # The landed row keeps the drogue descent and its largest load
+    assert np.all(np.isfinite(dcResults["landing_time"]))
+    assert dcResults["max_load"][1] == pytest.approx(dcResults["events"][0]["oscalc"][1])
+    assert dcResults["impact_velocity"][1] > dcResults["impact_velocity"][0]
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from Calculations.ConstantParameters import INPUT_PARAMETERS
+from Calculations.Sensitivity import evaluateOutputs, getSobolIndices
+
+def test_single_factor_indices():
+    # Pflanz load is linear in the air density - the only random input explains all of the variance
+    dcDistributions = {"MASS": 20.0, "CANOPY_DIAMETER": 2.5, "OPEN_VELOCITY": 30.0, "AIR_DENSITY": ("uniform", 1.0, 1.2)}
+    dcResults = getSobolIndices(dcDistributions, 20000, lOutputs=("pflanz",), iWorkers=1, iChunkSize=7000)
+    assert dcResults["factors"] == ["AIR_DENSITY"]
+    assert dcResults["pflanz"]["first"] == pytest.approx([1.0], abs=0.05)
+    assert dcResults["pflanz"]["total"] == pytest.approx([1.0], abs=0.05)
+    # Var(c*ro) = c**2*(b-a)**2/12
+    dcInputs = dict(INPUT_PARAMETERS, MASS=np.array([20.0]), CANOPY_DIAMETER=np.array([2.5]), OPEN_VELOCITY=np.array([30.0]), AIR_DENSITY=np.array([1.0]))
+    fFactor = float(evaluateOutputs(dcInputs, ("pflanz",))["pflanz"][0])
+    assert dcResults["pflanz"]["variance"] == pytest.approx(fFactor**2*0.2**2/12, rel=0.05)
+
+def test_variance_of_large_mean_output():
+    # Narrow spread on a large mean - the variance must not cancel to zero or go negative
+    dcDistributions = {"MASS": ("normal", 1e6, 1e-2), "CANOPY_DIAMETER": 2.5, "OPEN_VELOCITY": 30.0}
+    dcResults = getSobolIndices(dcDistributions, 5000, lOutputs=("ballistic_parameter",), iWorkers=1)
+    assert dcResults["ballistic_parameter"]["variance"] > 0.0
+    assert dcResults["ballistic_parameter"]["total"] == pytest.approx([1.0], abs=0.05)
+
+@pytest.mark.parametrize("iSamples", [0, -3])
+def test_rejects_no_samples(iSamples: int):
+    with pytest.raises(ValueError):
+        getSobolIndices({"MASS": ("normal", 20.0, 1.0), "CANOPY_DIAMETER": 2.5, "OPEN_VELOCITY": 30.0}, iSamples, iWorkers=1)